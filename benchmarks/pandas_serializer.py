@@ -0,0 +1,86 @@
+"""
+compare storing DataFrames with the pandas serializer against the generic plasma path
+
+needs a running plasma_store:
+
+    plasma_store -m 4000000000 -s /tmp/plasma
+    python benchmarks/pandas_serializer.py --path /tmp/plasma
+"""
+import argparse
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+from pyarrow import plasma
+
+from brain_plasma import serializers
+from brain_plasma.brain_client import BrainClient
+
+
+def wide_frame(rows: int, columns: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        np.random.rand(rows, columns), columns=[f"c{i}" for i in range(columns)]
+    )
+
+
+def long_frame(rows: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "ints": np.arange(rows),
+            "floats": np.random.rand(rows),
+            "category": pd.Categorical(np.random.choice(["a", "b", "c"], rows)),
+            "strings": np.random.choice(["alpha", "beta", "gamma"], rows),
+        }
+    )
+
+
+def timed(f, repeat: int) -> float:
+    """best wall time of repeat calls, in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def bench(client, serializer, df: pd.DataFrame, repeat: int) -> dict:
+    object_id = plasma.ObjectID.from_random()
+
+    def put():
+        client.delete([object_id])
+        serializer.put(client, df, object_id)
+
+    put_ms = timed(put, repeat)
+    get_ms = timed(lambda: serializer.get(client, object_id), repeat)
+    size = client.list()[object_id]["data_size"]
+    client.delete([object_id])
+    return {"put_ms": put_ms, "get_ms": get_ms, "mb": size / 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--path", default="/tmp/plasma")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+
+    client = BrainClient(args.path)
+    frames = {
+        "wide 1000x1000": wide_frame(1000, 1000),
+        "long 5e6x2": long_frame(5000000)[["ints", "floats"]],
+        "long 5e6x4": long_frame(5000000),
+    }
+    print(f"{'frame':<16}{'serializer':<10}{'put ms':>10}{'get ms':>10}{'MB':>10}")
+    for label, df in frames.items():
+        for serializer in [serializers.PLASMA, serializers.PANDAS]:
+            out = bench(client, serializer, df, args.repeat)
+            print(
+                f"{label:<16}{serializer.name:<10}"
+                f"{out['put_ms']:>10.1f}{out['get_ms']:>10.1f}{out['mb']:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+compare the serializers on dicts, NumPy arrays and DataFrames
+
+needs a running plasma_store:
+
+    plasma_store -m 4000000000 -s /tmp/plasma
+    python benchmarks/serializers.py --path /tmp/plasma
+"""
+import argparse
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from brain_plasma import serializers
+from brain_plasma.brain_client import BrainClient
+
+from pandas_serializer import bench, long_frame, wide_frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--path", default="/tmp/plasma")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+
+    client = BrainClient(args.path)
+    things = {
+        "dict 1e5 keys": {f"key{i}": [i, str(i), float(i)] for i in range(100000)},
+        "ndarray 100MB": np.random.rand(12500000),
+        "wide 1000x1000": wide_frame(1000, 1000),
+        "long 5e6x4": long_frame(5000000),
+    }
+    print(f"{'value':<16}{'serializer':<10}{'put ms':>10}{'get ms':>10}{'MB':>10}")
+    for label, thing in things.items():
+        for serializer in [serializers.PLASMA, serializers.PICKLE5, serializers.PANDAS]:
+            if serializer is serializers.PANDAS and not isinstance(thing, pd.DataFrame):
+                continue
+            try:
+                out = bench(client, serializer, thing, args.repeat)
+            except Exception as e:
+                print(f"{label:<16}{serializer.name:<10}  failed: {type(e).__name__}")
+                continue
+            print(
+                f"{label:<16}{serializer.name:<10}"
+                f"{out['put_ms']:>10.1f}{out['get_ms']:>10.1f}{out['mb']:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
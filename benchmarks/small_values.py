@@ -0,0 +1,75 @@
+"""
+compare storing many small values in slabs against one value and one metadata object each
+
+needs a running plasma_store:
+
+    plasma_store -m 1000000000 -s /tmp/plasma
+    python benchmarks/small_values.py --path /tmp/plasma --names 1000000
+"""
+import argparse
+import time
+import warnings
+
+from brain_plasma import Brain
+
+
+def store_bytes(brain: Brain) -> int:
+    """bytes every object in the store takes, including plasma's allocation of each"""
+    return sum(x["data_size"] + x["metadata_size"] for x in brain.client.list().values())
+
+
+def bench(brain: Brain, names: int) -> dict:
+    keys = [f"key{i}" for i in range(names)]
+    objects_before = len(brain.client.list())
+    bytes_before = store_bytes(brain)
+
+    start = time.perf_counter()
+    for i, key in enumerate(keys):
+        brain[key] = i
+    learn = names / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for key in keys:
+        brain[key]
+    recall = names / (time.perf_counter() - start)
+
+    objects = len(brain.client.list()) - objects_before
+    used = store_bytes(brain) - bytes_before
+
+    start = time.perf_counter()
+    for key in keys:
+        brain.forget(key)
+    forget = names / (time.perf_counter() - start)
+    brain.compact_slabs(min_dead_fraction=0)
+
+    return {
+        "learn": learn,
+        "recall": recall,
+        "forget": forget,
+        "objects": objects,
+        "names_per_gb": names / used * 1e9,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--path", default="/tmp/plasma")
+    parser.add_argument("--names", type=int, default=20000)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+
+    print(
+        f"{'mode':<10}{'learn/s':>10}{'recall/s':>10}{'forget/s':>10}{'objects':>10}{'names/GB':>14}"
+    )
+    for label, threshold in [("objects", None), ("slabs", 1024)]:
+        brain = Brain(path=args.path, namespace="smallbench", slab_threshold=threshold)
+        out = bench(brain, args.names)
+        print(
+            f"{label:<10}{out['learn']:>10.0f}{out['recall']:>10.0f}{out['forget']:>10.0f}"
+            f"{out['objects']:>10}{out['names_per_gb']:>14.0f}"
+        )
+        brain.remove_namespace("smallbench")
+
+
+if __name__ == "__main__":
+    main()
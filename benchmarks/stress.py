@@ -0,0 +1,264 @@
+"""
+stress Brain with concurrent readers and writers and check that nothing is lost or leaked
+
+starts its own plasma_store unless --path is given:
+
+    python benchmarks/stress.py --readers 4 --writers 2 --duration 10
+    python benchmarks/stress.py --mode thread --readers 4 --writers 2
+
+readers recall seeded names that never change, names that writers keep updating, and
+now and then list every name; writers learn, forget and learn again names of their own and
+names every writer shares, so forgets race learns and other forgets; afterwards the
+harness checks
+    seeded    - no reader ever got a KeyError or a wrong value for a seeded name
+    written   - every writer's names hold the last value it wrote, or are gone if it last
+                forgot them
+    usage     - the namespace usage counters match the names in the store
+    leaks     - Brain.collect finds no orphaned objects or dangling names
+and exits with status 1 if any check fails
+"""
+import argparse
+from collections import defaultdict
+import multiprocessing
+import queue
+import threading
+import time
+import traceback
+import warnings
+
+import numpy as np
+from pyarrow import plasma
+
+from brain_plasma import Brain
+
+NAMESPACE = "stress"
+
+
+def seed_name(i: int) -> str:
+    return f"seed-{i}"
+
+
+def own_name(writer: int, i: int) -> str:
+    return f"w{writer}-{i}"
+
+
+def shared_name(i: int) -> str:
+    return f"shared-{i}"
+
+
+def value(marker: int, size: int) -> np.ndarray:
+    return np.full(size, marker, dtype=np.int64)
+
+
+def reader(brain: Brain, index: int, args, deadline: float) -> dict:
+    rng = np.random.default_rng(index)
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    started = time.time()
+    while time.time() < deadline:
+        roll = rng.random()
+        if roll < 0.01:
+            op, name = "names", None
+        elif roll < 0.6:
+            op, name = "recall seeded", seed_name(int(rng.integers(args.names)))
+        else:
+            op, name = "recall shared", shared_name(int(rng.integers(args.shared)))
+        start = time.perf_counter_ns()
+        try:
+            if name is None:
+                brain.names()
+            else:
+                got = brain.recall(name)
+                if not isinstance(got, np.ndarray):
+                    errors[f"{op} {type(got).__name__}"] += 1
+                elif op == "recall seeded" and got[0] != int(name.split("-")[1]):
+                    errors["seeded wrong value"] += 1
+        except KeyError:
+            # WRITERS FORGET SHARED NAMES NOW AND THEN
+            if op != "recall shared":
+                errors[f"{op} KeyError"] += 1
+        except Exception as e:
+            errors[f"{op} {type(e).__name__}"] += 1
+        latencies[op].append(time.perf_counter_ns() - start)
+    return report(latencies, errors, {}, started)
+
+
+def writer(brain: Brain, index: int, args, deadline: float) -> dict:
+    rng = np.random.default_rng(1000 + index)
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    # THE LAST MARKER LEARNED AS EACH OWN NAME; None ONCE IT WAS FORGOTTEN
+    written = {}
+    marker = 0
+    started = time.time()
+    while time.time() < deadline:
+        marker += 1
+        kind = "forget" if rng.random() < args.forget else "learn"
+        if rng.random() < 0.5:
+            scope, name = "own", own_name(index, int(rng.integers(args.names)))
+        else:
+            scope, name = "shared", shared_name(int(rng.integers(args.shared)))
+        op = f"{kind} {scope}"
+        start = time.perf_counter_ns()
+        try:
+            if kind == "forget":
+                brain.forget(name)
+            else:
+                brain.learn(name, value(marker, args.size))
+            if scope == "own":
+                written[name] = marker if kind == "learn" else None
+        except Exception as e:
+            errors[f"{op} {type(e).__name__}"] += 1
+        latencies[op].append(time.perf_counter_ns() - start)
+    return report(latencies, errors, written, started)
+
+
+def report(latencies: dict, errors: dict, written: dict, started: float) -> dict:
+    """what a reader or writer reports; elapsed is how long it actually ran"""
+    return {
+        "latencies": dict(latencies),
+        "errors": dict(errors),
+        "written": written,
+        "elapsed": time.time() - started,
+    }
+
+
+def run_process(role: str, index: int, args, path: str, deadline: float, results):
+    warnings.simplefilter("ignore")
+    try:
+        brain = Brain(namespace=NAMESPACE, path=path)
+        work = reader if role == "reader" else writer
+        results.put(work(brain, index, args, deadline))
+    except Exception:
+        results.put(report({}, {traceback.format_exc(): 1}, {}, time.time()))
+
+
+def run(args, path: str) -> list:
+    """run the readers and writers; returns their results"""
+    roles = [("reader", i) for i in range(args.readers)] + [
+        ("writer", i) for i in range(args.writers)
+    ]
+    # A SECOND MORE FOR THE PROCESSES TO START; RATES USE THE TIME EACH ONE ACTUALLY RAN
+    deadline = time.time() + args.duration + 1
+    if args.mode == "process":
+        results = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(
+                target=run_process, args=(role, i, args, path, deadline, results)
+            )
+            for role, i in roles
+        ]
+    else:
+        # THREADS SHARE ONE BRAIN, AS THE README SAYS THEY MAY
+        results = queue.Queue()
+        brain = Brain(namespace=NAMESPACE, path=path)
+
+        def run_thread(role, i):
+            work = reader if role == "reader" else writer
+            results.put(work(brain, i, args, deadline))
+
+        workers = [threading.Thread(target=run_thread, args=role) for role in roles]
+    for worker in workers:
+        worker.start()
+    out = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    return out
+
+
+def check(brain: Brain, args, results: list) -> dict:
+    """the invariants; {check: problems}, with an empty list for checks that passed"""
+    problems = defaultdict(list)
+    for result in results:
+        for error, count in result["errors"].items():
+            if error.startswith("recall seeded") or error.startswith("seeded"):
+                problems["seeded"].append(f"{error}: {count}")
+
+    for result in results:
+        for name, marker in result["written"].items():
+            try:
+                got = int(brain.recall(name)[0])
+            except KeyError:
+                got = None
+            if got != marker:
+                last = "forgotten" if marker is None else f"written {marker}"
+                problems["written"].append(f"{name} holds {got}, last {last}")
+
+    names = brain.names()
+    usage = brain.usage()
+    if usage["names"] != len(names):
+        problems["usage"].append(f"usage counts {usage['names']} names, store has {len(names)}")
+
+    report = brain.collect(grace=0, dry_run=True)
+    if report["orphaned_objects"] or report["dangling_names"]:
+        problems["leaks"].append(str(report))
+    return {x: problems[x] for x in ["seeded", "written", "usage", "leaks"]}
+
+
+def summarize(results: list):
+    latencies = defaultdict(list)
+    rates = defaultdict(float)
+    errors = defaultdict(int)
+    for result in results:
+        for op, values in result["latencies"].items():
+            latencies[op].extend(values)
+            rates[op] += len(values) / max(result["elapsed"], 1e-9)
+        for error, count in result["errors"].items():
+            errors[error] += count
+
+    print(f"{'operation':<16}{'ops':>10}{'ops/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for op in sorted(latencies):
+        values = np.array(latencies[op]) / 1e6
+        print(
+            f"{op:<16}{len(values):>10}{rates[op]:>10.0f}"
+            f"{np.percentile(values, 50):>10.3f}{np.percentile(values, 99):>10.3f}"
+        )
+    if errors:
+        print("\nerrors")
+        for error, count in sorted(errors.items()):
+            print(f"  {error}: {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--path", default=None, help="use a running plasma_store instead of starting one")
+    parser.add_argument("--memory", type=int, default=1_000_000_000, help="bytes for the plasma_store started")
+    parser.add_argument("--mode", choices=["process", "thread"], default="process")
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument("--names", type=int, default=100, help="seeded names, and names per writer")
+    parser.add_argument("--shared", type=int, default=10, help="names every writer updates")
+    parser.add_argument("--size", type=int, default=1000, help="int64s per value")
+    parser.add_argument("--forget", type=float, default=0.2, help="fraction of writes that forget instead of learn")
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+
+    def go(path: str) -> bool:
+        brain = Brain(namespace=NAMESPACE, path=path)
+        for i in range(args.names):
+            brain.learn(seed_name(i), value(i, args.size))
+        for i in range(args.shared):
+            brain.learn(shared_name(i), value(0, args.size))
+
+        results = run(args, path)
+        summarize(results)
+        problems = check(brain, args, results)
+        print("\nchecks")
+        for name, found in problems.items():
+            print(f"  {name:<8} {'ok' if not found else 'FAILED'}")
+            for problem in found[:10]:
+                print(f"           {problem}")
+        brain.remove_namespace(NAMESPACE)
+        return not any(problems.values())
+
+    if args.path is not None:
+        ok = go(args.path)
+    else:
+        with plasma.start_plasma_store(args.memory) as (path, _):
+            ok = go(path)
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,3 @@
 from .brain import Brain
 from .brain_client import BrainClient
+from .sharded import ShardedBrain
@@ -1,37 +1,119 @@
+import concurrent.futures
+import copy
 import traceback
-from typing import ByteString, Iterable
+from typing import ByteString, Iterable, Iterator
 import hashlib
+import pyarrow as pa
 from pyarrow import plasma
 import os
+import pickle
 import random
 import string
+import sys
+import threading
 import time
 
+from . import chunks, parallel, primitives, records, serializers, slabs, spill, views
 from .brain_client import BrainClient
+from .collector import Collector
+from .index import NameIndex
+from .pinned import PinnedValue
+from .prefetch import Prefetch, touch
+from .primitives import SharedCounter, SharedLog
+from .shared import StoreLock
+from .slabs import SlabDirectory
+from .stats import (
+    NamespaceStats,
+    initial as initial_stats,
+    instrumented,
+    object_id as stats_object_id,
+)
+from .usage import (
+    NamespaceUsage,
+    POLICIES,
+    initial as initial_usage,
+    object_id as usage_object_id,
+)
+from .write_behind import WriteBehindQueue, flush_at_exit
 from .exceptions import (
     BrainNameNotExistError,
     BrainNamespaceNameError,
     BrainNamespaceNotExistError,
+    BrainNamespaceViewError,
     BrainNamespaceRemoveDefaultError,
     BrainNameLengthError,
     BrainNameTypeError,
     BrainClientDisconnectedError,
-    BrainRemoveOldNameValueError,
     BrainLearnNameError,
     BrainUpdateNameError,
+    BrainQuotaExceededError,
+    BrainViewError,
+    BrainSpillError,
+    BrainSharedObjectError,
+    BrainAppendError,
+    BrainMetadataRecordError,
 )
 
 # apache plasma documentation
 # https://arrow.apache.org/docs/python/plasma.html
 
+# THE VALUE ID OF NAMES THAT HAVE NO VALUE OBJECT OF THEIR OWN, E.G. VIEWS
+NO_VALUE = plasma.ObjectID(bytes(20))
+
 
 class Brain:
     def __init__(
-        self, namespace="default", path="/tmp/plasma", ClientClass=BrainClient
+        self,
+        namespace="default",
+        path="/tmp/plasma",
+        ClientClass=BrainClient,
+        write_behind: bool = False,
+        max_pending: int = 64,
+        instrument: bool = False,
+        slab_threshold: int = None,
+        serializer=None,
+        spill_dir: str = None,
+        spill_at: float = 0.9,
+        promote_after: int = 2,
     ):
         self.path = path
         self.namespace = namespace
         self.client = ClientClass(path)
+        self._view = False
+        # WHAT map NEEDS TO OPEN THE SAME BRAIN IN A WORKER PROCESS
+        self._worker_options = dict(
+            path=path,
+            ClientClass=ClientClass,
+            slab_threshold=slab_threshold,
+            serializer=serializer,
+            spill_dir=spill_dir,
+            spill_at=spill_at,
+            promote_after=promote_after,
+        )
+        self._pending_reclaim = set()
+        self._reclaim_lock = threading.Lock()
+        self._prefetched = {}
+        self._indexes = {}
+        self._usages = {}
+        self._stats_objects = {}
+        self._instrument = instrument
+        self._compactor = None
+        self._slab_threshold = slab_threshold
+        self._slab_directories = {}
+        self._serializer = None if serializer is None else serializers.by_name(serializer)
+        self._collector = None
+        self._compacting = set()
+        self._spill_dir = spill_dir
+        self._spill_at = spill_at
+        self._promote_after = promote_after
+        self._disk_hits = {}
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+        self._lock = StoreLock(path)
+        self._write_behind = None
+        if write_behind:
+            self._write_behind = WriteBehindQueue(self._publish, max_pending)
+            flush_at_exit(self)
         self.bytes = self.size()
         self.mb = "{} MB".format(round(self.bytes / 1000000))
         self.set_namespace(namespace)
@@ -54,11 +136,15 @@ class Brain:
     def __len__(self):
         return len(self.names())
 
+    def __iter__(self):
+        return self.iter_names()
+
     @property
     def reserved_names(self):
         return ["brain_namespaces_set"]
 
-    def learn(self, name: str, thing: str, description: str = None):
+    @instrumented("learn")
+    def learn(self, name: str, thing: str, description: str = None, serializer=None):
         """
         put a given object to the plasma store
         
@@ -67,12 +153,28 @@ class Brain:
             stores the new value to a new ID
             stores the updated metadata to the same metadata ID
             deletes the old value at the old ID
+                plasma keeps the old value alive until every reader that pinned it lets go
+                if the delete fails, it is deferred to the next reclaim instead of failing the write
+
+        the namespace usage counts the new value; if that would go over a quota of the
+        namespace, learn raises BrainQuotaExceededError or, with the "evict" policy,
+        forgets the least recently learned names of the namespace until the value fits
+
+        in write-behind mode, learn only queues the value and returns; a background thread
+        publishes it, and only the latest of several queued values of a name is published;
+        errors are raised by flush(), which also runs when the interpreter exits;
+        the queue holds thing itself, not a copy, so don't change thing after learning it
+
+        serializer: the name (e.g. "pickle5") or object of a registered serializer to store
+        thing with; default is the Brain's serializer, else the one that fits thing best;
+        the serializer used is recorded in the name's metadata, so recall needs no hint
 
         Errors:
             BrainNameTypeError
-            BrainRemoveOldNameValueError
+            BrainSerializerError
             BrainLearnNameError
             BrainUpdateNameError
+            BrainQuotaExceededError
         """
         # CHECK THAT NAME IS STRING
         if not type(name) == str:
@@ -80,94 +182,416 @@ class Brain:
                 f'Type of name "{name}" must be str, not {type(name)}'
             )
 
-        name_exists = self.exists(name)
+        if serializer is not None:
+            serializer = serializers.by_name(serializer)
 
-        ### GET NAMES AND METADATA OBJECT
-        metadata_id = self._name_to_namespace_hash(name)
-        if name_exists:
-            old_metadata = self.client.get(metadata_id)
-            old_value_hash = old_metadata["value_id"]
-            old_value_id = plasma.ObjectID(old_value_hash)
-            description = description or old_metadata["description"]
-        value_id = plasma.ObjectID.from_random()
+        # IN WRITE-BEHIND MODE, JUST QUEUE IT; THE BACKGROUND THREAD PUBLISHES IT
+        if self._write_behind is not None:
+            self._write_behind.put((self.namespace, name), thing, description, serializer)
+            return
 
-        # CREATE METADATA OBJECT
-        metadata = {
-            "name": name,
-            "value_id": value_id.binary(),
-            "description": description or "",
-            "metadata_id": metadata_id.binary(),
-            "namespace": self.namespace,
-        }
+        self._learn(name, thing, description, self.namespace, serializer)
 
-        if name_exists:
-            # IF NAME EXISTS ALREADY,
-            #    STORE THE NEW VALUE AT A NEW LOCATION
-            #    DELETE ITS VALUE STORED AT ITS OBJECTID
-            #    DELETE ITS BRAIN_OBJECT NAME INDEX
-            # (1)
-            try:
-                self.client.put(thing, value_id)
-            # IF THERE'S AN ERROR, JUST STOP
-            except:
-                traceback.print_exc()
-                raise BrainUpdateNameError(
-                    f"Unable to update value with name: {name}. Rolled back"
-                )
+    @instrumented("recall")
+    def recall(self, name):
+        """
+        get an object value based on its Brain name
+        
+        Errors:
+            KeyError
+        """
+        return self._recall(name, self.namespace)
+
+    def _recall(self, name: str, namespace: str):
+        """recall name in namespace; see recall"""
+        # A VALUE THAT IS STILL QUEUED IS THE CURRENT VALUE
+        if self._write_behind is not None:
+            pending, thing = self._write_behind.get((namespace, name))
+            if pending:
+                return thing
+
+        metadata_id = self._name_to_namespace_hash(name, namespace)
+        for _ in range(3):
+            metadata = self._lookup(name, namespace)
+            if metadata is None:
+                raise KeyError(f"Name {name} does not exist.")
+            value_hash = metadata["value_id"]
 
-            # (2)
-            # REPLACE THE METADATA OBJECT
-            self.client.delete([metadata_id])
-            self.client.put(metadata, metadata_id)
+            # SERVE A PREFETCHED VALUE IF IT'S STILL THE CURRENT VALUE OF THE NAME
+            prefetched = self._prefetched_value(metadata_id.binary(), value_hash)
+            if prefetched is not plasma.ObjectNotAvailable:
+                return prefetched
 
-            # (3)
-            # TRY TO DELETE THE OLD NAME
-            try:
-                self.client.delete([old_value_id])
-            # TELL THE USER WHAT WENT WRONG IF THAT DIDN'T WORK
-            except:
-                traceback.print_exc()
-                raise BrainRemoveOldNameValueError(
-                    f"Unable to remove old value for name {name} at {old_value_id}"
+            value = self._load(metadata)
+            if value is not plasma.ObjectNotAvailable:
+                if spill.on_disk(metadata):
+                    self._count_disk_hit(metadata)
+                return value
+            # THE NAME WAS UPDATED BETWEEN READING ITS RECORD AND ITS VALUE; READ THE NEW RECORD
+        raise KeyError(f"Value for name {name} is no longer in the store.")
+
+    def recall_table(self, name: str) -> pa.Table:
+        """
+        get the value of name as a pyarrow Table
+
+        Tables, appended tables and DataFrames stored as Arrow are read straight out of the
+        store without a copy; DataFrames and RecordBatches stored otherwise are converted
+
+        Errors:
+            KeyError
+            TypeError
+        """
+        namespace = self.namespace
+        metadata = self._lookup(name, namespace)
+        if metadata is None:
+            raise KeyError(f"Name {name} does not exist.")
+
+        # THE VALUE IS AN ARROW IPC STREAM ALREADY; READ IT AS IS, NOT AS A DATAFRAME
+        if metadata["codec"] in (serializers.PANDAS.code, serializers.ARROW.code):
+            value_id = plasma.ObjectID(metadata["value_id"])
+            buffer = self.client.get_buffers([value_id], timeout_ms=100)[0]
+            if buffer is not None:
+                return pa.ipc.open_stream(buffer).read_all()
+
+        value = self._recall(name, namespace)
+        if isinstance(value, pa.Table):
+            return value
+        if isinstance(value, pa.RecordBatch):
+            return pa.Table.from_batches([value])
+        pd = sys.modules.get("pandas")
+        if pd is not None and isinstance(value, pd.DataFrame):
+            return pa.Table.from_pandas(value, preserve_index=None)
+        raise TypeError(
+            f"Only Tables, RecordBatches and DataFrames can be read as Tables; {name} is a {type(value)}"
+        )
+
+    @instrumented("pin")
+    def pin(self, name: str) -> PinnedValue:
+        """
+        get an object value based on its Brain name, pinned in the store until released
+
+        the value's plasma object is not reclaimed while the handle is held,
+        even if the name is updated or forgotten in the meantime
+
+        Errors:
+            KeyError
+        """
+        return self._pin(name, self.namespace)
+
+    def _pin(self, name: str, namespace: str) -> PinnedValue:
+        """pin name in namespace; see pin"""
+        metadata = self._lookup(name, namespace)
+        if metadata is None:
+            raise KeyError(f"Name {name} does not exist.")
+
+        # A VIEW PINS ITS PARENT
+        if metadata["codec"] == serializers.VIEW_CODE:
+            spec = views.unpack(metadata["extra"])
+            parent = self._pin(spec["parent"], namespace)
+            value = views.apply(parent.value, spec)
+            return PinnedValue(name, parent.value_id, parent._buffer, value)
+
+        # A SLAB VALUE IS A COPY AND A SPILLED VALUE KEEPS ITS FILE MAPPED; NOTHING IN THE STORE TO PIN
+        if metadata["codec"] == serializers.SLAB_CODE or spill.on_disk(metadata):
+            value = self._load(metadata)
+            return PinnedValue(name, NO_VALUE, metadata, value)
+
+        value_id = plasma.ObjectID(metadata["value_id"])
+
+        # HOLDING THE BUFFER PINS THE OBJECT; THE VALUE IS READ FROM THE SAME PINNED OBJECT
+        buffer = self.client.get_buffers([value_id], timeout_ms=100)[0]
+        if buffer is None:
+            raise KeyError(f"Value for name {name} is no longer in the store.")
+        value = self._load(metadata)
+        return PinnedValue(name, value_id, buffer, value)
+
+    def learn_view(
+        self,
+        name: str,
+        parent_name: str,
+        rows: slice = None,
+        columns: list = None,
+        description: str = None,
+    ):
+        """
+        store name as a view of rows and/or columns of another name, without copying it
+
+        rows: a slice of contiguous rows, e.g. slice(1000, 2000)
+        columns: column names of a DataFrame or Table, or field names of a structured array
+
+        only the parent's name and the slice are stored, in name's metadata; recall reads the
+        parent zero-copy and returns a view of it, which keeps the parent's buffer pinned;
+        the view follows the parent, so it sees a new value of the parent after it's updated
+
+        Errors:
+            BrainNameTypeError
+            BrainViewError
+            KeyError
+        """
+        if not type(name) == str:
+            raise BrainNameTypeError(
+                f'Type of name "{name}" must be str, not {type(name)}'
+            )
+        if name == parent_name:
+            raise BrainViewError(f"Name {name} can't be a view of itself")
+        namespace = self.namespace
+        if not self._exists(parent_name, namespace):
+            raise KeyError(f"Name {parent_name} does not exist.")
+
+        # A VIEW CAN'T BE AN ANCESTOR OF ITSELF, OR RECALLING IT WOULD NEVER END
+        ancestor, seen = parent_name, {name}
+        while True:
+            if ancestor in seen:
+                raise BrainViewError(
+                    f"Name {name} can't be a view of {parent_name}, which is a view of {name}"
                 )
+            seen.add(ancestor)
+            ancestor_metadata = self._lookup(ancestor, namespace)
+            if ancestor_metadata is None or ancestor_metadata["codec"] != serializers.VIEW_CODE:
+                break
+            ancestor = views.unpack(ancestor_metadata["extra"])["parent"]
+
+        metadata_id = self._name_to_namespace_hash(name, namespace)
+        extra = views.pack(parent_name, rows, columns)
+        directory = self._slab_directory(namespace)
+        with self._lock:
+            old_metadata = self._get_metadata(metadata_id, timeout_ms=0)
+            # A SMALL VALUE IN A SLAB IS REPLACED BY THE VIEW
+            slab_metadata = None
+            if old_metadata is None and directory is not None:
+                slab_metadata = directory.metadata(name)
+            previous = old_metadata or slab_metadata
+            metadata = {
+                "name": name,
+                "value_id": NO_VALUE.binary(),
+                "description": description
+                or (previous["description"] if previous else ""),
+                "metadata_id": metadata_id.binary(),
+                "namespace": namespace,
+                "codec": serializers.VIEW_CODE,
+                "learned_at": time.time(),
+                "extra": extra,
+            }
+            self._account(metadata, 0, previous)
+            self._replace_metadata(metadata, metadata_id, old_metadata is not None)
+            if slab_metadata is not None:
+                directory.remove(name)
+
+        self._prefetched.pop(metadata_id.binary(), None)
+        if old_metadata is not None:
+            self._reclaim(self._owned_ids(old_metadata))
+            spill.discard(old_metadata)
+
+        index = self._indexes.get(namespace)
+        if index is not None:
+            index.add(name, metadata["description"])
+
+    def counter(self, name: str, initial: int = 0, description: str = None) -> SharedCounter:
+        """
+        get a counter stored as name that every process can change in place, creating it
+        with value initial if name doesn't exist
 
-        else:
-            # STORE THE VALUE AND METADATA - IT'S NEW!
+        recall(name) returns its current value
+
+        Errors:
+            BrainNameTypeError
+            BrainSharedObjectError
+            BrainQuotaExceededError
+        """
+        buffer, _ = self._shared_object(
+            name,
+            serializers.COUNTER_CODE,
+            primitives.counter_size(),
+            lambda buffer: primitives.init_counter(buffer, initial),
+            b"",
+            description,
+        )
+        return SharedCounter(name, buffer, self._lock)
+
+    def log(
+        self, name: str, dtype="f8", capacity: int = 1_000_000, description: str = None
+    ) -> SharedLog:
+        """
+        get an append-only log stored as name that every process can append to in place,
+        creating it with room for capacity records of dtype if name doesn't exist
+
+        an existing log keeps its own dtype and capacity; recall(name) returns a zero-copy
+        read-only array of the records appended so far
+
+        Errors:
+            BrainNameTypeError
+            BrainSharedObjectError
+            BrainQuotaExceededError
+        """
+        buffer, metadata = self._shared_object(
+            name,
+            serializers.LOG_CODE,
+            primitives.log_size(dtype, capacity),
+            lambda buffer: primitives.init_log(buffer, capacity),
+            primitives.log_spec(dtype, capacity),
+            description,
+        )
+        return SharedLog(name, buffer, self._lock, primitives.log_dtype(metadata["extra"]))
+
+    def append(self, name: str, data, compact_at: int = None, description: str = None):
+        """
+        add the rows of data (an Arrow RecordBatch or Table, or a DataFrame) to the table
+        stored as name, creating it if name doesn't exist
+
+        only the new rows are written, as one more chunk; recall(name) returns a pyarrow
+        Table over all the chunks without copying them
+        compact_at: when the table reaches this many chunks, compact it in the background
+
+        Errors:
+            BrainNameTypeError
+            BrainAppendError
+            BrainQuotaExceededError
+            TypeError
+        """
+        if not type(name) == str:
+            raise BrainNameTypeError(
+                f'Type of name "{name}" must be str, not {type(name)}'
+            )
+        table = chunks.to_table(data)
+        namespace = self.namespace
+        metadata_id = self._name_to_namespace_hash(name, namespace)
+
+        # UNDER THE STORE LOCK SO APPENDS FROM SEVERAL PROCESSES DON'T LOSE CHUNKS
+        with self._lock:
+            old_metadata = self._get_metadata(metadata_id, timeout_ms=0)
+            # A SMALL VALUE IN A SLAB IS A NAME THAT EXISTS TOO
+            if old_metadata is None and self._slab_metadata(name, namespace) is not None:
+                raise BrainAppendError(f"Name {name} exists and is not an appendable table")
+            chunk_ids = []
+            value_size = 0
+            if old_metadata is not None:
+                if old_metadata["codec"] != serializers.CHUNKS_CODE:
+                    raise BrainAppendError(f"Name {name} exists and is not an appendable table")
+                chunk_ids = chunks.unpack_ids(old_metadata["extra"])
+                first = self.client.get_buffers(chunk_ids[:1], timeout_ms=100)[0]
+                if not chunks.schema(first).equals(table.schema):
+                    raise BrainAppendError(
+                        f"Schema of the rows appended to {name} doesn't match its schema:\n"
+                        f"{table.schema}\nvs\n{chunks.schema(first)}"
+                    )
+                value_size = old_metadata["size"] - records.packed_size(old_metadata)
+
+            chunk_id = plasma.ObjectID.from_random()
+            chunk_ids.append(chunk_id)
+            metadata = {
+                "name": name,
+                "value_id": chunk_ids[0].binary(),
+                "description": description
+                or (old_metadata["description"] if old_metadata else ""),
+                "metadata_id": metadata_id.binary(),
+                "namespace": namespace,
+                "codec": serializers.CHUNKS_CODE,
+                "learned_at": time.time(),
+                "extra": chunks.pack_ids(chunk_ids),
+            }
+            # ACCOUNT FOR THE CHUNK BEFORE WRITING IT: A CHUNK OVER QUOTA MUST NOT TAKE SPACE IN
+            # THE STORE; arrow_size MEASURES EXACTLY THE STREAM put_arrow WRITES
+            nbytes, names = self._account(
+                metadata, value_size + serializers.arrow_size(table), old_metadata
+            )
             try:
-                self.client.put(thing, value_id)
-                self.client.put(metadata, metadata_id)
-            # IF SOMETHING GOES WRONG, CLEAR UP
+                serializers.put_arrow(self.client, table, chunk_id)
             except:
-                traceback.print_exc()
-                self.client.delete([value_id, metadata_id])
-                raise BrainLearnNameError(
-                    f"Unable to set value with name: {name}. Rolled back"
+                self.client.delete([chunk_id])
+                self._usage(namespace).add(-nbytes, -names)
+                raise
+            self._replace_metadata(metadata, metadata_id, old_metadata is not None)
+
+        index = self._indexes.get(namespace)
+        if index is not None:
+            index.add(name, metadata["description"])
+
+        # ONE QUEUED COMPACTION PER NAME IS ENOUGH
+        key = (namespace, name)
+        if compact_at is not None and len(chunk_ids) >= compact_at and key not in self._compacting:
+            if self._compactor is None:
+                self._compactor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="brain-compact"
                 )
+            self._compacting.add(key)
+            self._compactor.submit(self._compact_logged, name, namespace)
 
-    def recall(self, name):
+    def compact(self, name: str) -> int:
         """
-        get an object value based on its Brain name
-        
+        rewrite the chunks of the appended table stored as name as one chunk;
+        returns the number of chunks merged
+
+        appends that land while the chunks are rewritten are kept after the merged chunk
+
         Errors:
             KeyError
+            BrainAppendError
         """
-        if not self.exists(name):
-            raise KeyError(f"Name {name} does not exist.")
+        return self._compact(name, self.namespace)
+
+    def compact_slabs(self, namespace: str = None, min_dead_fraction: float = 0.5) -> int:
+        """
+        reclaim the space of updated and forgotten small values in the slabs of namespace
+        (default current): the live values of every slab that is at least min_dead_fraction
+        dead are moved and the slab is deleted; returns the number of slabs deleted
+        """
+        directory = self._slab_directory(namespace or self.namespace)
+        if directory is None:
+            return 0
+        return directory.compact(min_dead_fraction)
+
+    def spill(self, *names) -> int:
+        """
+        move the values of names from the store to files in spill_dir now;
+        returns the bytes freed in the store
 
-        metadata_id = self._name_to_namespace_hash(name)
-        metadata = self.client.get(metadata_id, timeout_ms=100)
+        recall reads spilled values from their memory-mapped files and copies a value back
+        into the store once this process recalled it promote_after times
 
-        value_hash = metadata["value_id"]
-        value_id = plasma.ObjectID(value_hash)
-        return self.client.get(value_id, timeout_ms=100)
+        Errors:
+            BrainSpillError
+            KeyError
+        """
+        if self._spill_dir is None:
+            raise BrainSpillError("Brain has no spill_dir to spill values to")
+        namespace = self.namespace
+        freed = 0
+        for name in names:
+            metadata = self._lookup(name, namespace)
+            if metadata is None:
+                raise KeyError(f"Name {name} does not exist.")
+            if spill.on_disk(metadata):
+                continue
+            if not spill.spillable(metadata):
+                raise BrainSpillError(
+                    f"Name {name} can't be spilled; only values stored as one object can"
+                )
+            freed += self._spill(metadata)
+        return freed
 
     def exists(self, name: str):
         """
         confirm that the plasma ObjectID for a given name
         """
-        id_hash = self._name_to_namespace_hash(name)
-        return self.client.contains(id_hash)
-
+        return self._exists(name, self.namespace)
+
+    def _exists(self, name: str, namespace: str) -> bool:
+        """whether name is known in namespace; see exists"""
+        if self._write_behind is not None:
+            if self._write_behind.get((namespace, name))[0]:
+                return True
+        id_hash = self._name_to_namespace_hash(name, namespace)
+        if self._has_record(id_hash):
+            return True
+        directory = self._slab_directory(namespace)
+        if directory is not None and directory.contains(name):
+            return True
+
+        # A LEARN MAY BE REPLACING THE RECORD RIGHT NOW; IT DOES SO UNDER THE STORE LOCK
+        with self._lock:
+            return self._has_record(id_hash)
+
+    @instrumented("forget")
     def forget(self, name: str):
         """
         delete an object based on its name
@@ -176,16 +600,295 @@ class Brain:
 
         if the name does not exist, doesn't do anything
         """
-        if not self.exists(name):
-            pass
+        namespace = self.namespace
+        if self._write_behind is not None:
+            self._write_behind.discard((namespace, name))
+        self._forget(name, namespace)
+
+    def find(
+        self,
+        prefix: str = None,
+        pattern: str = None,
+        description_contains: str = None,
+        namespace: str = None,
+        refresh: bool = False,
+    ) -> list:
+        """
+        return the sorted names in namespace (default current) that match every criterion given
+
+        prefix: names that start with prefix, e.g. "user_123_"
+        pattern: names that match a glob pattern, e.g. "user_*_2020"
+        description_contains: names whose description contains the string
+
+        lookups use a sorted index of the namespace built with one store scan on first use
+        and kept current by this Brain's learn and forget; the index belongs to this process,
+        so names learned or forgotten by other processes are missing from or still in the
+        results until refresh=True rebuilds it with another scan
+
+        a description search checks every distinct word of the namespace's descriptions,
+        then only the names under the words that match
+        """
+        index = self._index(namespace or self.namespace, refresh)
+        return index.find(prefix, pattern, description_contains)
+
+    def prefetch(
+        self,
+        names: Iterable[str] = None,
+        namespace: str = None,
+        max_bytes: int = None,
+        workers: int = 4,
+    ) -> Prefetch:
+        """
+        warm up names on a background thread pool so later recalls in this process are hot
+
+        names: the names to warm up in namespace (default current namespace);
+            if None, every name in namespace; names that don't exist are listed as skipped
+        max_bytes: stop holding values once their store objects add up to this many bytes
+        workers: number of threads that load values
+
+        metadata for all the names is resolved in one call, then each value's shared-memory
+        pages are touched and the value is deserialized and held by this Brain;
+        recall serves a held value for as long as it is still the current value of its name
+
+        held values are shared by every recall of the name, so don't mutate them;
+        returns a Prefetch handle: use Prefetch.wait() to block until it's done
+        """
+        namespace = namespace or self.namespace
+        handle = Prefetch(max_bytes)
+
+        # RESOLVE ALL THE METADATA AT ONCE
+        if names is None:
+            all_metadata = self._namespace_metadata(namespace)
         else:
-            metadata_id = self._name_to_namespace_hash(name)
-            metadata = self.client.get(metadata_id, timeout_ms=100)
+            names = list(names)
+            metadata_ids = [self._name_to_namespace_hash(name, namespace) for name in names]
+            buffers = self.client.get_buffers(metadata_ids, timeout_ms=100)
+            all_metadata = records.unpack_many(buffers)
+            handle.skipped.extend(
+                name for name, buffer in zip(names, buffers) if buffer is None
+            )
 
-            value_hash = metadata["value_id"]
-            value_id = plasma.ObjectID(value_hash)
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        handle._futures = [
+            executor.submit(self._prefetch_one, metadata, handle)
+            for metadata in all_metadata
+        ]
+        executor.shutdown(wait=False)
+        return handle
+
+    def map(
+        self,
+        fn,
+        names: Iterable[str] = None,
+        processes: int = None,
+        out_namespace: str = None,
+        namespace: str = None,
+        mp_context=None,
+    ) -> list:
+        """
+        run fn over the values of names in a pool of worker processes
+
+        names: the names to run fn over in namespace (default current namespace);
+            if None, every name in namespace
+        processes: number of worker processes; default one per CPU;
+            0 runs fn in this process, without a pool
+        out_namespace: if given, each result is learned under its name in out_namespace
+            by the worker that computed it, and map returns None
+        mp_context: the multiprocessing context that starts the workers, e.g.
+            multiprocessing.get_context("spawn"); default the platform's
+
+        only names go to the workers: each worker opens its own Brain on the same
+        plasma_store and recalls values zero-copy from shared memory, so fn gets read-only
+        views of NumPy and Arrow values; fn must be picklable, e.g. a module-level function
 
-            self.client.delete([metadata_id, value_id])
+        returns fn's results in the order of names, unless out_namespace is given;
+        in write-behind mode, queued values are published before the workers start
+
+        Errors:
+            KeyError
+            BrainNamespaceNameError
+            whatever fn raises
+        """
+        namespace = namespace or self.namespace
+        if names is None:
+            names = self.names(namespace)
+        names = list(names)
+        if out_namespace is not None:
+            self._check_namespace(out_namespace)
+            self._add_namespace(out_namespace)
+        self.flush()
+
+        processes = parallel.pool_size(processes)
+        if processes == 0:
+            results = [
+                parallel.apply(self, fn, name, namespace, out_namespace) for name in names
+            ]
+        else:
+            executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=mp_context,
+                initializer=parallel.start_worker,
+                initargs=(type(self), dict(self._worker_options, namespace=namespace)),
+            )
+            with executor:
+                futures = [
+                    executor.submit(parallel.run, fn, chunk, namespace, out_namespace)
+                    for chunk in parallel.chunks(names, processes)
+                ]
+                results = [x for future in futures for x in future.result()]
+
+        if out_namespace is not None:
+            self._indexes.pop(out_namespace, None)
+            return None
+        return results
+
+    def clear_prefetched(self):
+        """drop every value held by prefetch so plasma can reclaim them"""
+        self._prefetched.clear()
+
+    def flush(self, timeout: float = None):
+        """
+        in write-behind mode, block until every queued value has been published
+
+        Errors:
+            TimeoutError
+            BrainWriteBehindError
+        """
+        if self._write_behind is not None:
+            self._write_behind.flush(timeout)
+
+    def reclaim(self) -> int:
+        """
+        retry deleting old values whose deletion failed during learn or forget
+
+        returns the number of objects still waiting to be reclaimed
+        """
+        self._reclaim([])
+        return len(self._pending_reclaim)
+
+    def collect(self, grace: float = 60, dry_run: bool = False) -> dict:
+        """
+        delete the objects that learn, forget or a crashed process left behind, in every namespace
+
+        with one listing of the store and one read of every metadata record, finds
+            orphaned objects - values no metadata record points to, older than grace seconds
+                (younger ones may belong to a learn that hasn't stored its record yet)
+            dangling names - metadata records whose value objects (or spilled files) are gone;
+                recalling them fails
+            orphaned files - files in spill_dir no record points to, older than grace seconds
+        and deletes them in batches; Brain's own objects (prefixed b"brain_") are never touched
+
+        collect holds the StoreLock while it lists the store, reads the records and deletes the
+        orphans, so learns and appends wait for one scan
+
+        collect assumes the plasma_store is only used through Brain: objects put there
+        by other clients look like orphans
+
+        returns {"orphaned_objects": int, "dangling_names": [(namespace, name)], "orphaned_files": int,
+        "bytes": int} where bytes is the store and disk space reclaimed (or, with dry_run, that would be)
+        """
+        self._reclaim([])
+
+        # RECORDS ARE ONLY REPLACED UNDER THE STORE LOCK, SO UNDER IT EVERY RECORD IS READ WHOLE;
+        # HOLD IT UNTIL THE ORPHANS ARE DELETED, SO NO RECORD CAN START OWNING ONE IN BETWEEN
+        with self._lock:
+            listing = self.client.list()
+            now = time.time()
+
+            # MARK: EVERY OBJECT A METADATA RECORD OWNS
+            candidates = self._record_ids(self.namespaces(), listing)
+            referenced = set()
+            all_metadata = []
+            buffers = self.client.get_buffers(candidates, timeout_ms=0)
+            for object_id, buffer in zip(candidates, buffers):
+                if buffer is None:
+                    continue
+                try:
+                    metadata = records.unpack(buffer)
+                except BrainMetadataRecordError:
+                    continue
+                if metadata is None or metadata["metadata_id"] != object_id.binary():
+                    continue
+                referenced.update(self._owned_ids(metadata))
+                all_metadata.append(metadata)
+            del buffers
+
+            # SWEEP: OLD SEALED OBJECTS NOTHING OWNS; ANYTHING AT A RECORD'S ID IS NEVER ONE,
+            # EVEN IF IT COULDN'T BE READ AS A RECORD
+            candidates = set(candidates)
+            orphans = [
+                x
+                for x, info in listing.items()
+                if x not in candidates
+                and x not in referenced
+                and not x.binary().startswith(b"brain_")
+                and info.get("state", "sealed") == "sealed"
+                and now - info["create_time"] >= grace
+            ]
+            if orphans and not dry_run:
+                self.client.delete(orphans)
+
+        # RECORDS WHOSE OBJECTS ARE GONE
+        dangling = [
+            x
+            for x in all_metadata
+            if any(object_id not in listing for object_id in self._owned_ids(x))
+            or (spill.on_disk(x) and not os.path.exists(spill.location(x)))
+        ]
+
+        # SPILLED FILES NO RECORD POINTS TO; YOUNG ONES MAY BELONG TO A SPILL IN PROGRESS
+        orphaned_files = []
+        if self._spill_dir is not None:
+            spilled = {spill.location(x) for x in all_metadata if spill.on_disk(x)}
+            for path in spill.files(self._spill_dir):
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if path not in spilled and now - stat.st_mtime >= grace:
+                    orphaned_files.append((path, stat.st_size))
+
+        def size(object_id) -> int:
+            info = listing.get(object_id)
+            return info["data_size"] + info["metadata_size"] if info else 0
+
+        reclaimed = sum(size(x) for x in orphans) + sum(x[1] for x in orphaned_files)
+        for metadata in dangling:
+            reclaimed += size(plasma.ObjectID(metadata["metadata_id"]))
+            reclaimed += sum(size(x) for x in self._owned_ids(metadata))
+
+        if not dry_run:
+            for path, _ in orphaned_files:
+                spill.remove(path)
+            for metadata in dangling:
+                # ONLY IF THE NAME WASN'T LEARNED AGAIN SINCE THE SCAN
+                current = self._get_metadata(
+                    plasma.ObjectID(metadata["metadata_id"]), timeout_ms=0
+                )
+                if current is not None and current["value_id"] == metadata["value_id"]:
+                    self._forget(metadata["name"], metadata["namespace"])
+
+        return {
+            "orphaned_objects": len(orphans),
+            "dangling_names": [(x["namespace"], x["name"]) for x in dangling],
+            "orphaned_files": len(orphaned_files),
+            "bytes": reclaimed,
+        }
+
+    def start_collector(self, interval: float = 300, grace: float = 60) -> Collector:
+        """
+        run collect(grace) every interval seconds on a background thread until
+        stop_collector() or sleep(); returns the Collector handle with its totals
+        """
+        self.stop_collector()
+        self._collector = Collector(self, interval, grace)
+        return self._collector
+
+    def stop_collector(self):
+        """stop the background collector, if one is running"""
+        if self._collector is not None:
+            self._collector.stop()
+            self._collector = None
 
     def names(self, namespace=None):
         """
@@ -194,27 +897,116 @@ class Brain:
 
         if namespace = "all", returns names from all namespaces
         """
-        current_namespace = self.namespace
-        if namespace is None:
-            namespace = self.namespace
-
-        names = []
+        namespace = namespace or self.namespace
         if namespace == "all":
-            # FOR EACH NAMESPACE, ADD THE NAME OBJECTS TO THE LIST OF NAMES
-            for namespace in self.namespaces():
-                self.namespace = namespace
-                names.extend([x["name"] for x in self.metadata(output="list")])
-        else:
-            # RETURN ALL THE NAMES AND OBJECT_IDS IN THAT NAMESPACE ONLY
-            names = [
-                x["name"]
-                for x in self.metadata(output="list")
-                if x["namespace"] == self.namespace
-            ]
+            grouped = self.names_by_namespace()
+            return [name for names in grouped.values() for name in names]
+
+        # RETURN ALL THE NAMES IN THAT NAMESPACE ONLY
+        # ONLY THE NAME IS DECODED FROM EACH METADATA RECORD
+        pending = self._pending_names()
+        names = records.unpack_names(self._metadata_buffers(namespace), namespace)
+        names.extend(self._slab_names(namespace))
+        return self._with_pending(names, pending.get(namespace, []))
+
+    def names_by_namespace(self, namespaces: Iterable[str] = None) -> dict:
+        """
+        return {namespace: [names]} for namespaces (default every namespace in the store)
 
-        self.namespace = current_namespace
+        reads the store's object listing once for all of them, instead of once per namespace;
+        Brain's own objects (prefixed b"brain_", which no namespace can start with) are skipped
+        """
+        pending = self._pending_names()
+        namespaces = set(self.namespaces() if namespaces is None else namespaces)
+        metadata_ids = self._record_ids(namespaces)
+        # A NAMESPACE CAN BE THE PREFIX OF ANOTHER; THE RECORD SAYS WHICH ONE IT'S IN
+        grouped = records.group_names(self.client.get_buffers(metadata_ids, timeout_ms=100))
+        names = {}
+        for namespace in namespaces:
+            names[namespace] = self._with_pending(
+                grouped.get(namespace, []) + self._slab_names(namespace),
+                pending.get(namespace, []),
+            )
+        return names
+
+    def _pending_names(self) -> dict:
+        """
+        {namespace: [names]} of the write-behind writes not published yet; read before listing
+        the store, so a write published in between is still seen in one or the other
+        """
+        pending = {}
+        if self._write_behind is not None:
+            for namespace, name in self._write_behind.keys():
+                pending.setdefault(namespace, []).append(name)
+        return pending
+
+    def _with_pending(self, names: list, pending: list) -> list:
+        """names plus those of pending that aren't in it yet"""
+        if pending:
+            known = set(names)
+            names.extend(name for name in pending if name not in known)
         return names
 
+    def iter_names(self, namespace: str = None, batch_size: int = 1000) -> Iterator[str]:
+        """
+        yield the names in namespace (default current), reading their metadata records
+        batch_size at a time
+
+        memory stays bounded by one batch plus the ObjectIDs of the namespace, and the first
+        name comes after one batch instead of the whole namespace; names learned or forgotten
+        while iterating may or may not be seen; names with a write-behind write not published
+        yet come last
+        """
+        namespace = namespace or self.namespace
+        # PENDING NAMES ARE FEW; THEY'RE SKIPPED IN THE STORE SO EACH IS YIELDED ONCE
+        pending = self._pending_names().get(namespace, [])
+        skip = set(pending)
+        for names in self._record_batches(
+            namespace, batch_size, lambda buffers: records.unpack_names(buffers, namespace)
+        ):
+            yield from (name for name in names if name not in skip)
+        yield from (name for name in self._slab_names(namespace) if name not in skip)
+        yield from pending
+
+    def iter_items(self, namespace: str = None, batch_size: int = 100) -> Iterator[tuple]:
+        """
+        yield (name, value) for the names in namespace (default current), reading their
+        metadata records batch_size at a time
+
+        values are read as recall reads them, zero-copy where their serializer allows, and
+        only one is loaded at a time; names forgotten while iterating are skipped, and spilled
+        values read from disk are not promoted; names with a write-behind write not published
+        yet come last, with their queued values
+        """
+        namespace = namespace or self.namespace
+        pending = self._pending_names().get(namespace, [])
+        skip = set(pending)
+        for batch in self._record_batches(namespace, batch_size, records.unpack_many):
+            for metadata in batch:
+                if metadata["namespace"] != namespace or metadata["name"] in skip:
+                    continue
+                value = self._load_current(metadata)
+                if value is not plasma.ObjectNotAvailable:
+                    yield metadata["name"], value
+        directory = self._slab_directory(namespace)
+        if directory is not None:
+            for metadata in directory.all_metadata():
+                if metadata["name"] in skip:
+                    continue
+                value = self._load_current(metadata)
+                if value is not plasma.ObjectNotAvailable:
+                    yield metadata["name"], value
+        for name in pending:
+            queued, value = self._write_behind.get((namespace, name))
+            if not queued:
+                # PUBLISHED SINCE, OR FORGOTTEN
+                metadata = self._lookup(name, namespace)
+                if metadata is None:
+                    continue
+                value = self._load_current(metadata)
+            if value is not plasma.ObjectNotAvailable:
+                yield name, value
+
     def ids(self):
         """return list of Object IDs the brain knows that are attached to names"""
         names_ = self.metadata()
@@ -222,11 +1014,20 @@ class Brain:
 
     def sleep(self):
         """disconnect from the client"""
+        self.flush()
+        self.stop_collector()
         self.client.disconnect()
 
     def wake_up(self):
-        """reconnect to the client"""
-        self.client = plasma.connect(self.path)
+        """
+        reconnect to the client with the same ClientClass; buffers mapped through the old
+        connection are dropped and mapped again when next used
+        """
+        self.client = self._worker_options["ClientClass"](self.path)
+        self._usages.clear()
+        self._stats_objects.clear()
+        self._slab_directories.clear()
+        self._prefetched.clear()
         time.sleep(0.2)
         self.bytes = self.size()
         self.mb = "{} MB".format(round(self.bytes / 1000000))
@@ -257,9 +1058,9 @@ class Brain:
 
         returns None if it doesn't exist
         """
-        if not self.exists(name):
+        metadata = self._lookup(name, self.namespace)
+        if metadata is None:
             return None
-        metadata = self.metadata(name)
         return plasma.ObjectID(metadata["value_id"])
 
     def object_ids(self) -> dict:
@@ -291,26 +1092,12 @@ class Brain:
         if output not in ["dict", "list"]:
             raise TypeError('Output must be "list" or "dict"')
 
+        namespace = self.namespace
         if len(names) == 1:
-            name = names[0]
-            if not self.exists(name):
-                return None
-            metadata_id = self._name_to_namespace_hash(name)
-            metadata = self.client.get(metadata_id)
-            return metadata
-
-        # GET ALL IDS IN THE STORE
-        all_ids = list(self.client.list().keys())
-
-        # GET THE FIRST SEVERAL CHARACTERS OF THE OBJECTID REPRESENTATION TO USE TO FILTER NAMES
-        namespace_str = self.namespace.encode()
+            return self._lookup(names[0], namespace)
 
-        # GET ALL IDS THAT CONTAIN THE NAMESPACE REPRESENTATION
-        # I.E. ALL THE METADATA
-        known_ids = [x for x in all_ids if x.binary().startswith(namespace_str)]
-
-        # GET ALL ACTUAL OBJECTS (NAMES AND TYPE) WITH THOSE IDS
-        all_metadata = self.client.get(known_ids, timeout_ms=100)
+        # DECODE ALL THE METADATA RECORDS IN THE NAMESPACE
+        all_metadata = self._namespace_metadata(namespace)
 
         if output == "dict":
             all_metadata = {meta["name"]: meta for meta in all_metadata}
@@ -325,6 +1112,57 @@ class Brain:
                 return {name: all_metadata.get(name) for name in names}
             return all_metadata
 
+    def usage(self, namespace: str = None) -> dict:
+        """
+        return the bytes and names used by namespace (default current) and its quotas
+
+        the counters live in shared memory and are kept current by learn, forget and
+        remove_namespace in every process, so this doesn't scan the store
+        """
+        return self._usage(namespace or self.namespace).as_dict()
+
+    def set_quota(
+        self,
+        max_bytes: int = None,
+        max_names: int = None,
+        policy: str = "reject",
+        namespace: str = None,
+    ):
+        """
+        limit the bytes and/or names namespace (default current) may use; None means no limit
+
+        policy: what learn does when a new value would go over a quota
+            "reject" - raise BrainQuotaExceededError
+            "evict" - forget the least recently learned names of the namespace until it fits
+
+        Errors:
+            ValueError
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Quota policy must be one of {POLICIES}, not {policy}")
+        self._usage(namespace or self.namespace).set_quota(max_bytes, max_names, policy)
+
+    def stats(self, namespace: str = None) -> dict:
+        """
+        return the call counts and total nanoseconds of learn, recall, pin and forget in
+        namespace (default current), summed over every process with instrument=True
+
+        the counters live in shared memory like the usage counters
+        """
+        return self._stats(namespace or self.namespace).as_dict()
+
+    def recount_usage(self, namespace: str = None) -> dict:
+        """
+        recompute the usage counters of namespace (default current) with one store scan
+
+        use it to repair the counters after a process died in the middle of a learn
+        """
+        namespace = namespace or self.namespace
+        all_metadata = self._namespace_metadata(namespace)
+        usage = self._usage(namespace)
+        usage.set(sum(x["size"] for x in all_metadata), len(all_metadata))
+        return usage.as_dict()
+
     def used(self):
         """get the total used bytes in the underlying plasma_store"""
         total = 0
@@ -343,7 +1181,25 @@ class Brain:
         """
         if namespace is None:
             return self.namespace
+        if self._view:
+            raise BrainNamespaceViewError(
+                f'The namespace of a view is fixed; use brain.ns("{namespace}") instead'
+            )
+
+        self._check_namespace(namespace)
+
+        # CHANGE THE NAMESPACE AND ACKNOWLEDGE THE CHANGE
+        self.namespace = namespace
+        self._add_namespace(namespace)
+
+        # RETURN THE CURRENT NAMESPACE
+        return self.namespace
 
+    def _check_namespace(self, namespace: str):
+        """
+        Errors:
+            BrainNamespaceNameError
+        """
         # MUST BE AT LEAST FIVE CHARACTERS AND FEWER THAN 15
         if len(namespace) < 5:
             raise BrainNamespaceNameError(
@@ -354,29 +1210,53 @@ class Brain:
                 f"Namespace wrong length; 5 >= namespace >= 15; name {namespace} is {len(namespace)}"
             )
 
-        # CHANGE THE NAMESPACE AND ACKNOWLEDGE THE CHANGE
-        self.namespace = namespace
-
-        # IF THE NAMESPACE OBJECT EXISTS ALREADY, JUST ADD THE NEW NAMESPACE
-        if plasma.ObjectID(b"brain_namespaces_set") in self.client.list().keys():
-            # ADD TO NAMESPACES
-            namespaces = self.client.get(
-                plasma.ObjectID(b"brain_namespaces_set")
-            ).union([self.namespace, "default"])
-            # REMOVE OLD NAMESPACES OBJECT
-            self.client.delete([plasma.ObjectID(b"brain_namespaces_set")])
-            # ASSIGN NEW NAMESPACES OBJECT
-            self.client.put(namespaces, plasma.ObjectID(b"brain_namespaces_set"))
-
-        # OTHERWISE, CREATE THE NAMESPACES OBJECT AND ADD TO PLASMA
-        else:
-            self.client.put(
-                set([self.namespace, "default"]),
-                plasma.ObjectID(b"brain_namespaces_set"),
+        # BRAIN'S OWN OBJECTS ARE PREFIXED b"brain_"; A NAMESPACE THAT IS A PREFIX OF THAT, OR
+        # STARTS WITH IT, WOULD HAVE THEM LISTED AS ITS RECORDS
+        if namespace.startswith("brain_") or "brain_".startswith(namespace):
+            raise BrainNamespaceNameError(
+                f"Namespace {namespace} overlaps brain_, which is reserved for Brain's own objects"
             )
 
-        # RETURN THE CURRENT NAMESPACE
-        return self.namespace
+    def _add_namespace(self, namespace: str):
+        """add namespace to the set of namespaces in the store, if it isn't there yet"""
+        # UNDER THE STORE LOCK SO BRAINS STARTING TOGETHER DON'T LOSE EACH OTHER'S NAMESPACES
+        namespaces_id = plasma.ObjectID(b"brain_namespaces_set")
+        with self._lock:
+            # IF THE NAMESPACE OBJECT EXISTS ALREADY, JUST ADD THE NEW NAMESPACE
+            if self.client.contains(namespaces_id):
+                namespaces = self.client.get(namespaces_id, timeout_ms=100)
+                if not {namespace, "default"} <= namespaces:
+                    namespaces = namespaces.union([namespace, "default"])
+                    # REPLACE THE NAMESPACES OBJECT
+                    self.client.delete([namespaces_id])
+                    self._put_retrying(
+                        namespaces_id, lambda: self.client.put(namespaces, namespaces_id)
+                    )
+
+            # OTHERWISE, CREATE THE NAMESPACES OBJECT AND ADD TO PLASMA
+            else:
+                self.client.put(set([namespace, "default"]), namespaces_id)
+
+    def ns(self, namespace: str) -> "Brain":
+        """
+        a view of this Brain fixed to namespace
+
+        the view shares this Brain's client, store lock, caches and write-behind queue,
+        so it costs next to nothing; its namespace can't be changed, so threads can each
+        use their own view of one Brain without getting in each other's way
+
+            tenant = brain.ns("tenant42")
+            tenant["this"] = 5
+
+        Errors:
+            BrainNamespaceNameError
+        """
+        self._check_namespace(namespace)
+        self._add_namespace(namespace)
+        view = copy.copy(self)
+        view.namespace = namespace
+        view._view = True
+        return view
 
     def namespaces(self):
         """
@@ -393,8 +1273,8 @@ class Brain:
             BrainNamespaceNotExistError
         """
         # IF NO NAMESPACE IS DEFINED, JUST REMOVE THE CURRENT NAMESPACE
-        if namespace == None:
-            namespace == self.namespace
+        if namespace is None:
+            namespace = self.namespace
 
         # CANNOT DELETE THE DEFAULT NAMESPACE
         if namespace == "default":
@@ -404,32 +1284,32 @@ class Brain:
         if namespace not in self.namespaces():
             raise BrainNamespaceNotExistError(f'Namespace "{namespace}" does not exist')
 
-        # SAVE THE CURRENT NAMESPACE
-        current_namespace = self.namespace
-        self.namespace = namespace
-
         # DELETE ALL THE VARIABLES IN <NAMESPACE>
-        for name in self.names():
-            self.forget(name)
+        for name in self.names(namespace):
+            if self._write_behind is not None:
+                self._write_behind.discard((namespace, name))
+            self._forget(name, namespace)
+        self._usage(namespace).set(0, 0)
+        directory = self._slab_directory(namespace)
+        if directory is not None:
+            directory.drop()
+            self._slab_directories.pop(namespace, None)
+
+        # REMOVE <NAMESPACE> FROM THE SET OF NAMESPACES, UNDER THE STORE LOCK LIKE set_namespace
+        namespaces_id = plasma.ObjectID(b"brain_namespaces_set")
+        with self._lock:
+            namespaces = self.client.get(namespaces_id, timeout_ms=100)
+            namespaces = namespaces.union(["default"]) - set([namespace])
+            self.client.delete([namespaces_id])
+            self._put_retrying(
+                namespaces_id, lambda: self.client.put(namespaces, namespaces_id)
+            )
 
-        ## REMOVE NAMESPACE FROM SET OF NAMESPACES
-        # GET CURRENT NAMESPACES
-        namespaces = self.client.get(plasma.ObjectID(b"brain_namespaces_set")).union(
-            [self.namespace, "default"]
-        )
-        # REMOVE <NAMESPACE> FROM CURRENT NAMESPACES SET
-        namespaces = namespaces - set([namespace])
-        # REMOVE THE OLD NAMESPACES OBJECT
-        self.client.delete([plasma.ObjectID(b"brain_namespaces_set")])
-        # ADD THE NEW NAMESPACES OBJECT
-        self.client.put(namespaces, plasma.ObjectID(b"brain_namespaces_set"))
-
-        # IF WE CLEARED THE CURRENT NAMESPACE, CHANGE THE NAMESPACE TO DEFAULT
-        if current_namespace == namespace:
+        self._indexes.pop(namespace, None)
+
+        # IF WE CLEARED THE CURRENT NAMESPACE, CHANGE THE NAMESPACE TO DEFAULT; A VIEW KEEPS ITS OWN
+        if self.namespace == namespace and not self._view:
             self.namespace = "default"
-        # OTHERWISE, JUST CHANGE SELF.NAMESPACE BACK TO WHAT IT WAS
-        else:
-            self.namespace = current_namespace
 
         return "Deleted namespace {}. Using namespace {}.".format(
             namespace, self.namespace
@@ -438,6 +1318,888 @@ class Brain:
     ##########################################################################################
     # UTILITY FUNCTIONS
     ##########################################################################################
+    def _learn(
+        self, name: str, thing, description: str, namespace: str, serializer=None
+    ):
+        """learn name in namespace now; see learn"""
+        serializer = serializer or self._serializer
+
+        # AN EXPLICIT SERIALIZER ALWAYS GETS ITS OWN OBJECT
+        if serializer is None and self._slab_threshold is not None and self._learn_small(
+            name, thing, description, namespace
+        ):
+            return
+
+        metadata_id = self._name_to_namespace_hash(name, namespace)
+        value_id = plasma.ObjectID.from_random()
+        serializer = serializer or serializers.for_object(thing)
+        directory = self._slab_directory(namespace)
+        usage = self._usage(namespace)
+
+        # (1)
+        # WITH A QUOTA, RESERVE THE VALUE'S SIZE FIRST: A VALUE OVER QUOTA MUST NOT TAKE SPACE IN
+        # THE STORE, WHERE IT COULD MAKE PLASMA EVICT THE OBJECTS OF OTHER NAMESPACES
+        reserved = self._reserve(name, thing, serializer, namespace, directory)
+
+        # (2)
+        # STORE THE NEW VALUE AT A NEW LOCATION; NOTHING ELSE CHANGES IF IT FAILS
+        try:
+            codec = self._put_value(serializer, thing, value_id)
+            value_size = self._object_size(value_id)
+        except:
+            traceback.print_exc()
+            self.client.delete([value_id])
+            usage.add(-reserved[0], -reserved[1])
+            raise BrainLearnNameError(
+                f"Unable to set value with name: {name}. Rolled back"
+            )
+
+        # (3)
+        # POINT THE NAME AT IT; UNDER THE STORE LOCK SO CONCURRENT LEARNS OF THE NAME
+        # EACH REPLACE AND ACCOUNT FOR THE VALUE THE PREVIOUS ONE STORED
+        with self._lock:
+            old_metadata = self._get_metadata(metadata_id, timeout_ms=0)
+            # A SMALL VALUE IN A SLAB IS REPLACED BY THIS ONE
+            slab_metadata = None
+            if old_metadata is None and directory is not None:
+                slab_metadata = directory.metadata(name)
+            previous = old_metadata or slab_metadata
+            metadata = {
+                "name": name,
+                "value_id": value_id.binary(),
+                "description": description
+                or (previous["description"] if previous else ""),
+                "metadata_id": metadata_id.binary(),
+                "namespace": namespace,
+                "codec": codec,
+                "learned_at": time.time(),
+            }
+            # SWAP THE RESERVED ESTIMATE FOR THE SIZE THE VALUE ACTUALLY TOOK
+            usage.add(-reserved[0], -reserved[1])
+            try:
+                self._account(metadata, value_size, previous)
+            except BrainQuotaExceededError:
+                self.client.delete([value_id])
+                raise
+            try:
+                self._replace_metadata(metadata, metadata_id, old_metadata is not None)
+            # IF SOMETHING GOES WRONG, CLEAR UP
+            except Exception as e:
+                traceback.print_exc()
+                self.client.delete([value_id])
+                if old_metadata is not None and not isinstance(e, BrainMetadataRecordError):
+                    # THE OLD RECORD WAS ALREADY DELETED, SO THE NAME IS GONE WITH ITS VALUE
+                    self._usage(namespace).add(-metadata["size"], -1)
+                    self._prefetched.pop(metadata_id.binary(), None)
+                    self._reclaim(self._owned_ids(old_metadata))
+                    spill.discard(old_metadata)
+                    index = self._indexes.get(namespace)
+                    if index is not None:
+                        index.remove(name)
+                    raise BrainUpdateNameError(
+                        f"Unable to update value with name: {name}. The name was removed"
+                    )
+                self._usage(namespace).add(
+                    -metadata["size"] + (previous["size"] if previous else 0),
+                    0 if previous else -1,
+                )
+                if old_metadata is not None:
+                    raise BrainUpdateNameError(
+                        f"Unable to update value with name: {name}. Rolled back"
+                    )
+                raise BrainLearnNameError(
+                    f"Unable to set value with name: {name}. Rolled back"
+                )
+            if slab_metadata is not None:
+                directory.remove(name)
+        self._prefetched.pop(metadata_id.binary(), None)
+
+        # (4)
+        # TRY TO DELETE THE OLD VALUE; DEFERRED IF IT DOESN'T WORK
+        if old_metadata is not None:
+            self._reclaim(self._owned_ids(old_metadata))
+            spill.discard(old_metadata)
+
+        # KEEP THE NAME INDEX CURRENT IF IT WAS BUILT
+        index = self._indexes.get(namespace)
+        if index is not None:
+            index.add(name, metadata["description"])
+
+        # MOVE COLD VALUES TO DISK IF THE STORE IS GETTING FULL
+        self._spill_cold()
+
+    def _reserve(self, name: str, thing, serializer, namespace: str, directory) -> tuple:
+        """
+        if namespace has a quota, count the bytes serializer will store for thing in its usage,
+        as _account would count the stored value; returns the (bytes, names) reserved, to
+        take back once the value is stored and accounted for
+
+        Errors:
+            BrainQuotaExceededError
+        """
+        if not self._usage(namespace).limited:
+            return 0, 0
+        estimate = serializers.estimate(serializer, thing)
+        if estimate is None:
+            return 0, 0
+        metadata_id = self._name_to_namespace_hash(name, namespace)
+        with self._lock:
+            previous = self._get_metadata(metadata_id, timeout_ms=0)
+            if previous is None and directory is not None:
+                previous = directory.metadata(name)
+            pending = {
+                "name": name,
+                "namespace": namespace,
+                "description": previous["description"] if previous else "",
+            }
+            return self._account(pending, estimate, previous)
+
+    def _learn_small(self, name: str, thing, description: str, namespace: str) -> bool:
+        """
+        learn name in a slab if thing is small enough; False if it isn't or there's no room
+
+        Errors:
+            BrainQuotaExceededError
+        """
+        # CHEAP CHECK FIRST; getsizeof DOESN'T COUNT WHAT A CONTAINER HOLDS, SO THE PICKLING
+        # ITSELF STOPS ONCE IT PASSES THE THRESHOLD
+        if sys.getsizeof(thing) > self._slab_threshold:
+            return False
+        value = slabs.pickle_small(thing, self._slab_threshold)
+        if value is None:
+            return False
+
+        directory = self._slab_directory(namespace, create=True)
+        metadata_id = self._name_to_namespace_hash(name, namespace)
+        with self._lock:
+            old_metadata = directory.metadata(name) or self._get_metadata(
+                metadata_id, timeout_ms=0
+            )
+            metadata = {
+                "name": name,
+                "value_id": NO_VALUE.binary(),
+                "description": description
+                or (old_metadata["description"] if old_metadata else ""),
+                "metadata_id": metadata_id.binary(),
+                "namespace": namespace,
+                "codec": serializers.SLAB_CODE,
+                "learned_at": time.time(),
+            }
+            self._account(
+                metadata, slabs.ENTRY_PREFIX.size + len(value), old_metadata
+            )
+            if not directory.put(metadata, value):
+                # GIVE BACK WHAT WAS RESERVED; THE CALLER STORES IT AS ITS OWN OBJECT
+                self._usage(namespace).add(
+                    -metadata["size"] + (old_metadata["size"] if old_metadata else 0),
+                    0 if old_metadata else -1,
+                )
+                return False
+
+            # A LARGE VALUE OF THE NAME IS REPLACED BY THIS ONE; ITS RECORD IS DELETED NOW,
+            # NOT DEFERRED, AND IF THAT RAISES THE LARGE VALUE STAYS THE NAME'S VALUE
+            if old_metadata is not None and old_metadata["codec"] != serializers.SLAB_CODE:
+                try:
+                    self._delete_record(metadata_id)
+                except:
+                    directory.remove(name)
+                    self._usage(namespace).add(old_metadata["size"] - metadata["size"], 0)
+                    raise
+                self._prefetched.pop(metadata_id.binary(), None)
+                self._reclaim(self._owned_ids(old_metadata))
+                spill.discard(old_metadata)
+
+        index = self._indexes.get(namespace)
+        if index is not None:
+            index.add(name, metadata["description"])
+        return True
+
+    def _publish(self, key: tuple, thing, description: str, serializer=None):
+        """learn a value queued in write-behind mode; called on the background thread"""
+        namespace, name = key
+        self._learn(name, thing, description, namespace, serializer)
+
+    def _forget(self, name: str, namespace: str):
+        """forget name in namespace now; see forget"""
+        metadata_id = self._name_to_namespace_hash(name, namespace)
+        # UNDER THE STORE LOCK LIKE LEARN, SO ONLY ONE OF CONCURRENT FORGETS OF THE NAME
+        # FINDS ITS RECORD, AND A LEARN DOESN'T REPLACE IT HALFWAY THROUGH
+        with self._lock:
+            metadata = self._get_metadata(metadata_id, timeout_ms=0)
+            if metadata is None:
+                # SMALL NAMES LIVE IN SLABS
+                directory = self._slab_directory(namespace)
+                metadata = directory.remove(name) if directory is not None else None
+                if metadata is None:
+                    return
+            else:
+                # THE RECORD IS DELETED NOW, NOT DEFERRED; IF THAT RAISES, THE NAME STILL EXISTS
+                self._delete_record(metadata_id)
+                self._prefetched.pop(metadata_id.binary(), None)
+                self._reclaim(self._owned_ids(metadata))
+                spill.discard(metadata)
+            self._usage(namespace).add(-metadata["size"], -1)
+
+        index = self._indexes.get(namespace)
+        if index is not None:
+            index.remove(name)
+
+    def _replace_metadata(self, metadata: dict, metadata_id: plasma.ObjectID, exists: bool):
+        """
+        store metadata at metadata_id in place of the record there, if exists; hold the StoreLock
+
+        the new record is packed before the old one is deleted, so a BrainMetadataRecordError
+        changes nothing; any other error comes after the delete and leaves no record
+
+        Errors:
+            BrainMetadataRecordError
+            plasma.PlasmaObjectExists
+        """
+        record = records.pack(metadata)
+        if exists:
+            self._delete_record(metadata_id)
+        self._put_retrying(
+            metadata_id, lambda: self.client.put_raw_buffer(record, object_id=metadata_id)
+        )
+
+    def _delete_record(self, metadata_id: plasma.ObjectID):
+        """
+        delete the metadata record at metadata_id; hold the StoreLock
+
+        plasma keeps a record that a reader holds until it's released, and until then other
+        clients still get it, so it's marked forgotten to read as missing right away;
+        holding it here defers the delete until it's marked
+        """
+        buffer = self.client.get_buffers([metadata_id], timeout_ms=0)[0]
+        self.client.delete([metadata_id])
+        if buffer is not None:
+            records.mark_forgotten(buffer)
+
+    def _put_retrying(self, object_id: plasma.ObjectID, put, timeout: float = 1.0):
+        """
+        call put() to store object_id right after deleting it
+
+        plasma defers deleting an object until the readers that hold it let go, and the id
+        can't be reused until then; readers only hold records while they decode them,
+        so retry for up to timeout seconds
+
+        Errors:
+            plasma.PlasmaObjectExists
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return put()
+            except plasma.PlasmaObjectExists:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.0005)
+
+    def _put_metadata(self, metadata: dict, metadata_id: plasma.ObjectID):
+        """store a metadata dict as a compact record at metadata_id"""
+        self.client.put_raw_buffer(records.pack(metadata), object_id=metadata_id)
+
+    def _has_record(self, metadata_id: plasma.ObjectID) -> bool:
+        """whether there's a metadata record at metadata_id that wasn't forgotten"""
+        if not self.client.contains(metadata_id):
+            return False
+        buffer = self.client.get_buffers([metadata_id], timeout_ms=0)[0]
+        return buffer is not None and not records.forgotten(buffer)
+
+    def _get_metadata(self, metadata_id: plasma.ObjectID, timeout_ms: int = 100) -> dict:
+        """
+        get the metadata dict stored at metadata_id
+
+        returns None if it doesn't exist
+        """
+        buffer = self.client.get_buffers([metadata_id], timeout_ms=timeout_ms)[0]
+        if buffer is None:
+            return None
+        return records.unpack(buffer)
+
+    def _reclaim(self, object_ids: list):
+        """
+        delete object_ids along with any deletions deferred earlier
+
+        plasma defers deleting objects that are still in use until they are released,
+        so this never waits on readers; if the delete raises, the ids are kept for the next try
+
+        only for value objects, whose ids are never reused: a metadata record's id comes back
+        when its name is learned again, and a retry would delete the new record
+        """
+        with self._reclaim_lock:
+            pending = list(object_ids) + [
+                x for x in self._pending_reclaim if x not in object_ids
+            ]
+            if not pending:
+                return
+            try:
+                self.client.delete(pending)
+                self._pending_reclaim.clear()
+            except:
+                traceback.print_exc()
+                self._pending_reclaim.update(object_ids)
+
+    def _usage(self, namespace: str) -> NamespaceUsage:
+        """get the shared usage counters of namespace, creating them if needed"""
+        usage = self._usages.get(namespace)
+        if usage is None:
+            usage_id = self._usage_id(namespace)
+            with self._lock:
+                if not self.client.contains(usage_id):
+                    self.client.put_raw_buffer(initial_usage(), object_id=usage_id)
+            buffer = self.client.get_buffers([usage_id], timeout_ms=100)[0]
+            usage = NamespaceUsage(buffer, self._lock)
+            self._usages[namespace] = usage
+        return usage
+
+    def _usage_id(self, namespace: str) -> plasma.ObjectID:
+        """the ObjectID of the usage counters of namespace"""
+        return usage_object_id(namespace)
+
+    def _shared_object(
+        self, name: str, codec: int, size: int, init, extra: bytes, description: str
+    ) -> tuple:
+        """
+        get the value buffer and metadata of the counter or log stored as name, creating it
+        if needed: a size bytes object is created, init(buffer) writes its layout, then it's
+        sealed and learned with codec
+
+        Errors:
+            BrainNameTypeError
+            BrainSharedObjectError
+            BrainQuotaExceededError
+        """
+        if not type(name) == str:
+            raise BrainNameTypeError(
+                f'Type of name "{name}" must be str, not {type(name)}'
+            )
+        namespace = self.namespace
+        metadata_id = self._name_to_namespace_hash(name, namespace)
+
+        # CREATE UNDER THE STORE LOCK SO CONCURRENT CALLERS GET THE SAME OBJECT
+        with self._lock:
+            # A SMALL VALUE IN A SLAB IS A NAME THAT EXISTS TOO
+            metadata = self._get_metadata(metadata_id, timeout_ms=0) or self._slab_metadata(
+                name, namespace
+            )
+            if metadata is None:
+                value_id = plasma.ObjectID.from_random()
+                metadata = {
+                    "name": name,
+                    "value_id": value_id.binary(),
+                    "description": description or "",
+                    "metadata_id": metadata_id.binary(),
+                    "namespace": namespace,
+                    "codec": codec,
+                    "learned_at": time.time(),
+                    "extra": extra,
+                }
+                # ITS SIZE IS KNOWN: ACCOUNT FOR IT FIRST, SO AN OBJECT OVER QUOTA IS NEVER CREATED
+                nbytes, names = self._account(metadata, size)
+                try:
+                    init(self.client.create(value_id, size))
+                    self.client.seal(value_id)
+                except:
+                    self.client.delete([value_id])
+                    self._usage(namespace).add(-nbytes, -names)
+                    raise
+                self._put_metadata(metadata, metadata_id)
+
+                index = self._indexes.get(namespace)
+                if index is not None:
+                    index.add(name, metadata["description"])
+
+        if metadata["codec"] != codec:
+            kind = "log" if codec == serializers.LOG_CODE else "counter"
+            raise BrainSharedObjectError(f"Name {name} exists and is not a {kind}")
+        value_id = plasma.ObjectID(metadata["value_id"])
+        return self.client.get_buffers([value_id], timeout_ms=100)[0], metadata
+
+    def _put_value(self, serializer, thing, value_id: plasma.ObjectID) -> int:
+        """
+        store thing as value_id; returns the code of the serializer used
+
+        if the store is full and Brain has a spill_dir, spill cold values and try once more
+
+        Errors:
+            plasma.PlasmaStoreFull
+        """
+        try:
+            return serializer.put(self.client, thing, value_id)
+        except plasma.PlasmaStoreFull:
+            if not self._spill_cold(force=True):
+                raise
+            return serializer.put(self.client, thing, value_id)
+
+    def _spill(self, metadata: dict) -> int:
+        """move the value of a metadata record to a file in spill_dir; returns the store bytes freed"""
+        value_id = plasma.ObjectID(metadata["value_id"])
+        buffer = self.client.get_buffers([value_id], timeout_ms=0)[0]
+        if buffer is None:
+            return 0
+        # WRITE THE FILE BEFORE TAKING THE STORE LOCK; IT'S THE SLOW PART
+        path = spill.path(self._spill_dir, metadata["value_id"])
+        spill.write(buffer, path)
+        del buffer
+
+        metadata_id = plasma.ObjectID(metadata["metadata_id"])
+        with self._lock:
+            current = self._get_metadata(metadata_id, timeout_ms=0)
+            # THE NAME WAS LEARNED AGAIN OR SPILLED BY ANOTHER PROCESS IN THE MEANTIME
+            if (
+                current is None
+                or current["value_id"] != metadata["value_id"]
+                or spill.on_disk(current)
+            ):
+                # ONLY THIS WRITER'S FILE; NEVER ONE THE CURRENT RECORD POINTS TO
+                pointed_to = current is not None and spill.on_disk(current)
+                if not (pointed_to and spill.location(current) == path):
+                    spill.remove(path)
+                return 0
+            spilled = dict(current, tier=spill.DISK, extra=path.encode())
+            spilled["size"] = records.packed_size(spilled)
+            self._usage(current["namespace"]).add(spilled["size"] - current["size"], 0)
+            self._replace_metadata(spilled, metadata_id, True)
+
+        self._prefetched.pop(metadata_id.binary(), None)
+        self._reclaim([value_id])
+        return current["size"] - spilled["size"]
+
+    def _spill_cold(self, force: bool = False) -> int:
+        """
+        if Brain's names take more than spill_at of the store, spill the values learned
+        longest ago until they take 90% of that; returns the store bytes freed
+
+        force: the store is full; spill until they take at most 3/4 of what they do now
+        """
+        if self._spill_dir is None:
+            return 0
+        namespaces = self.namespaces()
+        used = sum(self._usage(x).as_dict()["bytes"] for x in namespaces)
+        limit = self._spill_at * self.bytes
+        if used <= limit and not force:
+            return 0
+        target = 0.9 * limit
+        if force:
+            target = min(target, used * 3 // 4)
+
+        freed = 0
+        candidates = self._spillable_metadata(namespaces)
+        for metadata in sorted(candidates, key=lambda x: x["learned_at"]):
+            if used - freed <= target:
+                break
+            freed += self._spill(metadata)
+        return freed
+
+    def _spillable_metadata(self, namespaces: set) -> list:
+        """
+        the metadata of every value in namespaces that can be spilled, with one store scan
+
+        the record buffers are released on return; a record that's held can't be replaced
+        """
+        ids = self._record_ids(namespaces)
+        spillable = []
+        for object_id, buffer in zip(ids, self.client.get_buffers(ids, timeout_ms=0)):
+            if buffer is None:
+                continue
+            try:
+                metadata = records.unpack(buffer)
+            except BrainMetadataRecordError:
+                continue
+            if metadata is None or metadata["metadata_id"] != object_id.binary():
+                continue
+            if spill.spillable(metadata):
+                spillable.append(metadata)
+        return spillable
+
+    def _count_disk_hit(self, metadata: dict):
+        """count a recall of a spilled value; promote it back into the store if it's hot"""
+        if self._promote_after is None:
+            return
+        key = metadata["value_id"]
+        hits = self._disk_hits.get(key, 0) + 1
+        self._disk_hits[key] = hits
+        if hits >= self._promote_after:
+            self._disk_hits.pop(key, None)
+            if self._promote(metadata):
+                self._spill_cold()
+
+    def _promote(self, metadata: dict) -> bool:
+        """
+        copy the value of a spilled record back into the store; False if it didn't fit or
+        the name changed in the meantime
+
+        a promoted value counts as just learned, so it's the last to be spilled again
+        """
+        buffer = spill.read(spill.location(metadata))
+        if buffer is None:
+            return False
+        value_id = plasma.ObjectID.from_random()
+        try:
+            target = self.client.create(value_id, buffer.size)
+        except plasma.PlasmaStoreFull:
+            return False
+        memoryview(target).cast("B")[:] = memoryview(buffer).cast("B")
+        self.client.seal(value_id)
+        del target
+
+        metadata_id = plasma.ObjectID(metadata["metadata_id"])
+        with self._lock:
+            current = self._get_metadata(metadata_id, timeout_ms=0)
+            if current is None or current["value_id"] != metadata["value_id"]:
+                self.client.delete([value_id])
+                return False
+            promoted = dict(
+                current,
+                value_id=value_id.binary(),
+                tier=spill.STORE,
+                extra=b"",
+                learned_at=time.time(),
+            )
+            try:
+                self._account(promoted, buffer.size, current)
+            except BrainQuotaExceededError:
+                self.client.delete([value_id])
+                return False
+            self._replace_metadata(promoted, metadata_id, True)
+        spill.discard(current)
+        return True
+
+    def _compact(self, name: str, namespace: str) -> int:
+        """merge the chunks of name in namespace; see compact"""
+        metadata_id = self._name_to_namespace_hash(name, namespace)
+        metadata = self._get_metadata(metadata_id, timeout_ms=0)
+        if metadata is None:
+            raise KeyError(f"Name {name} does not exist.")
+        if metadata["codec"] != serializers.CHUNKS_CODE:
+            raise BrainAppendError(f"Name {name} is not an appendable table")
+        merged_ids = chunks.unpack_ids(metadata["extra"])
+        if len(merged_ids) < 2:
+            return 0
+
+        # WRITE THE MERGED CHUNK WITHOUT THE LOCK; APPENDS CAN CONTINUE MEANWHILE
+        buffers = self.client.get_buffers(merged_ids, timeout_ms=100)
+        table = chunks.read(buffers)
+        if table is plasma.ObjectNotAvailable:
+            # ANOTHER COMPACTION MERGED THEM FIRST
+            return 0
+        old_size = sum(buffer.size for buffer in buffers)
+        merged_id = plasma.ObjectID.from_random()
+        merged_size = serializers.put_arrow(
+            self.client, table.combine_chunks(), merged_id
+        )
+        del table, buffers
+
+        # SWAP THE MERGED CHUNKS FOR THE NEW ONE IF THEY'RE STILL THE FIRST CHUNKS OF name
+        with self._lock:
+            current = self._get_metadata(metadata_id, timeout_ms=0)
+            current_ids = (
+                chunks.unpack_ids(current["extra"])
+                if current is not None and current["codec"] == serializers.CHUNKS_CODE
+                else []
+            )
+            if current_ids[: len(merged_ids)] != merged_ids:
+                self.client.delete([merged_id])
+                return 0
+            chunk_ids = [merged_id] + current_ids[len(merged_ids) :]
+            # THE MERGED CHUNK AND THE SHORTER RECORD CHANGE THE SIZE A LITTLE; NO QUOTA CHECK
+            old_total = current["size"]
+            old_record_size = records.packed_size(current)
+            current["value_id"] = merged_id.binary()
+            current["extra"] = chunks.pack_ids(chunk_ids)
+            current["size"] += merged_size - old_size
+            current["size"] += records.packed_size(current) - old_record_size
+            self._usage(namespace).add(current["size"] - old_total, 0)
+            self._replace_metadata(current, metadata_id, True)
+        self._reclaim(merged_ids)
+        return len(merged_ids)
+
+    def _compact_logged(self, name: str, namespace: str):
+        """compact on the background thread; failures are printed, not raised"""
+        self._compacting.discard((namespace, name))
+        try:
+            self._compact(name, namespace)
+        except:
+            traceback.print_exc()
+
+    def _lookup(self, name: str, namespace: str) -> dict:
+        """the metadata of name in namespace, from its own record or its slab; None if it doesn't exist"""
+        metadata_id = self._name_to_namespace_hash(name, namespace)
+        metadata = self._get_metadata(metadata_id, timeout_ms=0)
+        if metadata is not None:
+            return metadata
+        directory = self._slab_directory(namespace)
+        if directory is not None:
+            metadata = directory.metadata(name)
+            if metadata is not None:
+                return metadata
+
+        # A LEARN MAY BE REPLACING THE RECORD RIGHT NOW; IT DOES SO UNDER THE STORE LOCK
+        with self._lock:
+            return self._get_metadata(metadata_id, timeout_ms=0)
+
+    def _slab_directory(self, namespace: str, create: bool = False) -> SlabDirectory:
+        """get the slab directory of namespace; None if it has none and create is False"""
+        directory = self._slab_directories.get(namespace)
+        if directory is None:
+            directory_id = slabs.directory_id(namespace)
+            buffer = self.client.get_buffers([directory_id], timeout_ms=0)[0]
+            if buffer is None:
+                if not create:
+                    return None
+                with self._lock:
+                    if not self.client.contains(directory_id):
+                        slabs.init_directory(
+                            self.client.create(directory_id, slabs.directory_size())
+                        )
+                        self.client.seal(directory_id)
+                buffer = self.client.get_buffers([directory_id], timeout_ms=100)[0]
+            directory = SlabDirectory(self.client, namespace, buffer, self._lock)
+            self._slab_directories[namespace] = directory
+        return directory
+
+    def _slab_metadata(self, name: str, namespace: str) -> dict:
+        """the metadata of name if it's a small value in a slab of namespace, else None"""
+        directory = self._slab_directory(namespace)
+        return directory.metadata(name) if directory is not None else None
+
+    def _slab_names(self, namespace: str) -> list:
+        directory = self._slab_directory(namespace)
+        return directory.names() if directory is not None else []
+
+    def _stats(self, namespace: str) -> NamespaceStats:
+        """get the shared operation stats of namespace, creating them if needed"""
+        stats = self._stats_objects.get(namespace)
+        if stats is None:
+            stats_id = self._stats_id(namespace)
+            with self._lock:
+                if not self.client.contains(stats_id):
+                    self.client.put_raw_buffer(initial_stats(), object_id=stats_id)
+            buffer = self.client.get_buffers([stats_id], timeout_ms=100)[0]
+            stats = NamespaceStats(buffer, self._lock)
+            self._stats_objects[namespace] = stats
+        return stats
+
+    def _stats_id(self, namespace: str) -> plasma.ObjectID:
+        """the ObjectID of the operation stats of namespace"""
+        return stats_object_id(namespace)
+
+    def _account(self, metadata: dict, value_size: int, old_metadata: dict = None) -> tuple:
+        """
+        record the size of a newly stored value in its metadata and count it in the namespace usage
+
+        old_metadata is the metadata of the value it replaces, if any;
+        returns the (bytes, names) added to the usage
+
+        Errors:
+            BrainQuotaExceededError
+        """
+        metadata["size"] = value_size + records.packed_size(metadata)
+        nbytes = metadata["size"] - (old_metadata["size"] if old_metadata else 0)
+        names = 0 if old_metadata else 1
+
+        namespace = metadata["namespace"]
+        usage = self._usage(namespace)
+        if usage.reserve(nbytes, names):
+            return nbytes, names
+
+        if usage.policy == "evict":
+            # FORGET THE LEAST RECENTLY LEARNED NAMES, IN SLABS TOO, UNTIL THE NEW VALUE FITS
+            candidates = sorted(
+                (
+                    x
+                    for x in self._namespace_metadata(namespace)
+                    if x["name"] != metadata["name"]
+                ),
+                key=lambda x: x["learned_at"],
+            )
+            for candidate in candidates:
+                self._forget(candidate["name"], namespace)
+                if usage.reserve(nbytes, names):
+                    return nbytes, names
+
+        raise BrainQuotaExceededError(
+            f"Learning {metadata['name']} ({nbytes} bytes) would exceed the quota of "
+            f"namespace {namespace}: {usage.as_dict()}"
+        )
+
+    def _object_size(self, object_id: plasma.ObjectID) -> int:
+        """bytes of the data of a stored object"""
+        return self.client.get_buffers([object_id], timeout_ms=100)[0].size
+
+    def _owned_ids(self, metadata: dict) -> list:
+        """the ObjectIDs of the store objects that hold the value of a metadata record"""
+        if metadata["codec"] in (serializers.VIEW_CODE, serializers.SLAB_CODE):
+            return []
+        if spill.on_disk(metadata):
+            return []
+        if metadata["codec"] == serializers.CHUNKS_CODE:
+            return chunks.unpack_ids(metadata["extra"])
+        return [plasma.ObjectID(metadata["value_id"])]
+
+    def _load(self, metadata: dict):
+        """
+        read the value of a metadata record from the store
+
+        Errors:
+            KeyError
+        """
+        if metadata["codec"] == serializers.VIEW_CODE:
+            spec = views.unpack(metadata["extra"])
+            # THE PARENT MAY BE A SMALL VALUE IN A SLAB
+            parent = self._lookup(spec["parent"], metadata["namespace"])
+            if parent is None:
+                raise KeyError(
+                    f"Name {spec['parent']}, the parent of view {metadata['name']}, does not exist."
+                )
+            value = self._load(parent)
+            if value is plasma.ObjectNotAvailable:
+                # THE PARENT WAS UPDATED BETWEEN READING ITS RECORD AND ITS VALUE
+                return value
+            return views.apply(value, spec)
+
+        if metadata["codec"] == serializers.SLAB_CODE:
+            directory = self._slab_directory(metadata["namespace"])
+            value = directory.value(metadata["name"]) if directory is not None else None
+            if value is None:
+                raise KeyError(f"Name {metadata['name']} does not exist.")
+            return pickle.loads(value)
+
+        if metadata["codec"] == serializers.CHUNKS_CODE:
+            buffers = self.client.get_buffers(
+                chunks.unpack_ids(metadata["extra"]), timeout_ms=100
+            )
+            return chunks.read(buffers)
+
+        value_id = plasma.ObjectID(metadata["value_id"])
+        if metadata["codec"] in (serializers.COUNTER_CODE, serializers.LOG_CODE):
+            buffer = self.client.get_buffers([value_id], timeout_ms=100)[0]
+            return primitives.read(
+                metadata["codec"] == serializers.LOG_CODE, buffer, metadata["extra"]
+            )
+        serializer = serializers.by_code(metadata["codec"])
+        if spill.on_disk(metadata):
+            buffer = spill.read(spill.location(metadata))
+            if buffer is None:
+                return plasma.ObjectNotAvailable
+            return serializer.get(spill.FileClient(buffer, self.client), value_id)
+        return serializer.get(self.client, value_id, timeout_ms=100)
+
+    def _index(self, namespace: str, refresh: bool = False) -> NameIndex:
+        """get the name index of namespace, building it with one store scan if needed"""
+        index = self._indexes.get(namespace)
+        if index is None or refresh:
+            index = NameIndex(self._namespace_metadata(namespace))
+            self._indexes[namespace] = index
+        return index
+
+    def _prefetch_one(self, metadata: dict, handle: Prefetch):
+        """load one value into the prefetched values, accounting for it in handle"""
+        name = metadata["name"]
+        try:
+            # VIEWS, COUNTERS AND LOGS CHANGE WITHOUT A LEARN, SO A COPY WOULD GO STALE
+            if metadata["codec"] in serializers.LIVE_CODES:
+                handle.skipped.append(name)
+                return
+            value_id = plasma.ObjectID(metadata["value_id"])
+            buffer = self.client.get_buffers([value_id], timeout_ms=100)[0]
+            if buffer is None or not handle._reserve(buffer.size):
+                handle.skipped.append(name)
+                return
+            touch(buffer)
+            value = self._load(metadata)
+            self._prefetched[metadata["metadata_id"]] = (metadata["value_id"], value)
+            handle.loaded.append(name)
+        except Exception as e:
+            handle.errors[name] = e
+
+    def _record_batches(self, namespace: str, batch_size: int, decode) -> Iterator:
+        """
+        yield decode(buffers) for the metadata records of namespace, batch_size records at a time
+
+        the buffers of a batch are released before it's yielded, so a slow consumer never
+        holds records that a learn needs to replace
+        """
+        ids = self._record_ids([namespace])
+        for start in range(0, len(ids), batch_size):
+            yield decode(
+                self.client.get_buffers(ids[start : start + batch_size], timeout_ms=0)
+            )
+
+    def _load_current(self, metadata: dict):
+        """
+        the value of a metadata record read by a scan, or of the name's newer record if it
+        was updated since; plasma.ObjectNotAvailable if the name is gone
+        """
+        # SERVE A PREFETCHED VALUE IF IT'S STILL THE CURRENT VALUE OF THE NAME
+        prefetched = self._prefetched_value(metadata["metadata_id"], metadata["value_id"])
+        if prefetched is not plasma.ObjectNotAvailable:
+            return prefetched
+        for _ in range(2):
+            try:
+                value = self._load(metadata)
+            except KeyError:
+                value = plasma.ObjectNotAvailable
+            if value is not plasma.ObjectNotAvailable:
+                return value
+            # THE NAME WAS UPDATED OR FORGOTTEN SINCE THE SCAN READ ITS RECORD
+            metadata = self._lookup(metadata["name"], metadata["namespace"])
+            if metadata is None:
+                break
+        return plasma.ObjectNotAvailable
+
+    def _prefetched_value(self, metadata_id: bytes, value_id: bytes):
+        """
+        the value prefetch holds for a record, if it's the record's value_id;
+        plasma.ObjectNotAvailable if not, and a held value of another value_id is dropped so
+        it doesn't keep its superseded plasma object pinned
+        """
+        prefetched = self._prefetched.get(metadata_id)
+        if prefetched is None:
+            return plasma.ObjectNotAvailable
+        if prefetched[0] == value_id:
+            return prefetched[1]
+        # ONLY IF PREFETCH HASN'T PUT A NEWER ONE IN ITS PLACE MEANWHILE
+        if self._prefetched.get(metadata_id) is prefetched:
+            self._prefetched.pop(metadata_id, None)
+        return plasma.ObjectNotAvailable
+
+    def _metadata_buffers(self, namespace: str = None) -> list:
+        """
+        get the raw metadata record buffers of every name in namespace (default current namespace)
+
+        every name metadata is stored with an ObjectID prefixed with b'<namespace>'
+        so brain finds them by listing all ObjectIDs in the store and keeping those with the prefix
+        """
+        known_ids = self._record_ids([namespace or self.namespace])
+
+        # GET THE RECORD BUFFERS WITHOUT DESERIALIZING THEM
+        return self.client.get_buffers(known_ids, timeout_ms=100)
+
+    def _record_ids(self, namespaces: Iterable[str], listing: dict = None) -> list:
+        """
+        the ids of the metadata records of namespaces, from listing (default a new store listing);
+        see records.record_ids
+        """
+        if listing is None:
+            listing = self.client.list()
+        return records.record_ids(listing, namespaces)
+
+    def _namespace_metadata(self, namespace: str) -> list:
+        """the metadata of every name in namespace: its records, then the names in its slabs"""
+        all_metadata = [
+            x
+            for x in records.unpack_many(self._metadata_buffers(namespace))
+            # A NAMESPACE CAN BE THE PREFIX OF ANOTHER; THE RECORD SAYS WHICH ONE IT'S IN
+            if x["namespace"] == namespace
+        ]
+        # SMALL NAMES LIVE IN SLABS
+        directory = self._slab_directory(namespace)
+        if directory is not None:
+            all_metadata.extend(directory.all_metadata())
+        return all_metadata
+
     def _hash(self, name: str, digest_bytes: int) -> ByteString:
         """
         input a name str
@@ -1,4 +1,5 @@
 from functools import wraps
+import pyarrow
 from pyarrow import plasma
 
 
@@ -22,6 +23,18 @@ class BrainClient:
     def get(self, *args, **kwargs):
         return self.client.get(*args, **kwargs)
 
+    def create(self, *args, **kwargs):
+        return self.client.create(*args, **kwargs)
+
+    def seal(self, *args, **kwargs):
+        return self.client.seal(*args, **kwargs)
+
+    def put_raw_buffer(self, *args, **kwargs):
+        return self.client.put_raw_buffer(*args, **kwargs)
+
+    def get_buffers(self, *args, **kwargs):
+        return self.client.get_buffers(*args, **kwargs)
+
     def list(self):
         return self.client.list()
 
@@ -34,5 +47,9 @@ class BrainClient:
     def contains(self, *args, **kwargs):
         return self.client.contains(*args, **kwargs)
 
+    def deserialize(self, buffer):
+        # WHAT PlasmaClient.get DOES WITH THE BUFFER OF AN OBJECT STORED WITH put()
+        return pyarrow.lib._deserialize(buffer, None)
+
     def disconnect(self):
         return self.client.disconnect()
\ No newline at end of file
@@ -0,0 +1,57 @@
+from typing import List
+
+import pyarrow as pa
+from pyarrow import plasma
+
+# CHUNKED TABLES
+#
+# an appendable table is stored as one Arrow IPC stream object per appended chunk; the name's
+# metadata record keeps the 20-byte ObjectIDs of the chunks, in order, in its extra bytes
+#
+#   extra = id_0 | id_1 | ... | id_n-1
+#
+# so an append writes only the new rows and a slightly longer record, and recall reads every
+# chunk zero-copy into one chunked Table
+
+
+def to_table(data) -> pa.Table:
+    """
+    an Arrow Table from a RecordBatch, Table or pandas DataFrame (without its index)
+
+    Errors:
+        TypeError
+    """
+    if isinstance(data, pa.Table):
+        return data
+    if isinstance(data, pa.RecordBatch):
+        return pa.Table.from_batches([data])
+    if hasattr(data, "to_records") and hasattr(data, "columns"):
+        return pa.Table.from_pandas(data, preserve_index=False)
+    raise TypeError(
+        f"Only Arrow RecordBatches, Tables and DataFrames can be appended, not {type(data)}"
+    )
+
+
+def pack_ids(object_ids: List[plasma.ObjectID]) -> bytes:
+    return b"".join(x.binary() for x in object_ids)
+
+
+def unpack_ids(extra: bytes) -> List[plasma.ObjectID]:
+    return [plasma.ObjectID(bytes(extra[i : i + 20])) for i in range(0, len(extra), 20)]
+
+
+def schema(buffer) -> pa.Schema:
+    """the schema of a chunk, without reading its rows"""
+    return pa.ipc.open_stream(buffer).schema
+
+
+def read(buffers: list) -> pa.Table:
+    """
+    one Table over the chunks' buffers; no data is copied
+
+    plasma.ObjectNotAvailable if a chunk is gone, as when a compaction merged it after its
+    record was read
+    """
+    if any(buffer is None for buffer in buffers):
+        return plasma.ObjectNotAvailable
+    return pa.concat_tables([pa.ipc.open_stream(buffer).read_all() for buffer in buffers])
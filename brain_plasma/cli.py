@@ -0,0 +1,242 @@
+import argparse
+import heapq
+import sys
+import time
+
+from pyarrow import plasma
+
+from . import records, stats, usage
+from .brain import Brain
+from .brain_client import BrainClient
+from .shared import StoreLock
+from .stats import OPERATIONS, NamespaceStats
+from .usage import NamespaceUsage
+
+# OPERATIONAL COMMAND LINE
+#
+#   python -m brain_plasma top [--path /tmp/plasma] [--interval 2] [--scan-interval 30] [--largest 10] [--once]
+#   python -m brain_plasma serve [--path /tmp/plasma] [--namespace default] [--location grpc://0.0.0.0:8815]
+#
+# top only reads the store: every tick reads the shared usage and stats counters of each
+# namespace in place; the metadata records of a namespace are scanned again for its largest
+# names only when its counters changed, and at most once every scan interval
+
+
+class Top:
+    """
+    live view of a plasma_store used by Brain: capacity, per-namespace names and bytes,
+    largest names and, for processes that use instrument=True, operation rates and latency
+
+    it never writes to the store, so namespaces that no Brain has counted anything in yet
+    are left out
+    """
+
+    def __init__(self, client, path: str, largest: int = 10, scan_interval: float = 30.0):
+        self.client = client
+        self.path = path
+        self.largest = largest
+        self.scan_interval = scan_interval
+        self.capacity = client.store_capacity()
+        # ONLY FOR THE COUNTER OBJECTS' CONSTRUCTORS; TOP NEVER UPDATES THEM
+        self._lock = StoreLock(path)
+        self._counters = {}
+        self._largest = {}
+        self._stats = {}
+        self._last = None
+        self._last_scan = None
+
+    def tick(self) -> dict:
+        """
+        take a snapshot of the store
+
+        returns {"capacity", "used", "namespaces": {namespace: usage}, "largest": [(size, namespace, name)],
+        "operations": {operation: {"calls", "rate", "latency_ms"}}}
+        """
+        now = time.monotonic()
+        usages, namespace_stats = self._read_counters()
+        namespaces = sorted(usages)
+
+        # RESCAN THE NAMESPACES WHOSE COUNTERS MOVED, BUT NOT MORE OFTEN THAN scan_interval
+        if self._last_scan is None or now - self._last_scan >= self.scan_interval:
+            changed = [
+                ns
+                for ns in namespaces
+                if self._counters.get(ns) != (usages[ns]["bytes"], usages[ns]["names"])
+            ]
+            if changed:
+                self._scan(changed)
+                self._last_scan = now
+            for ns in changed:
+                self._counters[ns] = (usages[ns]["bytes"], usages[ns]["names"])
+        for ns in set(self._largest) - set(namespaces):
+            self._largest.pop(ns)
+            self._counters.pop(ns, None)
+
+        largest = heapq.nlargest(
+            self.largest,
+            (
+                (size, ns, name)
+                for ns in namespaces
+                for size, name in self._largest.get(ns, [])
+            ),
+        )
+
+        # OPERATION RATES ARE DIFFERENCES OF THE SHARED STATS BETWEEN TICKS
+        totals = {op: [0, 0] for op in OPERATIONS}
+        for ns_stats in namespace_stats.values():
+            for op, stat in ns_stats.items():
+                totals[op][0] += stat["calls"]
+                totals[op][1] += stat["nanoseconds"]
+        # THE FIRST TICK HAS NOTHING TO COMPARE TO; IT SHOWS THE AVERAGE LATENCY SO FAR
+        operations = {}
+        elapsed = None if self._last is None else max(now - self._last, 1e-9)
+        for op, (calls, nanoseconds) in totals.items():
+            last_calls, last_nanoseconds = self._stats.get(op, (0, 0))
+            calls_delta = calls - last_calls
+            operations[op] = {
+                "calls": calls,
+                "rate": None if elapsed is None else calls_delta / elapsed,
+                "latency_ms": (nanoseconds - last_nanoseconds) / calls_delta / 1e6
+                if calls_delta
+                else None,
+            }
+        self._stats = totals
+        self._last = now
+
+        return {
+            "capacity": self.capacity,
+            "used": sum(x["bytes"] for x in usages.values()),
+            "namespaces": {ns: usages[ns] for ns in namespaces},
+            "largest": largest,
+            "operations": operations,
+        }
+
+    def render(self, snapshot: dict) -> str:
+        """format a snapshot as text"""
+        capacity, used = snapshot["capacity"], snapshot["used"]
+        lines = [
+            f"brain-plasma top - {self.path} - {time.strftime('%H:%M:%S')}",
+            f"capacity {_bytes(capacity)}  used by names {_bytes(used)} ({used / capacity:.1%})  free {_bytes(capacity - used)}",
+            "",
+            f"{'NAMESPACE':<24}{'NAMES':>10}{'BYTES':>12}{'MAX BYTES':>12}{'MAX NAMES':>11}",
+        ]
+        for ns, counts in snapshot["namespaces"].items():
+            max_bytes = "-" if counts["max_bytes"] is None else _bytes(counts["max_bytes"])
+            max_names = "-" if counts["max_names"] is None else counts["max_names"]
+            lines.append(
+                f"{ns:<24}{counts['names']:>10}{_bytes(counts['bytes']):>12}{max_bytes:>12}{max_names:>11}"
+            )
+        lines += ["", f"{'LARGEST':<24}{'NAMESPACE':<24}{'BYTES':>12}"]
+        for size, ns, name in snapshot["largest"]:
+            lines.append(f"{name:<24}{ns:<24}{_bytes(size):>12}")
+        # OPERATIONS ARE ONLY COUNTED BY PROCESSES THAT USE instrument=True
+        if any(x["calls"] for x in snapshot["operations"].values()):
+            lines += ["", f"{'OPERATION':<24}{'CALLS':>10}{'PER SEC':>10}{'LATENCY MS':>12}"]
+            for op, stat in snapshot["operations"].items():
+                rate = "-" if stat["rate"] is None else f"{stat['rate']:.1f}"
+                latency = "-" if stat["latency_ms"] is None else f"{stat['latency_ms']:.3f}"
+                lines.append(f"{op:<24}{stat['calls']:>10}{rate:>10}{latency:>12}")
+        return "\n".join(lines)
+
+    def _read_counters(self) -> tuple:
+        """
+        the usage and stats of every namespace that has them, read in place with one call;
+        the buffers are let go right away so the store can delete the objects when it wants
+        """
+        namespaces_id = plasma.ObjectID(b"brain_namespaces_set")
+        if not self.client.contains(namespaces_id):
+            return {}, {}
+        namespaces = sorted(self.client.get(namespaces_id, timeout_ms=0))
+        ids = [usage.object_id(ns) for ns in namespaces] + [
+            stats.object_id(ns) for ns in namespaces
+        ]
+        buffers = self.client.get_buffers(ids, timeout_ms=0)
+        usages, namespace_stats = {}, {}
+        for ns, usage_buffer, stats_buffer in zip(
+            namespaces, buffers[: len(namespaces)], buffers[len(namespaces) :]
+        ):
+            if usage_buffer is not None:
+                usages[ns] = NamespaceUsage(usage_buffer, self._lock).as_dict()
+            if stats_buffer is not None:
+                namespace_stats[ns] = NamespaceStats(stats_buffer, self._lock).as_dict()
+        return usages, namespace_stats
+
+    def _scan(self, namespaces: list):
+        """keep the largest names of each of namespaces, with one store listing for all of them"""
+        all_ids = list(self.client.list().keys())
+        for ns in namespaces:
+            ids = records.record_ids(all_ids, [ns])
+            buffers = self.client.get_buffers(ids, timeout_ms=100)
+            self._largest[ns] = heapq.nlargest(
+                self.largest,
+                (
+                    (x["size"], x["name"])
+                    for x in records.unpack_many(buffers)
+                    if x["namespace"] == ns
+                ),
+            )
+
+
+def _bytes(n: int) -> str:
+    for unit in ["B", "KB", "MB", "GB"]:
+        if abs(n) < 1000:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1000
+    return f"{n:.1f} TB"
+
+
+def top(args, ClientClass=BrainClient, out=sys.stdout):
+    """run the top command; prints once with --once, otherwise refreshes until interrupted"""
+    # A BARE CLIENT RATHER THAN A Brain, WHICH WOULD WRITE TO THE STORE IT OBSERVES
+    client = ClientClass(args.path)
+    view = Top(client, args.path, largest=args.largest, scan_interval=args.scan_interval)
+    try:
+        while True:
+            text = view.render(view.tick())
+            if args.once:
+                print(text, file=out)
+                return
+            # CLEAR THE TERMINAL AND DRAW FROM THE TOP LEFT
+            print("\x1b[H\x1b[2J" + text, file=out, flush=True)
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+
+
+def serve(args, ClientClass=BrainClient):
+    """run the serve command: serve a namespace over Arrow Flight until interrupted"""
+    # PYARROW BUILDS WITHOUT FLIGHT CAN STILL RUN THE OTHER COMMANDS
+    from .flight import BrainFlightServer
+
+    brain = Brain(namespace=args.namespace, path=args.path, ClientClass=ClientClass)
+    server = BrainFlightServer(brain, args.location)
+    print(
+        f"serving namespace {args.namespace} of {args.path} at {args.location}, port {server.port}",
+        flush=True,
+    )
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(prog="python -m brain_plasma")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_top = commands.add_parser("top", help="live view of a plasma_store used by Brain")
+    parser_top.add_argument("--path", default="/tmp/plasma", help="plasma_store socket")
+    parser_top.add_argument("--interval", type=float, default=2.0, help="seconds between refreshes")
+    parser_top.add_argument("--scan-interval", type=float, default=30.0, help="least seconds between scans for the largest names")
+    parser_top.add_argument("--largest", type=int, default=10, help="how many of the largest names to show")
+    parser_top.add_argument("--once", action="store_true", help="print one snapshot and exit")
+    parser_top.set_defaults(func=top)
+
+    parser_serve = commands.add_parser("serve", help="serve a namespace to other hosts over Arrow Flight")
+    parser_serve.add_argument("--path", default="/tmp/plasma", help="plasma_store socket")
+    parser_serve.add_argument("--namespace", default="default", help="namespace to serve")
+    parser_serve.add_argument("--location", default="grpc://0.0.0.0:8815", help="Flight location to listen on")
+    parser_serve.set_defaults(func=serve)
+
+    args = parser.parse_args(argv)
+    args.func(args)
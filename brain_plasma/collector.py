@@ -0,0 +1,53 @@
+import threading
+import traceback
+
+
+class Collector:
+    """
+    handle to a background garbage collector started by Brain.start_collector
+
+    attributes:
+        runs    - number of collections done
+        last    - report of the last collection; see Brain.collect
+        objects - objects and spilled files deleted over all runs
+        bytes   - bytes reclaimed over all runs
+    """
+
+    def __init__(self, brain, interval: float, grace: float):
+        self.interval = interval
+        self.grace = grace
+        self.runs = 0
+        self.last = None
+        self.objects = 0
+        self.bytes = 0
+        self._brain = brain
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="brain-collector", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    def stop(self, timeout: float = None):
+        """stop collecting; waits for a collection in progress to finish"""
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                report = self._brain.collect(grace=self.grace)
+            except Exception:
+                traceback.print_exc()
+                continue
+            self.runs += 1
+            self.last = report
+            self.objects += (
+                report["orphaned_objects"]
+                + len(report["dangling_names"])
+                + report["orphaned_files"]
+            )
+            self.bytes += report["bytes"]
@@ -18,6 +18,10 @@ class BrainNamespaceNotExistError(BrainError):
     pass
 
 
+class BrainNamespaceViewError(BrainError):
+    pass
+
+
 class BrainNameNotExistError(BrainError):
     pass
 
@@ -44,3 +48,43 @@ class BrainRemoveOldNameValueError(BrainError):
 
 class BrainUpdateNameError(BrainError):
     pass
+
+
+class BrainMetadataRecordError(BrainError):
+    pass
+
+
+class BrainValueReleasedError(BrainError):
+    pass
+
+
+class BrainSerializerError(BrainError):
+    pass
+
+
+class BrainQuotaExceededError(BrainError):
+    pass
+
+
+class BrainWriteBehindError(BrainError):
+    pass
+
+
+class BrainViewError(BrainError):
+    pass
+
+
+class BrainSharedObjectError(BrainError):
+    pass
+
+
+class BrainLogFullError(BrainError):
+    pass
+
+
+class BrainAppendError(BrainError):
+    pass
+
+
+class BrainSpillError(BrainError):
+    pass
@@ -0,0 +1,240 @@
+import sys
+
+import pyarrow as pa
+from pyarrow import flight, plasma
+
+from . import chunks, serializers, spill
+from .brain import Brain
+from .exceptions import BrainNameTypeError
+
+# ARROW FLIGHT
+#
+# BrainFlightServer serves the names of one Brain namespace to other hosts over Arrow Flight;
+# RemoteBrain talks to it with the same recall/learn API as Brain
+#
+#   list_flights          a FlightInfo per name: descriptor path [name], one endpoint with
+#                         ticket name, and the schema of values stored as Arrow
+#   get_flight_info       the FlightInfo of one name
+#   do_get(ticket name)   streams the value as record batches; values stored as Arrow are sent
+#                         straight out of shared memory, without a copy
+#   do_put(path [name])   learns the uploaded table as name
+#   do_action("forget")   forgets the name in the action body
+#
+# only Arrow Tables and RecordBatches and pandas DataFrames go over the wire; the schema
+# metadata key KIND says whether to hand the table back as a DataFrame, so recall returns the
+# type that was learned, and DESCRIPTION carries the description of a learn
+
+KIND = b"brain_plasma.kind"
+DESCRIPTION = b"brain_plasma.description"
+
+
+def to_table(thing) -> tuple:
+    """
+    (Table, kind) for a Table, RecordBatch or DataFrame, with the index of the DataFrame
+
+    Errors:
+        TypeError
+    """
+    if isinstance(thing, pa.Table):
+        return thing, b"arrow"
+    if isinstance(thing, pa.RecordBatch):
+        return pa.Table.from_batches([thing]), b"arrow"
+    pd = sys.modules.get("pandas")
+    if pd is not None and isinstance(thing, pd.DataFrame):
+        return pa.Table.from_pandas(thing, preserve_index=None), b"pandas"
+    raise TypeError(
+        f"Only Arrow Tables and RecordBatches and DataFrames can be sent over Flight, not {type(thing)}"
+    )
+
+
+def _with_metadata(table: pa.Table, fields: dict) -> pa.Table:
+    """table with fields added to its schema metadata, except None values; no data is copied"""
+    metadata = dict(table.schema.metadata or {})
+    metadata.update({key: value for key, value in fields.items() if value is not None})
+    return table.replace_schema_metadata(metadata)
+
+
+def _without_metadata(table: pa.Table, *keys) -> tuple:
+    """(table without keys in its schema metadata, their values or None)"""
+    metadata = dict(table.schema.metadata or {})
+    values = [metadata.pop(key, None) for key in keys]
+    return table.replace_schema_metadata(metadata or None), values
+
+
+class BrainFlightServer(flight.FlightServerBase):
+    """
+    serve the names of brain's namespace to other hosts over Arrow Flight
+
+    calls are handled on gRPC threads that share brain; serve() blocks until shutdown()
+
+        server = BrainFlightServer(Brain(namespace="features"), "grpc://0.0.0.0:8815")
+        server.serve()
+    """
+
+    def __init__(self, brain: Brain, location: str = "grpc://0.0.0.0:8815", **kwargs):
+        super().__init__(location, **kwargs)
+        self.brain = brain
+
+    def list_flights(self, context, criteria):
+        for metadata in self.brain.metadata(output="list"):
+            yield self._info(metadata)
+
+    def get_flight_info(self, context, descriptor):
+        name = self._name(descriptor)
+        metadata = self.brain.metadata(name)
+        if metadata is None:
+            raise KeyError(f"Name {name} does not exist.")
+        return self._info(metadata)
+
+    def do_get(self, context, ticket):
+        name = ticket.ticket.decode()
+        codec = (self.brain.metadata(name) or {}).get("codec")
+        table = self.brain.recall_table(name)
+        # A TABLE FROM A DATAFRAME CARRIES pandas METADATA, BUT ONLY A LEARNED DATAFRAME GOES BACK AS ONE
+        if b"pandas" in (table.schema.metadata or {}) and codec not in (
+            serializers.ARROW.code,
+            serializers.CHUNKS_CODE,
+        ):
+            kind = b"pandas"
+        else:
+            kind = b"arrow"
+        return flight.RecordBatchStream(_with_metadata(table, {KIND: kind}))
+
+    def do_put(self, context, descriptor, reader, writer):
+        name = self._name(descriptor)
+        table, (kind, description) = _without_metadata(reader.read_all(), KIND, DESCRIPTION)
+        thing = table.to_pandas() if kind == b"pandas" else table
+        self.brain.learn(name, thing, description.decode() if description else None)
+
+    def list_actions(self, context):
+        return [("forget", "forget the name in the action body")]
+
+    def do_action(self, context, action):
+        if action.type != "forget":
+            raise NotImplementedError(f"Unknown action {action.type}")
+        self.brain.forget(action.body.to_pybytes().decode())
+        return []
+
+    def _name(self, descriptor) -> str:
+        if descriptor.descriptor_type != flight.DescriptorType.PATH or len(descriptor.path) != 1:
+            raise KeyError(f"Descriptors are paths of one name, not {descriptor}")
+        return descriptor.path[0].decode()
+
+    def _info(self, metadata: dict) -> flight.FlightInfo:
+        """the FlightInfo of a name; the schema is only known for values stored as Arrow"""
+        name = metadata["name"]
+        schema = pa.schema([])
+        object_id = None
+        if metadata["codec"] in (serializers.PANDAS.code, serializers.ARROW.code):
+            object_id = plasma.ObjectID(metadata["value_id"])
+        elif metadata["codec"] == serializers.CHUNKS_CODE:
+            object_id = chunks.unpack_ids(metadata["extra"])[0]
+        if object_id is not None:
+            if spill.on_disk(metadata):
+                buffer = spill.read(spill.location(metadata))
+            else:
+                buffer = self.brain.client.get_buffers([object_id], timeout_ms=0)[0]
+            if buffer is not None:
+                # ONLY THE SCHEMA MESSAGE AT THE START OF THE STREAM IS READ
+                schema = chunks.schema(buffer)
+        return flight.FlightInfo(
+            schema,
+            flight.FlightDescriptor.for_path(name),
+            [flight.FlightEndpoint(name.encode(), [])],
+            -1,
+            metadata["size"],
+        )
+
+
+class RemoteBrain:
+    """
+    the namespace of a Brain served by BrainFlightServer on another host
+
+    recall and learn like Brain, for Arrow Tables and RecordBatches and pandas DataFrames;
+    recall returns a DataFrame for a name learned as a DataFrame and a Table otherwise
+    """
+
+    def __init__(self, location: str = "grpc://localhost:8815", **kwargs):
+        self.location = location
+        self.client = flight.connect(location, **kwargs)
+
+    def __setitem__(self, name, item):
+        self.learn(name, item)
+
+    def __getitem__(self, name):
+        return self.recall(name)
+
+    def __delitem__(self, name):
+        return self.forget(name)
+
+    def __contains__(self, name):
+        return self.exists(name)
+
+    def __len__(self):
+        return len(self.names())
+
+    def learn(self, name: str, thing, description: str = None):
+        """
+        send a Table, RecordBatch or DataFrame to the server to store as name
+
+        Errors:
+            BrainNameTypeError
+            TypeError
+            pyarrow.flight.FlightError
+        """
+        if not type(name) == str:
+            raise BrainNameTypeError(
+                f'Type of name "{name}" must be str, not {type(name)}'
+            )
+        table, kind = to_table(thing)
+        table = _with_metadata(
+            table, {KIND: kind, DESCRIPTION: description.encode() if description else None}
+        )
+        writer, _ = self.client.do_put(flight.FlightDescriptor.for_path(name), table.schema)
+        writer.write_table(table)
+        writer.close()
+
+    def recall(self, name: str):
+        """
+        get the value of name from the server
+
+        Errors:
+            KeyError
+            pyarrow.flight.FlightError
+        """
+        try:
+            table = self.client.do_get(flight.Ticket(name.encode())).read_all()
+        except KeyError:
+            raise KeyError(f"Name {name} does not exist.")
+        table, (kind,) = _without_metadata(table, KIND)
+        return table.to_pandas() if kind == b"pandas" else table
+
+    def exists(self, name: str) -> bool:
+        try:
+            self.client.get_flight_info(flight.FlightDescriptor.for_path(name))
+        except KeyError:
+            return False
+        return True
+
+    def forget(self, name: str):
+        """delete name on the server; if the name does not exist, doesn't do anything"""
+        list(self.client.do_action(flight.Action("forget", name.encode())))
+
+    def names(self) -> list:
+        return [info.descriptor.path[0].decode() for info in self.client.list_flights()]
+
+    def schema(self, name: str) -> pa.Schema:
+        """
+        the schema of name, if it's stored as Arrow; an empty schema otherwise
+
+        Errors:
+            KeyError
+        """
+        try:
+            info = self.client.get_flight_info(flight.FlightDescriptor.for_path(name))
+        except KeyError:
+            raise KeyError(f"Name {name} does not exist.")
+        return info.schema
+
+    def close(self):
+        self.client.close()
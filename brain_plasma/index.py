@@ -0,0 +1,125 @@
+from bisect import bisect_left, insort
+from fnmatch import fnmatchcase
+import re
+import threading
+from typing import Iterable, List
+
+
+class NameIndex:
+    """
+    sorted index of the names and descriptions in one namespace
+
+    prefix and glob lookups bisect the sorted names, so they cost log(n) plus the matches;
+    descriptions are indexed by word, so a description search scans the distinct words once
+    and only checks the names whose description has a word containing the search term
+
+    the index is only as current as the adds and removes it's given; it has no way to see
+    changes made elsewhere
+    """
+
+    def __init__(self, all_metadata: Iterable[dict] = ()):
+        self._names = []
+        self._descriptions = {}
+        self._words = {}
+        self._lock = threading.Lock()
+        for metadata in all_metadata:
+            self.add(metadata["name"], metadata["description"])
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return name in self._descriptions
+
+    def add(self, name: str, description: str = ""):
+        """add name to the index, or update its description"""
+        with self._lock:
+            if name in self._descriptions:
+                self._remove_words(name)
+            else:
+                insort(self._names, name)
+            self._descriptions[name] = description or ""
+            for word in self._descriptions[name].split():
+                self._words.setdefault(word, set()).add(name)
+
+    def remove(self, name: str):
+        """remove name from the index; does nothing if it isn't there"""
+        with self._lock:
+            if name not in self._descriptions:
+                return
+            self._remove_words(name)
+            del self._descriptions[name]
+            del self._names[bisect_left(self._names, name)]
+
+    def find(
+        self, prefix: str = None, pattern: str = None, description_contains: str = None
+    ) -> List[str]:
+        """
+        return the sorted names that match every criterion given
+
+        prefix: names that start with prefix
+        pattern: names that match a glob pattern, e.g. "user_*_2020"
+        description_contains: names whose description contains the string
+        """
+        with self._lock:
+            # NARROW BY THE LONGEST LITERAL PREFIX AVAILABLE
+            literal = prefix or ""
+            if pattern is not None:
+                pattern_literal = re.split(r"[*?\[]", pattern, maxsplit=1)[0]
+                if pattern_literal.startswith(literal):
+                    literal = pattern_literal
+                elif not literal.startswith(pattern_literal):
+                    return []
+
+            if literal or description_contains is None:
+                names = self._prefix(literal)
+            else:
+                names = self._described(description_contains)
+
+            if prefix is not None:
+                names = [name for name in names if name.startswith(prefix)]
+            if pattern is not None:
+                names = [name for name in names if fnmatchcase(name, pattern)]
+            if description_contains is not None:
+                names = [
+                    name
+                    for name in names
+                    if description_contains in self._descriptions[name]
+                ]
+            return names
+
+    def _prefix(self, prefix: str) -> List[str]:
+        """names that start with prefix, in order"""
+        start = bisect_left(self._names, prefix)
+        names = []
+        for name in self._names[start:]:
+            if not name.startswith(prefix):
+                break
+            names.append(name)
+        return names
+
+    def _described(self, term: str) -> List[str]:
+        """
+        names that may have term in their description, in order
+
+        any substring of a description contains a piece of one of its words,
+        so only names indexed under words containing the longest word of term are candidates;
+        finding those words is a linear scan of the distinct words
+        """
+        pieces = term.split()
+        if not pieces:
+            return list(self._names)
+        piece = max(pieces, key=len)
+        names = set()
+        for word, word_names in self._words.items():
+            if piece in word:
+                names.update(word_names)
+        return sorted(names)
+
+    def _remove_words(self, name: str):
+        for word in self._descriptions[name].split():
+            word_names = self._words.get(word)
+            if word_names is not None:
+                word_names.discard(name)
+                if not word_names:
+                    del self._words[word]
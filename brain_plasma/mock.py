@@ -1,3 +1,11 @@
+from collections import Counter, OrderedDict
+import pickle
+import random
+import threading
+import time
+import weakref
+
+import pyarrow as pa
 from pyarrow import plasma
 
 
@@ -9,23 +17,277 @@ class MockPlasmaClient:
     def __init__(self, path):
         self.path = path
         self.data = {}
+        self.raw = set()
 
     def get(self, value_id, *args, **kwargs):
         if isinstance(value_id, list):
-            return [self.data[x] for x in value_id]
+            return [self._value(x) for x in value_id]
+        return self._value(value_id)
+
+    def _value(self, value_id):
+        # RAW OBJECTS HOLD SERIALIZED BYTES, LIKE THE BUFFERS OF put() OBJECTS BELOW
+        if value_id in self.raw:
+            return self.deserialize(self.data[value_id])
         return self.data[value_id]
 
+    def deserialize(self, buffer):
+        return pickle.loads(buffer)
+
     def put(self, thing, value_id):
         self.data[value_id] = thing
+        self.raw.discard(value_id)
+
+    def create(self, object_id, data_size, *args, **kwargs):
+        self.data[object_id] = bytearray(data_size)
+        self.raw.add(object_id)
+        return pa.py_buffer(self.data[object_id])
+
+    def seal(self, object_id):
+        pass
+
+    def put_raw_buffer(self, value, object_id=None, *args, **kwargs):
+        self.data[object_id] = bytearray(value)
+        self.raw.add(object_id)
+
+    def get_buffers(self, object_ids, *args, **kwargs):
+        return [self._buffer(self.data[x]) if x in self.data else None for x in object_ids]
+
+    def _buffer(self, thing):
+        # OBJECTS STORED WITH put() ARE SERIALIZED LIKE PLASMA WOULD HAVE
+        if isinstance(thing, (bytes, bytearray)):
+            return pa.py_buffer(thing)
+        return pa.py_buffer(pickle.dumps(thing))
 
     def list(self):
-        return {key: {"data_size": val.__sizeof__()} for key, val in self.data.items()}
+        # A COPY, SO THREADS THAT STORE OBJECTS MEANWHILE DON'T BREAK THE ITERATION
+        return {key: {"data_size": val.__sizeof__()} for key, val in list(self.data.items())}
 
     def delete(self, value_id):
-        self.data.pop(value_id[0])
+        for x in value_id:
+            self.data.pop(x, None)
+            self.raw.discard(x)
 
     def store_capacity(self):
         return 10000
 
     def contains(self, value_id):
         return value_id in self.data
+
+
+class SimulatedPlasmaClient:
+    """
+    an in-process stand-in for a plasma_store client that behaves like the real store
+    closely enough for load tests and round-trip assertions
+
+    - objects take real bytes against capacity; when a new object doesn't fit, the least
+      recently used objects that nobody holds a buffer of are evicted (evict=True, like
+      plasma_store), otherwise or if that's not enough plasma.PlasmaStoreFull is raised
+    - batch calls act on every id; deleting a missing id does nothing; deleting an object
+      somebody holds a buffer of is deferred until the last buffer is released
+    - put of an existing id raises plasma.PlasmaObjectExists and get of a missing id
+      returns plasma.ObjectNotAvailable
+    - every call sleeps latency seconds plus up to jitter more, and is counted in calls
+
+    clients made with the same path share one simulated store, like clients of one socket
+    """
+
+    _stores = {}
+    _stores_lock = threading.Lock()
+
+    def __init__(
+        self,
+        path,
+        capacity: int = 1_000_000_000,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        evict: bool = True,
+    ):
+        self.path = path
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = Counter()
+        with self._stores_lock:
+            if path not in self._stores:
+                self._stores[path] = _SimulatedStore(capacity, evict)
+            self.store = self._stores[path]
+
+    @classmethod
+    def reset(cls, path=None):
+        """drop the simulated store at path, or all of them"""
+        with cls._stores_lock:
+            if path is None:
+                cls._stores.clear()
+            else:
+                cls._stores.pop(path, None)
+
+    def _call(self, name: str):
+        self.calls[name] += 1
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+    def get(self, object_ids, timeout_ms=-1, *args, **kwargs):
+        self._call("get")
+        if isinstance(object_ids, list):
+            return [self._get(x) for x in object_ids]
+        return self._get(object_ids)
+
+    def _get(self, object_id):
+        data = self.store.read(object_id)
+        if data is None:
+            return plasma.ObjectNotAvailable
+        return self.deserialize(data)
+
+    def deserialize(self, buffer):
+        return pickle.loads(buffer)
+
+    def put(self, thing, object_id=None, *args, **kwargs):
+        self._call("put")
+        object_id = object_id or plasma.ObjectID.from_random()
+        self.store.add(object_id, bytearray(pickle.dumps(thing)))
+        return object_id
+
+    def put_raw_buffer(self, value, object_id=None, *args, **kwargs):
+        self._call("put_raw_buffer")
+        object_id = object_id or plasma.ObjectID.from_random()
+        self.store.add(object_id, bytearray(value))
+        return object_id
+
+    def create(self, object_id, data_size, *args, **kwargs):
+        self._call("create")
+        data = bytearray(data_size)
+        self.store.add(object_id, data, sealed=False)
+        return self.store.hold(object_id, pa.py_buffer(data))
+
+    def seal(self, object_id):
+        self._call("seal")
+        self.store.seal(object_id)
+
+    def get_buffers(self, object_ids, timeout_ms=-1, *args, **kwargs):
+        self._call("get_buffers")
+        buffers = []
+        for object_id in object_ids:
+            data = self.store.read(object_id)
+            buffers.append(
+                None if data is None else self.store.hold(object_id, pa.py_buffer(data))
+            )
+        return buffers
+
+    def contains(self, object_id):
+        self._call("contains")
+        return self.store.contains(object_id)
+
+    def delete(self, object_ids):
+        self._call("delete")
+        self.store.delete(object_ids)
+
+    def list(self):
+        self._call("list")
+        return self.store.list()
+
+    def store_capacity(self):
+        self._call("store_capacity")
+        return self.store.capacity
+
+    def disconnect(self):
+        self._call("disconnect")
+
+
+class _SimulatedStore:
+    """the objects and byte accounting of one simulated plasma_store"""
+
+    def __init__(self, capacity: int, evict: bool):
+        self.capacity = capacity
+        self.evict = evict
+        self.used = 0
+        self.evicted = 0
+        # OBJECT ID -> [DATA, SEALED, REF COUNT, CREATE TIME, DELETE PENDING]; LEAST RECENTLY USED FIRST
+        self._objects = OrderedDict()
+        self._lock = threading.RLock()
+
+    def add(self, object_id, data: bytearray, sealed: bool = True):
+        with self._lock:
+            if object_id in self._objects:
+                raise plasma.PlasmaObjectExists(f"object {object_id} already exists")
+            self._make_room(len(data))
+            self._objects[object_id] = [data, sealed, 0, int(time.time()), False]
+            self.used += len(data)
+
+    def _make_room(self, size: int):
+        if self.used + size <= self.capacity:
+            return
+        if self.evict:
+            for object_id in list(self._objects):
+                if self.used + size <= self.capacity:
+                    break
+                data, sealed, refs, _, _ = self._objects[object_id]
+                if sealed and refs == 0:
+                    self._remove(object_id)
+                    self.evicted += 1
+        if self.used + size > self.capacity:
+            raise plasma.PlasmaStoreFull(
+                f"object of {size} bytes doesn't fit; {self.used} of {self.capacity} bytes used"
+            )
+
+    def read(self, object_id):
+        """the data of a sealed object, marked as recently used; None if missing"""
+        with self._lock:
+            entry = self._objects.get(object_id)
+            if entry is None or not entry[1]:
+                return None
+            self._objects.move_to_end(object_id)
+            return entry[0]
+
+    def hold(self, object_id, buffer):
+        """count buffer as a reference to object_id until it's garbage collected"""
+        with self._lock:
+            self._objects[object_id][2] += 1
+        weakref.finalize(buffer, self._release, object_id)
+        return buffer
+
+    def _release(self, object_id):
+        with self._lock:
+            entry = self._objects.get(object_id)
+            if entry is None:
+                return
+            entry[2] -= 1
+            if entry[2] == 0 and entry[4]:
+                self._remove(object_id)
+
+    def seal(self, object_id):
+        with self._lock:
+            self._objects[object_id][1] = True
+
+    def contains(self, object_id) -> bool:
+        with self._lock:
+            entry = self._objects.get(object_id)
+            return entry is not None and entry[1]
+
+    def delete(self, object_ids):
+        with self._lock:
+            for object_id in object_ids:
+                entry = self._objects.get(object_id)
+                if entry is None:
+                    continue
+                if entry[2] > 0:
+                    entry[4] = True
+                else:
+                    self._remove(object_id)
+
+    def _remove(self, object_id):
+        data = self._objects.pop(object_id)[0]
+        self.used -= len(data)
+
+    def list(self) -> dict:
+        with self._lock:
+            return {
+                object_id: {
+                    "data_size": len(data),
+                    "metadata_size": 0,
+                    "ref_count": refs,
+                    "create_time": create_time,
+                    "construct_duration": 0,
+                    "state": "sealed" if sealed else "created",
+                }
+                for object_id, (data, sealed, refs, create_time, _) in self._objects.items()
+            }
@@ -0,0 +1,43 @@
+import os
+
+# PARALLEL MAP
+#
+# Brain.map runs fn over stored names in a pool of worker processes; only names and options
+# go through the pool's pipes: each worker opens its own Brain on the same plasma_store once,
+# recalls each name zero-copy from shared memory, and either learns fn's result back into the
+# store or sends it back to the caller
+
+# THE BRAIN OF THIS WORKER PROCESS, OPENED BY start_worker
+_brain = None
+
+
+def start_worker(BrainClass, options: dict):
+    """pool initializer: open this worker's Brain on the caller's plasma_store"""
+    global _brain
+    _brain = BrainClass(**options)
+
+
+def run(fn, names: list, namespace: str, out_namespace: str) -> list:
+    """run fn over a chunk of names in this worker"""
+    return [apply(_brain, fn, name, namespace, out_namespace) for name in names]
+
+
+def apply(brain, fn, name: str, namespace: str, out_namespace: str):
+    """fn of the value of name; learned as name in out_namespace and None returned, if given"""
+    result = fn(brain._recall(name, namespace))
+    if out_namespace is None:
+        return result
+    brain._learn(name, result, None, out_namespace)
+
+
+def chunks(names: list, processes: int) -> list:
+    """names split into about four chunks per process, so uneven work still balances"""
+    size = max(1, -(-len(names) // (processes * 4)))
+    return [names[start : start + size] for start in range(0, len(names), size)]
+
+
+def pool_size(processes: int = None) -> int:
+    """processes, or one per CPU if None"""
+    if processes is None:
+        return os.cpu_count() or 1
+    return processes
@@ -0,0 +1,60 @@
+from pyarrow import plasma
+
+from .exceptions import BrainValueReleasedError
+
+
+class PinnedValue:
+    """
+    a recalled value that keeps its plasma object pinned in the store until released
+
+    plasma does not reclaim an object while a client holds a buffer to it, so the value
+    stays readable (and zero-copy views of it stay valid) even if another process
+    updates or forgets the name in the meantime
+
+    use as a context manager, or call release() when done:
+
+        with brain.pin("this") as value:
+            ...
+
+    note: a zero-copy value (e.g. a NumPy array) holds its own reference to the buffer;
+    the object is only reclaimed once both the handle is released and the value is dropped
+    """
+
+    def __init__(self, name: str, value_id: plasma.ObjectID, buffer, value):
+        self.name = name
+        self.value_id = value_id
+        self._buffer = buffer
+        self._value = value
+
+    @property
+    def released(self) -> bool:
+        return self._buffer is None
+
+    @property
+    def value(self):
+        """
+        the pinned value
+
+        Errors:
+            BrainValueReleasedError
+        """
+        if self.released:
+            raise BrainValueReleasedError(
+                f"Value for name {self.name} at {self.value_id} was released"
+            )
+        return self._value
+
+    def release(self):
+        """drop the references to the pinned buffer so plasma can reclaim it; safe to call twice"""
+        self._value = None
+        self._buffer = None
+
+    def __enter__(self):
+        return self.value
+
+    def __exit__(self, *args):
+        self.release()
+
+    def __repr__(self):
+        state = "released" if self.released else "pinned"
+        return f"<PinnedValue {self.name} {state}>"
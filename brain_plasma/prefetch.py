@@ -0,0 +1,53 @@
+import concurrent.futures
+import mmap
+import threading
+
+import numpy as np
+
+
+class Prefetch:
+    """
+    handle to a background warm-up started by Brain.prefetch
+
+    attributes:
+        loaded  - names whose values are now held by the Brain
+        skipped - names that were gone from the store or didn't fit in max_bytes
+        errors  - {name: exception} for names that failed to load
+        bytes   - bytes of store objects held for the loaded names
+    """
+
+    def __init__(self, max_bytes: int = None):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.loaded = []
+        self.skipped = []
+        self.errors = {}
+        self._futures = []
+        self._lock = threading.Lock()
+
+    def done(self) -> bool:
+        """whether every name has been processed"""
+        return all(future.done() for future in self._futures)
+
+    def wait(self, timeout: float = None) -> "Prefetch":
+        """block until every name has been processed or timeout seconds have passed"""
+        concurrent.futures.wait(self._futures, timeout=timeout)
+        return self
+
+    def _reserve(self, size: int) -> bool:
+        """account for size more bytes; False if that would go over max_bytes"""
+        with self._lock:
+            if self.max_bytes is not None and self.bytes + size > self.max_bytes:
+                return False
+            self.bytes += size
+            return True
+
+    def __repr__(self):
+        state = "done" if self.done() else "running"
+        return f"<Prefetch {state} loaded={len(self.loaded)} bytes={self.bytes}>"
+
+
+def touch(buffer):
+    """read one byte of every page of buffer so the pages are mapped into this process"""
+    if buffer.size:
+        np.frombuffer(buffer, dtype=np.uint8)[:: mmap.PAGESIZE].sum()
@@ -0,0 +1,174 @@
+import json
+
+import numpy as np
+
+from .exceptions import BrainLogFullError, BrainSharedObjectError
+from .serializers import descr_from_json
+from .shared import SharedFields, StoreLock, writable_view
+
+# SHARED COUNTERS AND LOGS
+#
+# fixed-layout objects that every process updates in place under the StoreLock, instead of
+# recalling, changing and learning the whole value again
+#
+#   counter     int64 value
+#   log         int64 count | int64 capacity | capacity records of the log's dtype
+#
+# a log's dtype and capacity are kept in the extra bytes of its metadata record as JSON;
+# a record is written before the count that makes it visible, so readers never see a
+# half-written record
+
+LOG_HEADER = 16
+
+
+def counter_size() -> int:
+    return 8
+
+
+def log_spec(dtype, capacity: int) -> bytes:
+    """
+    encode the layout of a log for its metadata record; checks that it decodes to the same
+    dtype, so a log is never created with a layout it can't be read back with
+
+    Errors:
+        BrainSharedObjectError
+    """
+    try:
+        dtype = np.dtype(dtype)
+        spec = json.dumps(
+            {"dtype": np.lib.format.dtype_to_descr(dtype), "capacity": capacity}
+        ).encode()
+        same = not dtype.hasobject and log_dtype(spec) == dtype
+    except (TypeError, ValueError) as e:
+        raise BrainSharedObjectError(f"Logs can't store records of dtype {dtype}: {e}")
+    if not same:
+        raise BrainSharedObjectError(f"Logs can't store records of dtype {dtype}")
+    return spec
+
+
+def log_dtype(extra: bytes) -> np.dtype:
+    """the record dtype of a log from its metadata record's extra bytes"""
+    descr = json.loads(extra)["dtype"]
+    return np.lib.format.descr_to_dtype(descr_from_json(descr))
+
+
+def log_size(dtype, capacity: int) -> int:
+    return LOG_HEADER + np.dtype(dtype).itemsize * capacity
+
+
+def init_counter(buffer, initial: int):
+    """write the initial layout into a newly created, not yet sealed counter object"""
+    np.frombuffer(buffer, dtype=np.int64)[0] = initial
+
+
+def init_log(buffer, capacity: int):
+    """write the initial layout into a newly created, not yet sealed log object"""
+    np.frombuffer(buffer, dtype=np.int64, count=2)[:] = [0, capacity]
+
+
+def read(codec_is_log: bool, buffer, extra: bytes):
+    """
+    the current value of a counter (int) or log (read-only array of its records, zero-copy)
+    """
+    if not codec_is_log:
+        return int(np.frombuffer(buffer, dtype=np.int64)[0])
+    count, _ = np.frombuffer(buffer, dtype=np.int64, count=2)
+    records = np.frombuffer(buffer, dtype=log_dtype(extra), count=count, offset=LOG_HEADER)
+    records.flags.writeable = False
+    return records
+
+
+class SharedCounter(SharedFields):
+    """
+    an int64 in shared memory that every process can change in place
+
+    each update takes the StoreLock once, so incr(n) is the way to add many at once
+    """
+
+    def __init__(self, name: str, buffer, lock: StoreLock):
+        super().__init__(buffer, lock)
+        self.name = name
+
+    def __repr__(self):
+        return f"<SharedCounter {self.name}={self.value}>"
+
+    @property
+    def value(self) -> int:
+        return int(self._fields[0])
+
+    def incr(self, n: int = 1) -> int:
+        """add n and return the new value"""
+        with self._lock:
+            self._fields[0] += n
+            return int(self._fields[0])
+
+    def decr(self, n: int = 1) -> int:
+        """subtract n and return the new value"""
+        return self.incr(-n)
+
+    def set(self, value: int):
+        with self._lock:
+            self._fields[0] = value
+
+
+class SharedLog:
+    """
+    an append-only array of fixed-size records in shared memory that every process can append to
+
+    records are NumPy scalars or tuples of the log's dtype; records() is a zero-copy view
+    of the ones appended so far
+    """
+
+    def __init__(self, name: str, buffer, lock: StoreLock, dtype):
+        self.name = name
+        self._buffer = buffer
+        self._header = writable_view(buffer, np.uint8)[:LOG_HEADER].view(np.int64)
+        self.dtype = np.dtype(dtype)
+        self.capacity = int(self._header[1])
+        self._records = writable_view(buffer, np.uint8)[LOG_HEADER:].view(self.dtype)
+        self._lock = lock
+
+    def __repr__(self):
+        return f"<SharedLog {self.name} {len(self)}/{self.capacity} of {self.dtype}>"
+
+    def __len__(self):
+        return int(self._header[0])
+
+    def append(self, record) -> int:
+        """
+        append one record and return its position
+
+        Errors:
+            BrainLogFullError
+        """
+        with self._lock:
+            i = int(self._header[0])
+            if i >= self.capacity:
+                raise BrainLogFullError(f"Log {self.name} is full at {self.capacity} records")
+            self._records[i] = record
+            self._header[0] = i + 1
+            return i
+
+    def extend(self, records) -> int:
+        """
+        append many records with one lock and return the position of the first
+
+        Errors:
+            BrainLogFullError
+        """
+        records = np.asarray(records, dtype=self.dtype)
+        with self._lock:
+            i = int(self._header[0])
+            if i + len(records) > self.capacity:
+                raise BrainLogFullError(
+                    f"Log {self.name} has room for {self.capacity - i} more records, not {len(records)}"
+                )
+            self._records[i : i + len(records)] = records
+            self._header[0] = i + len(records)
+            return i
+
+    def records(self) -> np.ndarray:
+        """read-only view of the records appended so far"""
+        records = self._records[: len(self)]
+        records.flags.writeable = False
+        return records
@@ -0,0 +1,240 @@
+import struct
+from typing import ByteString, Dict, Iterable, List
+
+import numpy as np
+
+from .exceptions import BrainMetadataRecordError
+from .shared import writable_view
+
+# METADATA RECORD FORMAT
+#
+# every name's metadata is stored as one raw plasma buffer instead of a serialized dict
+#
+#   fixed-width header (little-endian, 74 bytes)
+#       magic           4s      b"BPMR"
+#       version         uint8
+#       tier            uint8   where the value is: 0 in the store, 1 spilled to disk (see brain_plasma.spill)
+#       name_len        uint16
+#       namespace_len   uint8
+#       codec           uint8   serializer the value was stored with, see brain_plasma.serializers
+#       description_len uint32
+#       extra_len       uint32
+#       size            uint64  bytes the value and this record take in the store
+#       learned_at      float64 unix time the value was learned
+#       value_id        20s
+#       metadata_id     20s
+#   variable-width tail
+#       name | namespace | description    (utf-8)
+#       extra                               (bytes the value's codec keeps about it, e.g. a view spec;
+#                                            for a value spilled to disk, the path of its file)
+#
+# the ids and string lengths live at fixed offsets, so listing or resolving names only
+# needs to slice a memoryview of each buffer; the description sits at the end of the tail
+# and is never touched unless the full record is asked for
+#
+# plasma keeps an object deleted while a reader holds it until it's released, and it can
+# still be got until then; a deleted record's magic is overwritten with b"BPMF" so it
+# reads as missing
+
+RECORD_MAGIC = b"BPMR"
+FORGOTTEN_MAGIC = b"BPMF"
+RECORD_VERSION = 1
+HEADER = struct.Struct("<4sBBHBBIIQd20s20s")
+
+
+def record_ids(object_ids: Iterable, namespaces: Iterable[str]) -> list:
+    """
+    the ids among object_ids that can be metadata records of namespaces
+
+    records are stored at ids prefixed with their namespace; Brain's own objects
+    (prefixed b"brain_", which no namespace can start with) are skipped
+    """
+    prefixes = tuple(namespace.encode() for namespace in namespaces)
+    return [
+        x
+        for x in object_ids
+        if x.binary().startswith(prefixes) and not x.binary().startswith(b"brain_")
+    ]
+
+
+def pack(metadata: dict) -> bytes:
+    """
+    encode a metadata dict into a compact record
+
+    Errors:
+        BrainMetadataRecordError
+    """
+    name = metadata["name"].encode()
+    namespace = metadata["namespace"].encode()
+    description = (metadata.get("description") or "").encode()
+    extra = metadata.get("extra") or b""
+    if len(name) > 0xFFFF:
+        raise BrainMetadataRecordError(
+            f"Name is too long to store; {len(name)} bytes > {0xFFFF}"
+        )
+    header = HEADER.pack(
+        RECORD_MAGIC,
+        RECORD_VERSION,
+        metadata.get("tier", 0),
+        len(name),
+        len(namespace),
+        metadata.get("codec", 0),
+        len(description),
+        len(extra),
+        metadata.get("size", 0),
+        metadata.get("learned_at", 0.0),
+        metadata["value_id"],
+        metadata["metadata_id"],
+    )
+    return b"".join([header, name, namespace, description, extra])
+
+
+def packed_size(metadata: dict) -> int:
+    """the length of the record metadata packs into"""
+    return (
+        HEADER.size
+        + len(metadata["name"].encode())
+        + len(metadata["namespace"].encode())
+        + len((metadata.get("description") or "").encode())
+        + len(metadata.get("extra") or b"")
+    )
+
+
+def mark_forgotten(buffer):
+    """
+    overwrite the magic of a record in the store, which was just deleted, so it reads as missing
+
+    hold the StoreLock
+    """
+    writable_view(buffer, np.uint8)[: len(FORGOTTEN_MAGIC)] = np.frombuffer(
+        FORGOTTEN_MAGIC, np.uint8
+    )
+
+
+def forgotten(buffer: ByteString) -> bool:
+    """whether a record was forgotten; see mark_forgotten"""
+    return bytes(memoryview(buffer)[: len(FORGOTTEN_MAGIC)]) == FORGOTTEN_MAGIC
+
+
+def _header(view: memoryview) -> tuple:
+    """
+    read the fixed-width header of a record; None if it was forgotten
+
+    Errors:
+        BrainMetadataRecordError
+    """
+    if len(view) < HEADER.size:
+        raise BrainMetadataRecordError("Buffer is too short to be a metadata record")
+    header = HEADER.unpack_from(view)
+    if header[0] == FORGOTTEN_MAGIC:
+        return None
+    if header[0] != RECORD_MAGIC:
+        raise BrainMetadataRecordError(
+            f"Buffer is not a metadata record; magic is {header[0]}"
+        )
+    if header[1] != RECORD_VERSION:
+        raise BrainMetadataRecordError(
+            f"Unsupported metadata record version {header[1]}"
+        )
+    return header
+
+
+def unpack(buffer: ByteString) -> dict:
+    """
+    decode a record into the metadata dict that Brain.metadata returns; None if it was forgotten
+
+    Errors:
+        BrainMetadataRecordError
+    """
+    view = memoryview(buffer)
+    header = _header(view)
+    if header is None:
+        return None
+    (
+        _,
+        _,
+        tier,
+        name_len,
+        namespace_len,
+        codec,
+        description_len,
+        extra_len,
+        size,
+        learned_at,
+        value_id,
+        metadata_id,
+    ) = header
+    start = HEADER.size
+    name = str(view[start : start + name_len], "utf-8")
+    start += name_len
+    namespace = str(view[start : start + namespace_len], "utf-8")
+    start += namespace_len
+    description = str(view[start : start + description_len], "utf-8")
+    start += description_len
+    extra = bytes(view[start : start + extra_len])
+    return {
+        "name": name,
+        "value_id": value_id,
+        "description": description,
+        "metadata_id": metadata_id,
+        "namespace": namespace,
+        "codec": codec,
+        "size": size,
+        "learned_at": learned_at,
+        "extra": extra,
+        "tier": tier,
+    }
+
+
+def unpack_name(buffer: ByteString, namespace: str = None) -> str:
+    """
+    decode only the name of a record
+
+    returns None if namespace is given and the record belongs to another namespace, or if
+    the record was forgotten
+    """
+    view = memoryview(buffer)
+    header = _header(view)
+    if header is None:
+        return None
+    name_len, namespace_len = header[3], header[4]
+    start = HEADER.size
+    if namespace is not None:
+        ns_start = start + name_len
+        if view[ns_start : ns_start + namespace_len] != namespace.encode():
+            return None
+    return str(view[start : start + name_len], "utf-8")
+
+
+def unpack_many(buffers: Iterable[ByteString]) -> List[dict]:
+    """decode many records; skips buffers that are missing and records that were forgotten"""
+    unpacked = (unpack(buffer) for buffer in buffers if buffer is not None)
+    return [metadata for metadata in unpacked if metadata is not None]
+
+
+def unpack_names(buffers: Iterable[ByteString], namespace: str = None) -> List[str]:
+    """
+    decode the names of many records without decoding the rest of each record
+
+    if namespace is given, only names in that namespace are returned
+    """
+    names = (unpack_name(buffer, namespace) for buffer in buffers if buffer is not None)
+    return [name for name in names if name is not None]
+
+
+def group_names(buffers: Iterable[ByteString]) -> Dict[str, List[str]]:
+    """decode the names and namespaces of many records into {namespace: [names]}"""
+    grouped = {}
+    for buffer in buffers:
+        if buffer is None:
+            continue
+        view = memoryview(buffer)
+        header = _header(view)
+        if header is None:
+            continue
+        name_len, namespace_len = header[3], header[4]
+        start = HEADER.size
+        name = str(view[start : start + name_len], "utf-8")
+        namespace = str(view[start + name_len : start + name_len + namespace_len], "utf-8")
+        grouped.setdefault(namespace, []).append(name)
+    return grouped
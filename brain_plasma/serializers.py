@@ -0,0 +1,528 @@
+import json
+import pickle
+import struct
+import sys
+
+import numpy as np
+
+import pyarrow as pa
+from pyarrow import plasma
+
+from .exceptions import BrainSerializerError
+
+# SERIALIZERS
+#
+# every value is stored with one serializer; its code is kept in the name's metadata record
+# so recall knows how to read the value back
+#
+#   0   plasma  PlasmaClient.put / PlasmaClient.get (pyarrow serialization); works for anything
+#   1   pandas  a DataFrame converted to an Arrow table once and written as an Arrow IPC stream
+#               straight into the plasma buffer; read back zero-copy where the dtypes allow
+#               only used for frames with object or categorical columns: all-numeric frames are
+#               already stored block-by-block and read zero-copy by the plasma serializer, faster
+#               (see benchmarks/pandas_serializer.py)
+#   2   view    no value object of its own: a slice of another name, see Brain.learn_view
+#   3   counter a fixed-layout int64 updated in place, see Brain.counter
+#   4   log     a fixed-layout append-only array of records updated in place, see Brain.log
+#   5   chunks  an Arrow table stored as one IPC stream object per appended chunk, see Brain.append
+#   6   slab    a small pickled value packed with its record into a shared slab, see brain_plasma.slabs
+#   7   pickle5 pickle protocol 5 with out-of-band buffers written straight into the plasma object;
+#               NumPy arrays, DataFrame blocks etc. come back as zero-copy views of it
+#   8   arrow   a pyarrow Table written as an Arrow IPC stream straight into the plasma buffer and
+#               read back as a Table over it, without a copy
+#   9   sparse  a scipy.sparse CSR, CSC or COO matrix or array: each component array (data,
+#               indices, indptr or coords) is its own segment of the object, next to a JSON header
+#               with the class and the rest of its state; recall rebuilds the matrix around
+#               read-only views of the segments in constant time, without checking or copying them
+#   10  ndarray a NumPy array with a structured dtype (or a record array): its bytes are one segment,
+#               next to a JSON header with the dtype descriptor and shape; recall is a view of them
+#
+# more serializers can be registered with register(); codes below 100 are reserved
+#
+# a serializer has a unique int code and str name and three methods:
+#   accepts(thing) -> bool
+#   put(client, thing, object_id) -> int      stores thing as object_id; returns the code it used
+#   get(client, object_id, timeout_ms) -> thing
+# and may have a fourth, which lets learn check quotas before anything is stored:
+#   size(thing) -> int                        bytes put will take in the store, measured or estimated
+
+
+class PlasmaSerializer:
+    """store values with the plasma client's own serialization"""
+
+    code = 0
+    name = "plasma"
+
+    def accepts(self, thing) -> bool:
+        return True
+
+    def size(self, thing) -> int:
+        # THE SAME SERIALIZATION PlasmaClient.put DOES; IT REFERENCES THE DATA WITHOUT COPYING IT
+        return pa.lib._serialize(thing, None).total_bytes
+
+    def put(self, client, thing, object_id: plasma.ObjectID) -> int:
+        client.put(thing, object_id)
+        return self.code
+
+    def get(self, client, object_id: plasma.ObjectID, timeout_ms: int = 100):
+        return client.get(object_id, timeout_ms=timeout_ms)
+
+
+class PandasSerializer:
+    """
+    store pandas DataFrames as Arrow IPC streams
+
+    categoricals are stored dictionary-encoded and the index is preserved;
+    on recall, string, categorical and nullable columns are copied into pandas memory, and
+    numeric columns without nulls are read-only views on the store
+    """
+
+    code = 1
+    name = "pandas"
+
+    def accepts(self, thing) -> bool:
+        # PANDAS ISN'T A DEPENDENCY; IF IT WASN'T IMPORTED, THING CAN'T BE A DATAFRAME
+        pd = sys.modules.get("pandas")
+        if pd is None or not isinstance(thing, pd.DataFrame):
+            return False
+        return any(
+            dtype == object or isinstance(dtype, pd.CategoricalDtype)
+            for dtype in thing.dtypes
+        )
+
+    def size(self, thing) -> int:
+        """estimated from the frame's memory; converting it to measure would double the work"""
+        return int(thing.memory_usage(index=True, deep=True).sum())
+
+    def put(self, client, thing, object_id: plasma.ObjectID) -> int:
+        """
+        write the frame into a plasma buffer; returns the code of the serializer used
+
+        frames that Arrow can't convert (e.g. mixed-type object columns) are stored with
+        the plasma serializer instead
+        """
+        try:
+            table = pa.Table.from_pandas(thing, preserve_index=None)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, ValueError):
+            return PLASMA.put(client, thing, object_id)
+
+        put_arrow(client, table, object_id)
+        return self.code
+
+    def get(self, client, object_id: plasma.ObjectID, timeout_ms: int = 100):
+        buffer = client.get_buffers([object_id], timeout_ms=timeout_ms)[0]
+        if buffer is None:
+            return plasma.ObjectNotAvailable
+        table = pa.ipc.open_stream(buffer).read_all()
+        # accepts() ONLY PICKS FRAMES WITH STRING OR CATEGORICAL COLUMNS, WHICH ARROW ALWAYS
+        # COPIES; WITH ONE BLOCK PER COLUMN THE NUMERIC COLUMNS WITHOUT NULLS ARE STILL VIEWS
+        return table.to_pandas(split_blocks=True, self_destruct=False)
+
+
+class ArrowSerializer:
+    """store pyarrow Tables as Arrow IPC streams; recall reads them back zero-copy"""
+
+    code = 8
+    name = "arrow"
+
+    def accepts(self, thing) -> bool:
+        return isinstance(thing, pa.Table)
+
+    def size(self, thing) -> int:
+        return arrow_size(thing)
+
+    def put(self, client, thing, object_id: plasma.ObjectID) -> int:
+        put_arrow(client, thing, object_id)
+        return self.code
+
+    def get(self, client, object_id: plasma.ObjectID, timeout_ms: int = 100):
+        buffer = client.get_buffers([object_id], timeout_ms=timeout_ms)[0]
+        if buffer is None:
+            return plasma.ObjectNotAvailable
+        return pa.ipc.open_stream(buffer).read_all()
+
+
+class Pickle5Serializer:
+    """
+    store values with pickle protocol 5, writing out-of-band buffers straight into plasma
+
+    the object is laid out as
+        uint32 count | count x uint64 segment length | segments, each aligned to 64 bytes
+    where the first segment is the pickle stream and the rest are its out-of-band buffers;
+    get hands pickle read-only views of the segments, so buffers are never copied
+    """
+
+    code = 7
+    name = "pickle5"
+
+    def accepts(self, thing) -> bool:
+        return True
+
+    def size(self, thing) -> int:
+        return segments_size(self._segments(thing))
+
+    def put(self, client, thing, object_id: plasma.ObjectID) -> int:
+        # COPY EACH SEGMENT ONCE, FROM WHERE PICKLE LEFT IT INTO SHARED MEMORY
+        put_segments(client, self._segments(thing), object_id)
+        return self.code
+
+    def _segments(self, thing) -> list:
+        buffers = []
+        data = pickle.dumps(thing, protocol=5, buffer_callback=buffers.append)
+        return [memoryview(data)] + [x.raw() for x in buffers]
+
+    def get(self, client, object_id: plasma.ObjectID, timeout_ms: int = 100):
+        segments = get_segments(client, object_id, timeout_ms)
+        if segments is plasma.ObjectNotAvailable:
+            return segments
+        return pickle.loads(segments[0], buffers=segments[1:])
+
+
+class SparseSerializer:
+    """
+    store scipy.sparse CSR, CSC and COO matrices and arrays as one segment per component
+
+    recall puts the matrix back together the way unpickling it would, from its class and
+    state, so it takes constant time: scipy's constructors would check the indices and
+    copy int64 indices down to int32, which takes time in the number of stored values;
+    the components are read-only views of the store
+    """
+
+    code = 9
+    name = "sparse"
+    classes = {
+        "csr_matrix",
+        "csc_matrix",
+        "coo_matrix",
+        "csr_array",
+        "csc_array",
+        "coo_array",
+    }
+
+    def accepts(self, thing) -> bool:
+        # SCIPY ISN'T A DEPENDENCY; IF IT WASN'T IMPORTED, THING CAN'T BE A SPARSE MATRIX
+        sparse = sys.modules.get("scipy.sparse")
+        if sparse is None or not sparse.issparse(thing):
+            return False
+        name = type(thing).__name__
+        return name in self.classes and getattr(sparse, name) is type(thing)
+
+    def size(self, thing) -> int:
+        return segments_size(self._segments(thing))
+
+    def put(self, client, thing, object_id: plasma.ObjectID) -> int:
+        put_segments(client, self._segments(thing), object_id)
+        return self.code
+
+    def _segments(self, thing) -> list:
+        """
+        Errors:
+            BrainSerializerError
+        """
+        if not self.accepts(thing):
+            raise BrainSerializerError(
+                f"Only scipy.sparse CSR, CSC and COO matrices can be stored as sparse, not {type(thing)}"
+            )
+        arrays = []
+        state = {key: _encode_state(value, arrays) for key, value in vars(thing).items()}
+        header = {"class": type(thing).__name__, "state": state}
+        return [json.dumps(header).encode()] + arrays
+
+    def get(self, client, object_id: plasma.ObjectID, timeout_ms: int = 100):
+        segments = get_segments(client, object_id, timeout_ms)
+        if segments is plasma.ObjectNotAvailable:
+            return segments
+        import scipy.sparse
+
+        header = json.loads(bytes(segments[0]))
+        if header["class"] not in self.classes:
+            raise BrainSerializerError(f"Unknown sparse class {header['class']}")
+        thing = object.__new__(getattr(scipy.sparse, header["class"]))
+        state = header["state"]
+        vars(thing).update(
+            {key: _decode_state(value, segments) for key, value in state.items()}
+        )
+        return thing
+
+
+class NDArraySerializer:
+    """
+    store NumPy arrays with structured dtypes, and record arrays, as their raw bytes and
+    dtype descriptor; recall is a read-only view of the store with the same dtype and shape
+    """
+
+    code = 10
+    name = "ndarray"
+
+    def accepts(self, thing) -> bool:
+        return (
+            isinstance(thing, np.ndarray)
+            and thing.dtype.names is not None
+            and not thing.dtype.hasobject
+        )
+
+    def size(self, thing) -> int:
+        return segments_size(self._segments(thing))
+
+    def put(self, client, thing, object_id: plasma.ObjectID) -> int:
+        put_segments(client, self._segments(thing), object_id)
+        return self.code
+
+    def _segments(self, thing) -> list:
+        """
+        Errors:
+            BrainSerializerError
+        """
+        if not isinstance(thing, np.ndarray) or thing.dtype.hasobject:
+            raise BrainSerializerError(
+                f"Only NumPy arrays without object fields can be stored as ndarray, not {type(thing)}"
+            )
+        arrays = []
+        header = _encode_state(thing, arrays)
+        header["recarray"] = isinstance(thing, np.recarray)
+        return [json.dumps(header).encode()] + arrays
+
+    def get(self, client, object_id: plasma.ObjectID, timeout_ms: int = 100):
+        segments = get_segments(client, object_id, timeout_ms)
+        if segments is plasma.ObjectNotAvailable:
+            return segments
+        header = json.loads(bytes(segments[0]))
+        thing = _decode_state(header, segments)
+        return thing.view(np.recarray) if header["recarray"] else thing
+
+
+VIEW_CODE = 2
+COUNTER_CODE = 3
+LOG_CODE = 4
+CHUNKS_CODE = 5
+SLAB_CODE = 6
+
+# VALUES OF THESE CODES CHANGE WITHOUT A NEW LEARN, SO THEY MUST NOT BE CACHED
+LIVE_CODES = {VIEW_CODE, COUNTER_CODE, LOG_CODE, CHUNKS_CODE}
+
+
+def put_arrow(client, table, object_id: plasma.ObjectID) -> int:
+    """write an Arrow Table or RecordBatch into a new plasma object as an IPC stream; returns its size"""
+    # MEASURE THE STREAM, THEN WRITE IT DIRECTLY INTO THE STORE
+    size = arrow_size(table)
+    buffer = client.create(object_id, size)
+    _write_arrow(pa.FixedSizeBufferWriter(buffer), table)
+    client.seal(object_id)
+    return size
+
+
+def arrow_size(table) -> int:
+    """bytes of an Arrow Table or RecordBatch written as an IPC stream, without writing it"""
+    sink = pa.MockOutputStream()
+    _write_arrow(sink, table)
+    return sink.size()
+
+
+def _write_arrow(sink, table):
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write(table)
+
+
+# SEGMENTED OBJECTS
+#
+# pickle5, sparse and ndarray values are laid out as
+#   uint32 count | count x uint64 segment length | segments, each aligned to 64 bytes
+# so every segment can be handed out as its own read-only, aligned view of the object
+
+ALIGNMENT = 64
+
+
+def _align(n: int) -> int:
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _bytes(segment) -> memoryview:
+    if isinstance(segment, np.ndarray):
+        segment = segment.reshape(-1).view(np.uint8)
+    return memoryview(segment).cast("B")
+
+
+def _offsets(lengths: list) -> tuple:
+    """(offset of every segment, size of the object) for segments of lengths"""
+    offsets = []
+    size = _align(4 + 8 * len(lengths))
+    for length in lengths:
+        offsets.append(size)
+        size = _align(size + length)
+    return offsets, size
+
+
+def segments_size(segments: list) -> int:
+    """bytes put_segments would take for segments"""
+    return _offsets([_bytes(x).nbytes for x in segments])[1]
+
+
+def put_segments(client, segments: list, object_id: plasma.ObjectID) -> int:
+    """write segments (buffers or arrays) into a new plasma object; returns its size"""
+    segments = [_bytes(x) for x in segments]
+    header = struct.pack(f"<I{len(segments)}Q", len(segments), *(x.nbytes for x in segments))
+    offsets, size = _offsets([x.nbytes for x in segments])
+
+    target = memoryview(client.create(object_id, size)).cast("B")
+    target[: len(header)] = header
+    for offset, segment in zip(offsets, segments):
+        target[offset : offset + segment.nbytes] = segment
+    client.seal(object_id)
+    return size
+
+
+def get_segments(client, object_id: plasma.ObjectID, timeout_ms: int = 100):
+    """read-only views of the segments of a plasma object; plasma.ObjectNotAvailable if it's gone"""
+    buffer = client.get_buffers([object_id], timeout_ms=timeout_ms)[0]
+    if buffer is None:
+        return plasma.ObjectNotAvailable
+    # VALUES MUST NOT WRITE INTO THE STORE, EVEN WHERE THE BUFFER ALLOWS IT
+    view = memoryview(buffer).toreadonly()
+    (count,) = struct.unpack_from("<I", view)
+    lengths = struct.unpack_from(f"<{count}Q", view, 4)
+    segments = []
+    offset = _align(4 + 8 * count)
+    for length in lengths:
+        segments.append(view[offset : offset + length])
+        offset = _align(offset + length)
+    return segments
+
+
+def _encode_state(value, arrays: list):
+    """
+    a JSON-able form of value, with the NumPy arrays in it moved to segments appended to arrays
+
+    arrays become {"segment": index, "descr": dtype descriptor, "shape": shape}; tuples,
+    lists and JSON scalars are kept as they are
+    """
+    if isinstance(value, np.ndarray):
+        arrays.append(np.ascontiguousarray(value))
+        return {
+            "segment": len(arrays),
+            "descr": np.lib.format.dtype_to_descr(value.dtype),
+            "shape": list(value.shape),
+        }
+    if isinstance(value, (tuple, list)):
+        return {
+            "tuple" if isinstance(value, tuple) else "list": [
+                _encode_state(x, arrays) for x in value
+            ]
+        }
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _decode_state(value, segments: list):
+    """the value _encode_state encoded, with its arrays as views of segments"""
+    if isinstance(value, dict):
+        if "segment" in value:
+            dtype = np.lib.format.descr_to_dtype(descr_from_json(value["descr"]))
+            shape = tuple(value["shape"])
+            return np.frombuffer(segments[value["segment"]], dtype=dtype).reshape(shape)
+        if "tuple" in value:
+            return tuple(_decode_state(x, segments) for x in value["tuple"])
+        if "list" in value:
+            return [_decode_state(x, segments) for x in value["list"]]
+    return value
+
+
+def descr_from_json(descr):
+    """a dtype descriptor read back from JSON, with its fields and their shapes as tuples again"""
+    if not isinstance(descr, list):
+        return descr
+    fields = []
+    for name, field_descr, *shape in descr:
+        name = tuple(name) if isinstance(name, list) else name
+        fields.append((name, descr_from_json(field_descr), *(tuple(x) for x in shape)))
+    return fields
+
+
+PLASMA = PlasmaSerializer()
+PANDAS = PandasSerializer()
+PICKLE5 = Pickle5Serializer()
+ARROW = ArrowSerializer()
+SPARSE = SparseSerializer()
+NDARRAY = NDArraySerializer()
+
+SERIALIZERS = {
+    serializer.code: serializer
+    for serializer in [PLASMA, PANDAS, PICKLE5, ARROW, SPARSE, NDARRAY]
+}
+RESERVED_CODES = range(100)
+
+
+def register(serializer):
+    """
+    make serializer available to learn and recall, by its code and name
+
+    Errors:
+        BrainSerializerError
+    """
+    if serializer.code in RESERVED_CODES or not 0 <= serializer.code < 256:
+        raise BrainSerializerError(
+            f"Serializer codes must be in 100-255; {serializer.code} is reserved or too large"
+        )
+    existing = SERIALIZERS.get(serializer.code)
+    if existing is not None and existing is not serializer:
+        raise BrainSerializerError(
+            f"Serializer code {serializer.code} is already used by {existing.name}"
+        )
+    if any(x.name == serializer.name and x is not serializer for x in SERIALIZERS.values()):
+        raise BrainSerializerError(f"Serializer name {serializer.name} is already used")
+    SERIALIZERS[serializer.code] = serializer
+
+
+def by_name(name):
+    """
+    return the registered serializer called name; a serializer object is returned as is
+
+    Errors:
+        BrainSerializerError
+    """
+    if not isinstance(name, str):
+        if SERIALIZERS.get(getattr(name, "code", None)) is not name:
+            raise BrainSerializerError(f"Serializer {name} is not registered")
+        return name
+    for serializer in SERIALIZERS.values():
+        if serializer.name == name:
+            return serializer
+    raise BrainSerializerError(f"Unknown serializer {name}")
+
+
+def for_object(thing):
+    """return the serializer that fits thing best"""
+    if PANDAS.accepts(thing):
+        return PANDAS
+    if ARROW.accepts(thing):
+        return ARROW
+    if SPARSE.accepts(thing):
+        return SPARSE
+    if NDARRAY.accepts(thing):
+        return NDARRAY
+    return PLASMA
+
+
+def estimate(serializer, thing) -> int:
+    """bytes serializer will take in the store for thing; None if it can't say"""
+    size = getattr(serializer, "size", None)
+    if size is None:
+        return None
+    try:
+        return size(thing)
+    except Exception:
+        # LET put RAISE ITS OWN ERROR
+        return None
+
+
+def by_code(code: int):
+    """
+    return the serializer stored as code in a metadata record
+
+    Errors:
+        BrainSerializerError
+    """
+    try:
+        return SERIALIZERS[code]
+    except KeyError:
+        raise BrainSerializerError(f"Unknown serializer code {code}")
@@ -0,0 +1,268 @@
+from bisect import bisect
+from concurrent.futures import ThreadPoolExecutor
+import copy
+import hashlib
+from typing import Iterable
+
+from pyarrow import plasma
+
+from .brain import Brain
+from .brain_client import BrainClient
+from .pinned import PinnedValue
+
+
+class ShardedBrain:
+    """
+    a Brain spread over several plasma_store instances
+
+    every name is routed to one shard with consistent hashing on its namespace hash,
+    so adding or removing a store only moves the names on the ring next to it;
+    operations that touch every shard fan out in parallel, one thread per shard
+
+    each path can be a plasma_store with its own memory arena and socket,
+    e.g. one per NUMA node started under `numactl --cpunodebind=N --membind=N`
+    """
+
+    def __init__(
+        self,
+        paths: Iterable[str],
+        namespace="default",
+        ClientClass=BrainClient,
+        replicas: int = 64,
+    ):
+        self.paths = list(paths)
+        if not self.paths:
+            raise ValueError("ShardedBrain needs at least one plasma_store path")
+        self.namespace = namespace
+        self.shards = [
+            Brain(namespace=namespace, path=path, ClientClass=ClientClass)
+            for path in self.paths
+        ]
+        self._executor = ThreadPoolExecutor(max_workers=len(self.shards))
+
+        # BUILD THE HASH RING: EACH SHARD OWNS <REPLICAS> POINTS ON IT
+        ring = []
+        for i, path in enumerate(self.paths):
+            for replica in range(replicas):
+                point = hashlib.blake2b(
+                    f"{path}#{replica}".encode(), digest_size=8
+                ).digest()
+                ring.append((int.from_bytes(point, "big"), i))
+        ring.sort()
+        self._ring_points = [point for point, _ in ring]
+        self._ring_shards = [shard for _, shard in ring]
+
+    ##########################################################################################
+    # CORE FUNCTIONS
+    ##########################################################################################
+    def __setitem__(self, name, item):
+        self.learn(name, item)
+
+    def __getitem__(self, name):
+        return self.recall(name)
+
+    def __delitem__(self, name):
+        return self.forget(name)
+
+    def __contains__(self, name):
+        return self.exists(name)
+
+    def __len__(self):
+        return len(self.names())
+
+    def learn(self, name: str, thing, description: str = None, serializer=None):
+        """put a given object to the plasma store of the shard that owns name"""
+        return self.shard(name).learn(name, thing, description, serializer)
+
+    def recall(self, name: str):
+        """get an object value from the shard that owns name"""
+        return self.shard(name).recall(name)
+
+    def pin(self, name: str) -> PinnedValue:
+        """get an object value from the shard that owns name, pinned until released"""
+        return self.shard(name).pin(name)
+
+    def exists(self, name: str) -> bool:
+        """confirm that name exists on the shard that owns it"""
+        return self.shard(name).exists(name)
+
+    def forget(self, name: str):
+        """delete an object from the shard that owns name"""
+        return self.shard(name).forget(name)
+
+    def learn_many(self, things: dict, description: str = None):
+        """put many {name: object} pairs, writing to all shards in parallel"""
+        groups = self._group(things)
+
+        def learn_group(item):
+            shard, names = item
+            for name in names:
+                shard.learn(name, things[name], description)
+
+        list(self._executor.map(learn_group, groups.items()))
+
+    def recall_many(self, names: Iterable[str]) -> dict:
+        """
+        get many object values as {name: value}, reading from all shards in parallel
+
+        Errors:
+            KeyError
+        """
+        groups = self._group(names)
+
+        def recall_group(item):
+            shard, names = item
+            return {name: shard.recall(name) for name in names}
+
+        out = {}
+        for values in self._executor.map(recall_group, groups.items()):
+            out.update(values)
+        return out
+
+    def forget_many(self, names: Iterable[str]):
+        """delete many names, deleting from all shards in parallel"""
+        groups = self._group(names)
+
+        def forget_group(item):
+            shard, names = item
+            for name in names:
+                shard.forget(name)
+
+        list(self._executor.map(forget_group, groups.items()))
+
+    def names(self, namespace=None) -> list:
+        """
+        return a list of the names known by all shards
+        in all namespaces or only in current (default)
+        """
+        names = []
+        for shard_names in self._fan_out(lambda shard: shard.names(namespace)):
+            names.extend(shard_names)
+        return names
+
+    def find(self, *args, **kwargs) -> list:
+        """return the sorted names on all shards that match, see Brain.find"""
+        names = []
+        for shard_names in self._fan_out(lambda shard: shard.find(*args, **kwargs)):
+            names.extend(shard_names)
+        return sorted(names)
+
+    def metadata(self, *names, output: str = "dict"):
+        """
+        return a dict/list of all names and their associated metadata in current namespace
+
+        if only one name, only asks the shard that owns it
+        """
+        if len(names) == 1:
+            return self.shard(names[0]).metadata(names[0], output=output)
+
+        parts = self._fan_out(lambda shard: shard.metadata(*names, output=output))
+        if output == "dict":
+            # NAMES THAT WERE ASKED FOR ARE NONE ON EVERY SHARD BUT THE ONE THAT OWNS THEM
+            out = {}
+            for part in parts:
+                for name, meta in part.items():
+                    if meta is not None or name not in out:
+                        out[name] = meta
+            return out
+        return [meta for part in parts for meta in part]
+
+    def object_id(self, name: str) -> plasma.ObjectID:
+        """get the ObjectId of the value in the store of the shard that owns name"""
+        return self.shard(name).object_id(name)
+
+    def sleep(self):
+        """disconnect every shard from its client"""
+        self._fan_out(lambda shard: shard.sleep())
+
+    def wake_up(self):
+        """reconnect every shard to its client"""
+        self._fan_out(lambda shard: shard.wake_up())
+
+    def size(self) -> int:
+        """total bytes of all the underlying plasma_stores"""
+        return sum(self._fan_out(lambda shard: shard.size()))
+
+    def used(self) -> int:
+        """total used bytes of all the underlying plasma_stores"""
+        return sum(self._fan_out(lambda shard: shard.used()))
+
+    def free(self) -> int:
+        """total unused bytes of all the underlying plasma_stores"""
+        return self.size() - self.used()
+
+    def usage(self, namespace: str = None) -> dict:
+        """return the bytes and names used by namespace (default current) on all shards"""
+        parts = self._fan_out(lambda shard: shard.usage(namespace))
+        return {
+            "bytes": sum(x["bytes"] for x in parts),
+            "names": sum(x["names"] for x in parts),
+        }
+
+    def set_namespace(self, namespace=None):
+        """
+        either return the current namespace or change the current namespace on every shard
+        """
+        if namespace is None:
+            return self.namespace
+        self._fan_out(lambda shard: shard.set_namespace(namespace))
+        self.namespace = namespace
+        return self.namespace
+
+    def ns(self, namespace: str) -> "ShardedBrain":
+        """
+        a view of this ShardedBrain fixed to namespace, made of a view of every shard;
+        it shares the shards' clients and the thread pool, see Brain.ns
+
+        Errors:
+            BrainNamespaceNameError
+        """
+        view = copy.copy(self)
+        view.shards = self._fan_out(lambda shard: shard.ns(namespace))
+        view.namespace = namespace
+        return view
+
+    def namespaces(self) -> set:
+        """return set of all namespaces available on any shard"""
+        return set().union(*self._fan_out(lambda shard: shard.namespaces()))
+
+    def remove_namespace(self, namespace=None) -> str:
+        """remove a namespace and all its values from every shard"""
+        if namespace is None:
+            namespace = self.namespace
+        self._fan_out(lambda shard: shard.remove_namespace(namespace))
+        self.namespace = self.shards[0].namespace
+        return "Deleted namespace {}. Using namespace {}.".format(
+            namespace, self.namespace
+        )
+
+    ##########################################################################################
+    # UTILITY FUNCTIONS
+    ##########################################################################################
+    def shard(self, name: str) -> Brain:
+        """return the shard Brain that owns name in the current namespace"""
+        return self.shards[self._shard_index(name)]
+
+    def _shard_index(self, name: str) -> int:
+        """
+        find the shard that owns name on the hash ring
+
+        the position on the ring is the hash part of the name's metadata ObjectID,
+        i.e. the same hash Brain already uses to find the name in a store
+        """
+        metadata_id = self.shards[0]._name_to_namespace_hash(name, self.namespace)
+        name_hash = metadata_id.binary()[len(self.namespace) :][:8]
+        point = int.from_bytes(name_hash.ljust(8, b"\0"), "big")
+        i = bisect(self._ring_points, point) % len(self._ring_points)
+        return self._ring_shards[i]
+
+    def _group(self, names: Iterable[str]) -> dict:
+        """group names by the shard Brain that owns them"""
+        groups = {}
+        for name in names:
+            groups.setdefault(self.shard(name), []).append(name)
+        return groups
+
+    def _fan_out(self, f) -> list:
+        """call f(shard) on every shard in parallel and return the results in shard order"""
+        return list(self._executor.map(f, self.shards))
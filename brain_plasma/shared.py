@@ -0,0 +1,68 @@
+import ctypes
+import fcntl
+import threading
+
+import numpy as np
+
+
+class StoreLock:
+    """
+    a lock shared by every process that uses one plasma_store
+
+    it's an exclusive flock on a file next to the store's socket, plus a thread lock so
+    threads of one process exclude each other too; re-entrant within a thread
+    """
+
+    def __init__(self, path: str):
+        self.path = f"{path}.lock"
+        self._thread_lock = threading.RLock()
+        self._file = None
+        self._depth = 0
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        try:
+            if self._depth == 0:
+                if self._file is None:
+                    self._file = open(self.path, "a")
+                fcntl.flock(self._file, fcntl.LOCK_EX)
+        except:
+            self._thread_lock.release()
+            raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *args):
+        self._depth -= 1
+        if self._depth == 0:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+
+def writable_view(buffer, dtype) -> np.ndarray:
+    """
+    a writable NumPy view of a sealed plasma buffer
+
+    plasma hands out sealed objects read-only, but every client maps the store read-write,
+    so objects with a fixed layout can be updated in place by any process;
+    keep a reference to buffer for as long as the view is used, and hold the StoreLock
+    around read-modify-write updates
+    """
+    memory = (ctypes.c_char * buffer.size).from_address(buffer.address)
+    return np.frombuffer(memory, dtype=dtype)
+
+
+class SharedFields:
+    """
+    base of the fixed-layout objects of int64 fields that every process updates in place:
+    namespace usage and stats, and counters
+
+    self._fields is a writable view of the fields; subclasses read them directly and take
+    self._lock around updates
+    """
+
+    def __init__(self, buffer, lock: StoreLock):
+        # THE VIEW IS ONLY VALID WHILE THE BUFFER KEEPS THE OBJECT MAPPED
+        self._buffer = buffer
+        self._fields = writable_view(buffer, np.int64)
+        self._lock = lock
@@ -0,0 +1,378 @@
+import hashlib
+import pickle
+import struct
+
+import numpy as np
+from pyarrow import plasma
+
+from . import records
+from .shared import StoreLock, writable_view
+
+# SLABS
+#
+# with Brain(slab_threshold=n), values that pickle to at most n bytes are packed together with
+# their metadata records into shared slab objects, instead of taking two plasma objects each;
+# every namespace that uses slabs has one directory object that maps names to their entries
+#
+#   directory   int64 header: slots | names | tombstones | slabs | generation | version
+#                             | 2 x reserved
+#               slots x int64 [key | slab | offset | length]
+#                   key is a 63-bit hash of the name; 0 marks an empty slot, -1 a deleted one
+#   slab        int64 header: used | reserved
+#               entries one after another: uint32 record_len | metadata record | pickled value
+#
+# the directory and slabs are changed in place under the StoreLock; an update appends a new
+# entry and leaves the old one dead in its slab; compact() moves the live entries out of
+# mostly-dead slabs, deletes those slabs and bumps the generation so every process drops
+# its mappings of them
+#
+# a directory that gets too full is rehashed into a new object twice its size; the first
+# directory of a namespace stays where every process looks for it, and its version field
+# says which directory is current, so every process maps the new one before its next change
+
+SLOTS = 1 << 16
+SLAB_SIZE = 1 << 20
+MAX_LOAD = 0.7
+DIRECTORY_HEADER = 8
+SLAB_HEADER = 16
+EMPTY = 0
+DELETED = -1
+ENTRY_PREFIX = struct.Struct("<I")
+
+
+def directory_id(namespace: str, version: int = 0) -> plasma.ObjectID:
+    key = namespace.encode()
+    if version:
+        key += b"\0" + version.to_bytes(4, "little")
+    return plasma.ObjectID(b"brain_slabs_" + hashlib.blake2b(key, digest_size=8).digest())
+
+
+def slab_id(namespace: str, number: int) -> plasma.ObjectID:
+    return plasma.ObjectID(
+        b"brain_slab_"
+        + hashlib.blake2b(namespace.encode(), digest_size=5).digest()
+        + number.to_bytes(4, "little")
+    )
+
+
+def directory_size(slots: int = SLOTS) -> int:
+    return (DIRECTORY_HEADER + 4 * slots) * 8
+
+
+def init_directory(buffer, slots: int = SLOTS):
+    """write an empty directory into a newly created, not yet sealed object"""
+    fields = np.frombuffer(buffer, dtype=np.int64)
+    fields[:] = 0
+    fields[0] = slots
+
+
+def pickle_small(thing, limit: int) -> bytes:
+    """
+    thing pickled, if that takes at most limit bytes; None if it takes more or can't be pickled
+
+    pickling stops as soon as limit is passed, so a large value is never pickled in full
+    just to find out it doesn't fit
+    """
+    writer = _LimitedWriter(limit)
+    try:
+        pickle.Pickler(writer, protocol=pickle.HIGHEST_PROTOCOL).dump(thing)
+    except Exception:
+        return None
+    return b"".join(writer.parts)
+
+
+class _TooLarge(Exception):
+    pass
+
+
+class _LimitedWriter:
+    """a file for pickle.Pickler that keeps what's written and raises once it passes limit bytes"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.size = 0
+        self.parts = []
+
+    def write(self, data) -> int:
+        size = memoryview(data).nbytes
+        self.size += size
+        if self.size > self.limit:
+            raise _TooLarge
+        self.parts.append(bytes(data))
+        return size
+
+
+def name_key(name: str) -> int:
+    key = int.from_bytes(
+        hashlib.blake2b(name.encode(), digest_size=8).digest(), "little"
+    ) >> 1
+    return key or 1
+
+
+def _free_slot(slots: np.ndarray, key: int) -> int:
+    """the first slot of slots, from key's own, that holds no live entry"""
+    i = key % len(slots)
+    while slots[i, 0] > 0:
+        i = (i + 1) % len(slots)
+    return i
+
+
+class SlabDirectory:
+    """
+    the slabs of one namespace: find, add, replace and remove the entries of small names
+
+    every method takes the StoreLock; values are copied out of the slabs while it's held
+    """
+
+    def __init__(self, client, namespace: str, buffer, lock: StoreLock, slab_size: int = SLAB_SIZE):
+        """buffer is the namespace's first directory, whichever directory is current"""
+        self.client = client
+        self.namespace = namespace
+        self.slab_size = slab_size
+        self._first_buffer = buffer
+        self._first = writable_view(buffer, np.int64)[:DIRECTORY_HEADER]
+        self._lock = lock
+        self._slabs = {}
+        self._generation = None
+        self._version = None
+        with self._lock:
+            self._current()
+
+    def __len__(self):
+        with self._lock:
+            self._current()
+            return int(self._header[1])
+
+    def contains(self, name: str) -> bool:
+        with self._lock:
+            self._current()
+            return self._find(name) >= 0
+
+    def metadata(self, name: str) -> dict:
+        """the metadata record of name; None if it isn't in a slab"""
+        with self._lock:
+            self._current()
+            i = self._find(name)
+            if i < 0:
+                return None
+            return records.unpack(self._entry(i)[0])
+
+    def value(self, name: str) -> bytes:
+        """a copy of the pickled value of name; None if it isn't in a slab"""
+        with self._lock:
+            self._current()
+            i = self._find(name)
+            if i < 0:
+                return None
+            return self._entry(i)[1].tobytes()
+
+    def all_metadata(self) -> list:
+        with self._lock:
+            self._current()
+            return [
+                records.unpack(self._entry(i)[0])
+                for i in np.flatnonzero(self._slots[:, 0] > 0)
+            ]
+
+    def names(self) -> list:
+        with self._lock:
+            self._current()
+            return [
+                records.unpack_name(self._entry(i)[0])
+                for i in np.flatnonzero(self._slots[:, 0] > 0)
+            ]
+
+    def put(self, metadata: dict, value: bytes) -> bool:
+        """
+        add or replace the entry of metadata["name"]
+
+        returns False, without changing anything, if the entry doesn't fit in a slab;
+        a directory too full for another name is rehashed, into one twice its size if
+        deleted slots alone don't make enough room
+        """
+        record = records.pack(metadata)
+        entry = ENTRY_PREFIX.pack(len(record)) + record + value
+        if len(entry) > self.slab_size - SLAB_HEADER:
+            return False
+        name = metadata["name"]
+        with self._lock:
+            self._current()
+            i = self._find(name)
+            if i < 0 and self._header[1] + self._header[2] + 1 > MAX_LOAD * len(self._slots):
+                if (self._header[1] + 1) * 2 > MAX_LOAD * len(self._slots):
+                    self._grow(2 * len(self._slots))
+                else:
+                    self._rehash()
+            number, offset = self._write(entry)
+            if i < 0:
+                i = _free_slot(self._slots, name_key(name))
+                if self._slots[i, 0] == DELETED:
+                    self._header[2] -= 1
+                self._header[1] += 1
+            self._slots[i] = [name_key(name), number, offset, len(entry)]
+            return True
+
+    def remove(self, name: str) -> dict:
+        """remove the entry of name and return its metadata; None if it isn't in a slab"""
+        with self._lock:
+            self._current()
+            i = self._find(name)
+            if i < 0:
+                return None
+            metadata = records.unpack(self._entry(i)[0])
+            self._slots[i] = [DELETED, 0, 0, 0]
+            self._header[1] -= 1
+            self._header[2] += 1
+            return metadata
+
+    def compact(self, min_dead_fraction: float = 0.5) -> int:
+        """
+        move the live entries out of every slab that is at least min_dead_fraction dead,
+        delete those slabs and clear deleted slots out of the directory;
+        returns the number of slabs deleted
+        """
+        with self._lock:
+            self._current()
+            live = np.flatnonzero(self._slots[:, 0] > 0)
+            current = int(self._header[3]) - 1
+            live_bytes = np.bincount(
+                self._slots[live, 1], weights=self._slots[live, 3], minlength=current + 1
+            )
+            victims = []
+            for number in range(current):
+                slab = self._slab(number)
+                if slab is None:
+                    continue
+                used = int(slab[:SLAB_HEADER].view(np.int64)[0]) - SLAB_HEADER
+                if used and 1 - live_bytes[number] / used >= min_dead_fraction:
+                    victims.append(number)
+
+            # REWRITE THE LIVE ENTRIES OF THE VICTIMS AT THE END OF THE CURRENT SLAB
+            for i in live:
+                if self._slots[i, 1] in victims:
+                    number, offset, length = (int(x) for x in self._slots[i, 1:])
+                    entry = self._slab(number)[offset : offset + length].tobytes()
+                    self._slots[i, 1:3] = self._write(entry)
+
+            # REHASH THE LIVE SLOTS TO DROP THE DELETED ONES
+            if self._header[2]:
+                self._rehash()
+
+            if victims:
+                self.client.delete([slab_id(self.namespace, x) for x in victims])
+                self._header[4] += 1
+            return len(victims)
+
+    def drop(self):
+        """delete every slab and the directories themselves"""
+        with self._lock:
+            self._current()
+            self._slabs.clear()
+            self.client.delete(
+                [slab_id(self.namespace, x) for x in range(int(self._header[3]))]
+                + [directory_id(self.namespace)]
+                + ([directory_id(self.namespace, self._version)] if self._version else [])
+            )
+
+    def _current(self):
+        """map the current directory, if another process or this one grew it since"""
+        version = int(self._first[5])
+        if version == self._version:
+            return
+        if version:
+            buffer = self.client.get_buffers(
+                [directory_id(self.namespace, version)], timeout_ms=100
+            )[0]
+        else:
+            buffer = self._first_buffer
+        self._buffer = buffer
+        fields = writable_view(buffer, np.int64)
+        self._header = fields[:DIRECTORY_HEADER]
+        self._slots = fields[DIRECTORY_HEADER:].reshape(-1, 4)
+        self._version = version
+
+    def _grow(self, slots: int):
+        """rehash the live slots into a new directory of slots and make it the current one"""
+        version = self._version + 1
+        object_id = directory_id(self.namespace, version)
+        buffer = self.client.create(object_id, directory_size(slots))
+        init_directory(buffer, slots)
+        fields = np.frombuffer(buffer, dtype=np.int64)
+        fields[1 : DIRECTORY_HEADER] = self._header[1:]
+        fields[2] = 0
+        fields[5] = version
+        new = fields[DIRECTORY_HEADER:].reshape(-1, 4)
+        for row in self._slots[self._slots[:, 0] > 0]:
+            new[_free_slot(new, int(row[0]))] = row
+        self.client.seal(object_id)
+
+        old = self._version
+        self._first[5] = version
+        self._current()
+        if old:
+            self.client.delete([directory_id(self.namespace, old)])
+
+    def _rehash(self):
+        """rehash the live slots in place to drop the deleted ones"""
+        rows = self._slots[self._slots[:, 0] > 0].copy()
+        self._slots[:] = 0
+        for row in rows:
+            self._slots[_free_slot(self._slots, int(row[0]))] = row
+        self._header[2] = 0
+
+    def _find(self, name: str) -> int:
+        key = name_key(name)
+        slots = len(self._slots)
+        i = key % slots
+        for _ in range(slots):
+            k = self._slots[i, 0]
+            if k == EMPTY:
+                return -1
+            # KEYS CAN COLLIDE; THE NAME IN THE RECORD DECIDES
+            if k == key and records.unpack_name(self._entry(i)[0]) == name:
+                return i
+            i = (i + 1) % slots
+        return -1
+
+    def _entry(self, i: int) -> tuple:
+        """(record, value) views of the entry in slot i"""
+        number, offset, length = (int(x) for x in self._slots[i, 1:])
+        entry = self._slab(number)[offset : offset + length]
+        (record_len,) = ENTRY_PREFIX.unpack_from(entry)
+        start = ENTRY_PREFIX.size
+        return entry[start : start + record_len], entry[start + record_len :]
+
+    def _write(self, entry: bytes) -> tuple:
+        """append entry to the current slab, starting a new slab if needed; returns (slab, offset)"""
+        number = int(self._header[3]) - 1
+        slab = self._slab(number) if number >= 0 else None
+        if slab is None or slab[:SLAB_HEADER].view(np.int64)[0] + len(entry) > self.slab_size:
+            number = int(self._header[3])
+            object_id = slab_id(self.namespace, number)
+            buffer = self.client.create(object_id, self.slab_size)
+            np.frombuffer(buffer, dtype=np.int64, count=2)[:] = [SLAB_HEADER, 0]
+            self.client.seal(object_id)
+            self._header[3] += 1
+            slab = self._slab(number)
+        header = slab[:SLAB_HEADER].view(np.int64)
+        offset = int(header[0])
+        slab[offset : offset + len(entry)] = np.frombuffer(entry, dtype=np.uint8)
+        header[0] = offset + len(entry)
+        return number, offset
+
+    def _slab(self, number: int) -> np.ndarray:
+        """writable bytes of slab number; None if it was deleted"""
+        # ANOTHER PROCESS COMPACTED: DROP THE MAPPINGS SO DELETED SLABS CAN BE RECLAIMED
+        if self._generation != int(self._header[4]):
+            self._slabs.clear()
+            self._generation = int(self._header[4])
+        slab = self._slabs.get(number)
+        if slab is None:
+            buffer = self.client.get_buffers(
+                [slab_id(self.namespace, number)], timeout_ms=0
+            )[0]
+            if buffer is None:
+                return None
+            slab = (buffer, writable_view(buffer, np.uint8))
+            self._slabs[number] = slab
+        return slab[1]
@@ -0,0 +1,120 @@
+import os
+import secrets
+
+import pyarrow as pa
+
+from . import serializers
+
+# SPILLING TO DISK
+#
+# with Brain(spill_dir=...), once Brain's names take more than spill_at of the plasma_store,
+# the values learned longest ago are moved out of the store into files in spill_dir;
+# the tier field of a name's metadata record says where its value is
+#
+#   STORE   the value is the plasma object value_id
+#   DISK    the value is the file whose path is the record's extra bytes; the file holds the
+#           exact bytes the plasma object held, named after the value_id it had plus the
+#           writer's pid and a random suffix, so processes spilling one value at once never
+#           share a file
+#
+# recall memory-maps the file and hands the value's serializer a buffer over it, so Arrow,
+# pickle5 and NumPy values come back zero-copy, straight from the page cache; a value that
+# one process recalls from disk promote_after times is copied back into the store
+#
+# only values stored as one plasma object with no extra bytes can be spilled: not views,
+# counters, logs, appended tables or slab values
+
+STORE = 0
+DISK = 1
+SUFFIX = ".brain"
+UNSPILLABLE = {
+    serializers.VIEW_CODE,
+    serializers.COUNTER_CODE,
+    serializers.LOG_CODE,
+    serializers.CHUNKS_CODE,
+    serializers.SLAB_CODE,
+}
+
+
+def on_disk(metadata: dict) -> bool:
+    return metadata.get("tier", STORE) == DISK
+
+
+def spillable(metadata: dict) -> bool:
+    return not on_disk(metadata) and metadata["codec"] not in UNSPILLABLE
+
+
+def path(spill_dir: str, value_id: bytes) -> str:
+    """a new file for this process to spill a value to"""
+    return os.path.join(
+        spill_dir, f"{value_id.hex()}.{os.getpid()}.{secrets.token_hex(4)}{SUFFIX}"
+    )
+
+
+def location(metadata: dict) -> str:
+    """the file the value of a spilled record is in"""
+    return metadata["extra"].decode()
+
+
+def write(buffer, path: str):
+    """write the bytes of buffer to path; readers never see a partly written file"""
+    partial = path + ".partial"
+    try:
+        with open(partial, "wb") as f:
+            f.write(memoryview(buffer))
+        os.replace(partial, path)
+    except:
+        remove(partial)
+        raise
+
+
+def read(path: str):
+    """a read-only buffer over the memory-mapped file at path; None if it's gone"""
+    try:
+        if os.path.getsize(path) == 0:
+            return pa.py_buffer(b"")
+        # THE BUFFER KEEPS THE MAPPING OPEN; IT STAYS READABLE EVEN IF THE FILE IS REMOVED
+        return pa.memory_map(path, "r").read_buffer()
+    except FileNotFoundError:
+        return None
+
+
+def remove(path: str):
+    """remove the file at path, if it's there"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def discard(metadata: dict):
+    """remove the file of a spilled record; does nothing for a record in the store"""
+    if on_disk(metadata):
+        remove(location(metadata))
+
+
+def files(spill_dir: str) -> list:
+    """paths of the spilled values in spill_dir"""
+    try:
+        return [
+            os.path.join(spill_dir, x) for x in os.listdir(spill_dir) if x.endswith(SUFFIX)
+        ]
+    except FileNotFoundError:
+        return []
+
+
+class FileClient:
+    """
+    stands in for the plasma client when a serializer reads a spilled value,
+    handing it the buffer over the file instead of a buffer from the store
+    """
+
+    def __init__(self, buffer, client):
+        self.buffer = buffer
+        self.client = client
+
+    def get_buffers(self, object_ids, *args, **kwargs):
+        return [self.buffer for _ in object_ids]
+
+    def get(self, object_id, *args, **kwargs):
+        return self.client.deserialize(self.buffer)
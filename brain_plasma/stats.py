@@ -0,0 +1,75 @@
+import functools
+import hashlib
+import time
+
+import numpy as np
+from pyarrow import plasma
+
+from .shared import SharedFields
+
+# NAMESPACE OPERATION STATS OBJECT
+#
+# one shared.SharedFields object per namespace, updated by every process that runs a Brain
+# with instrument=True; two fields per operation in OPERATIONS:
+#
+#   2i      calls           number of calls of operation i
+#   2i + 1  nanoseconds     total time spent in those calls
+
+OPERATIONS = ["learn", "recall", "pin", "forget"]
+SIZE = len(OPERATIONS) * 2 * 8
+
+
+def object_id(namespace: str) -> plasma.ObjectID:
+    """the ObjectID of the stats object of namespace"""
+    return plasma.ObjectID(
+        b"brain_stats_" + hashlib.blake2b(namespace.encode(), digest_size=8).digest()
+    )
+
+
+def initial() -> bytes:
+    """the contents of a new stats object: no calls yet"""
+    return np.zeros(len(OPERATIONS) * 2, dtype=np.int64).tobytes()
+
+
+class NamespaceStats(SharedFields):
+    """
+    call counts and total latency of the Brain operations of one namespace, shared by every process
+    """
+
+    def as_dict(self) -> dict:
+        """{operation: {"calls": int, "nanoseconds": int}}"""
+        fields = [int(x) for x in self._fields]
+        return {
+            op: {"calls": fields[2 * i], "nanoseconds": fields[2 * i + 1]}
+            for i, op in enumerate(OPERATIONS)
+        }
+
+    def record(self, operation: str, nanoseconds: int):
+        """count one call of operation that took nanoseconds"""
+        i = OPERATIONS.index(operation)
+        with self._lock:
+            self._fields[2 * i] += 1
+            self._fields[2 * i + 1] += nanoseconds
+
+
+def instrumented(operation: str):
+    """
+    decorator for Brain methods: time each call and record it in the namespace stats
+    when the Brain was created with instrument=True
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if not self._instrument:
+                return method(self, *args, **kwargs)
+            namespace = self.namespace
+            start = time.perf_counter_ns()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self._stats(namespace).record(operation, time.perf_counter_ns() - start)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,88 @@
+import hashlib
+
+import numpy as np
+from pyarrow import plasma
+
+from .shared import SharedFields
+
+# NAMESPACE USAGE OBJECT
+#
+# one shared.SharedFields object per namespace:
+#
+#   0   bytes       bytes the names' values and metadata records take in the store
+#   1   names       number of names
+#   2   max_bytes   quota on bytes; -1 if none
+#   3   max_names   quota on names; -1 if none
+#   4   policy      what learn does when a quota would be exceeded; see POLICIES
+
+FIELDS = ["bytes", "names", "max_bytes", "max_names", "policy"]
+SIZE = len(FIELDS) * 8
+POLICIES = ["reject", "evict"]
+
+
+def object_id(namespace: str) -> plasma.ObjectID:
+    """the ObjectID of the usage object of namespace"""
+    return plasma.ObjectID(
+        b"brain_usage_" + hashlib.blake2b(namespace.encode(), digest_size=8).digest()
+    )
+
+
+def initial() -> bytes:
+    """the contents of a new usage object: nothing used, no quotas"""
+    return np.array([0, 0, -1, -1, 0], dtype=np.int64).tobytes()
+
+
+class NamespaceUsage(SharedFields):
+    """
+    byte and name counters plus quotas of one namespace, shared by every process
+
+    reads and updates are in place in shared memory, so each costs O(1)
+    """
+
+    def as_dict(self) -> dict:
+        fields = dict(zip(FIELDS, (int(x) for x in self._fields)))
+        fields["policy"] = POLICIES[fields["policy"]]
+        for quota in ["max_bytes", "max_names"]:
+            if fields[quota] < 0:
+                fields[quota] = None
+        return fields
+
+    @property
+    def policy(self) -> str:
+        return POLICIES[int(self._fields[4])]
+
+    @property
+    def limited(self) -> bool:
+        """whether the namespace has a quota"""
+        return self._fields[2] >= 0 or self._fields[3] >= 0
+
+    def add(self, nbytes: int, names: int):
+        """change the counters without checking quotas"""
+        with self._lock:
+            self._fields[0] += nbytes
+            self._fields[1] += names
+
+    def reserve(self, nbytes: int, names: int) -> bool:
+        """change the counters if that stays within the quotas; False if it doesn't"""
+        with self._lock:
+            max_bytes, max_names = self._fields[2], self._fields[3]
+            if nbytes > 0 and max_bytes >= 0 and self._fields[0] + nbytes > max_bytes:
+                return False
+            if names > 0 and max_names >= 0 and self._fields[1] + names > max_names:
+                return False
+            self._fields[0] += nbytes
+            self._fields[1] += names
+            return True
+
+    def set(self, nbytes: int, names: int):
+        """overwrite the counters"""
+        with self._lock:
+            self._fields[0] = nbytes
+            self._fields[1] = names
+
+    def set_quota(self, max_bytes: int = None, max_names: int = None, policy: str = "reject"):
+        """set the quotas; None removes a quota"""
+        with self._lock:
+            self._fields[2] = -1 if max_bytes is None else max_bytes
+            self._fields[3] = -1 if max_names is None else max_names
+            self._fields[4] = POLICIES.index(policy)
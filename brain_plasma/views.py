@@ -0,0 +1,81 @@
+import json
+import sys
+
+from .exceptions import BrainViewError
+
+# VIEWS
+#
+# a view is a name whose value is a slice of rows and/or a subset of columns of another
+# name (its parent); only the spec below is stored, in the extra bytes of its metadata record
+#
+#   {"parent": "<name>", "rows": [start, stop] or null, "columns": ["<column>", ...] or null}
+#
+# recall reads the parent zero-copy and slices it without copying, so the view keeps the
+# parent's buffer pinned for as long as it's used
+
+
+def pack(parent: str, rows: slice = None, columns: list = None) -> bytes:
+    """
+    encode a view spec
+
+    Errors:
+        BrainViewError
+    """
+    if rows is not None:
+        if not isinstance(rows, slice):
+            rows = slice(*rows)
+        if rows.step not in (None, 1):
+            raise BrainViewError(
+                f"Views need contiguous rows; slice step must be 1, not {rows.step}"
+            )
+        rows = [rows.start, rows.stop]
+    if columns is not None:
+        columns = list(columns)
+    return json.dumps({"parent": parent, "rows": rows, "columns": columns}).encode()
+
+
+def unpack(extra: bytes) -> dict:
+    """decode a view spec"""
+    return json.loads(extra)
+
+
+def apply(value, spec: dict):
+    """
+    slice the parent value as the spec says without copying it
+
+    works on NumPy arrays (columns are fields of a structured array), pandas DataFrames,
+    pyarrow Tables and, for rows only, anything else that can be sliced
+
+    Errors:
+        BrainViewError
+    """
+    rows = slice(*spec["rows"]) if spec["rows"] is not None else None
+    columns = spec["columns"]
+
+    pa = sys.modules.get("pyarrow")
+    pd = sys.modules.get("pandas")
+    if pa is not None and isinstance(value, pa.Table):
+        if columns is not None:
+            value = value.select(columns)
+        if rows is not None:
+            start, stop, _ = rows.indices(value.num_rows)
+            value = value.slice(start, max(stop - start, 0))
+        return value
+
+    if pd is not None and isinstance(value, pd.DataFrame):
+        if columns is not None:
+            # CONCAT KEEPS THE COLUMNS AS VIEWS; df[columns] WOULD COPY THEM
+            value = pd.concat([value[c] for c in columns], axis=1, copy=False)
+        if rows is not None:
+            value = value.iloc[rows]
+        return value
+
+    if columns is not None:
+        if getattr(getattr(value, "dtype", None), "names", None) is None:
+            raise BrainViewError(
+                f"Columns can only be selected from DataFrames, Tables and structured arrays, not {type(value)}"
+            )
+        value = value[columns]
+    if rows is not None:
+        value = value[rows]
+    return value
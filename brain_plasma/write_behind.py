@@ -0,0 +1,129 @@
+import atexit
+from collections import OrderedDict
+import threading
+import time
+import weakref
+
+from .exceptions import BrainWriteBehindError
+
+
+def flush_at_exit(brain):
+    """
+    flush brain when the interpreter exits; the queue's thread is a daemon, so writes still
+    queued would otherwise be dropped without a word
+
+    errors of those writes are raised from the atexit hook, where Python prints them;
+    brain is only held weakly, so a Brain that's gone has nothing to flush
+    """
+    ref = weakref.ref(brain)
+
+    def flush():
+        brain = ref()
+        if brain is not None:
+            brain.flush()
+
+    atexit.register(flush)
+
+
+class WriteBehindQueue:
+    """
+    bounded queue of pending writes that a background thread publishes to the store
+
+    a write to a key that's still pending replaces the pending value, so only the latest
+    value of a name is published; when max_pending keys are pending, put blocks until the
+    background thread catches up
+
+    the queue holds the written objects themselves, not copies, so they must not be changed
+    until they are published
+    """
+
+    def __init__(self, publish, max_pending: int = 64):
+        """publish(key, thing, *options) is called on the background thread for each write"""
+        self._publish = publish
+        self.max_pending = max_pending
+        self._pending = OrderedDict()
+        self._publishing = None
+        self._errors = []
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(
+            target=self._run, name="brain-write-behind", daemon=True
+        )
+        self._thread.start()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._pending) + (self._publishing is not None)
+
+    def put(self, key, thing, *options):
+        """queue a write; blocks while the queue is full, unless key is already pending"""
+        with self._cond:
+            while key not in self._pending and len(self._pending) >= self.max_pending:
+                self._cond.wait()
+            self._pending[key] = (thing, options)
+            self._cond.notify_all()
+
+    def get(self, key):
+        """return (True, thing) if a write to key hasn't been published yet, else (False, None)"""
+        with self._cond:
+            if key in self._pending:
+                return True, self._pending[key][0]
+            if self._publishing is not None and self._publishing[0] == key:
+                return True, self._publishing[1]
+            return False, None
+
+    def keys(self) -> list:
+        """the keys with a write that hasn't been published yet"""
+        with self._cond:
+            keys = list(self._pending)
+            if self._publishing is not None and self._publishing[0] not in self._pending:
+                keys.append(self._publishing[0])
+            return keys
+
+    def discard(self, key):
+        """drop a pending write to key, waiting for it if it's being published right now"""
+        with self._cond:
+            self._pending.pop(key, None)
+            while self._publishing is not None and self._publishing[0] == key:
+                self._cond.wait()
+            self._cond.notify_all()
+
+    def flush(self, timeout: float = None):
+        """
+        block until every queued write has been published
+
+        Errors:
+            TimeoutError
+            BrainWriteBehindError
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._publishing is not None:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(
+                        f"{len(self._pending)} writes still pending after {timeout} seconds"
+                    )
+                self._cond.wait(remaining)
+            errors, self._errors = self._errors, []
+        if errors:
+            raise BrainWriteBehindError(
+                f"{len(errors)} background writes failed: {errors}"
+            )
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                key, (thing, options) = self._pending.popitem(last=False)
+                self._publishing = (key, thing)
+                self._cond.notify_all()
+            try:
+                self._publish(key, thing, *options)
+            except Exception as e:
+                with self._cond:
+                    self._errors.append((key, e))
+            finally:
+                with self._cond:
+                    self._publishing = None
+                    self._cond.notify_all()
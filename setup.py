@@ -13,7 +13,9 @@ setup(
     author_email = 'russellromney@gmail.com',
     license = 'MIT',
     packages = find_packages(),
+    python_requires = '>=3.8',
     install_requires = [
+        'numpy',
         'pyarrow>=0.17.0',
     ],
     classifiers=[
@@ -21,10 +23,14 @@ setup(
         'Intended Audience :: Developers',
         'Topic :: Software Development :: Build Tools',
         'License :: OSI Approved :: MIT License',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
-        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
     ],
+    entry_points = {
+        'console_scripts': ['brain-plasma=brain_plasma.cli:main'],
+    },
     include_package_data = False,
     zip_safe = False
 )
@@ -0,0 +1,35 @@
+import functools
+
+import pytest
+
+from brain_plasma import Brain
+from brain_plasma.mock import MockPlasmaClient, SimulatedPlasmaClient
+
+
+@pytest.fixture(scope="function")
+def brain():
+    """Brain with mocked plasma_store client"""
+    return Brain(ClientClass=MockPlasmaClient)
+
+
+@pytest.fixture(scope="function")
+def simulated_store():
+    """path of a simulated plasma_store that starts empty and is dropped after the test"""
+    SimulatedPlasmaClient.reset()
+    yield "/tmp/simulated"
+    SimulatedPlasmaClient.reset()
+
+
+@pytest.fixture(scope="function")
+def simulated(simulated_store):
+    """
+    factory of Brains on the simulated plasma_store, which behaves like the real store and
+    counts client calls; capacity and evict set up the store when the first Brain is made,
+    other keyword arguments go to Brain
+    """
+
+    def make(capacity: int = 1_000_000_000, evict: bool = True, **options) -> Brain:
+        ClientClass = functools.partial(SimulatedPlasmaClient, capacity=capacity, evict=evict)
+        return Brain(path=simulated_store, ClientClass=ClientClass, **options)
+
+    return make
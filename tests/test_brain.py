@@ -1,15 +1,11 @@
+import concurrent.futures
+
 import pytest
 from pyarrow import plasma
 
 from brain_plasma import Brain
 from brain_plasma import exceptions
-from brain_plasma.mock import MockPlasmaClient
-
-
-@pytest.fixture(scope="function")
-def brain():
-    """Brain with mocked plasma_store client"""
-    return Brain(ClientClass=MockPlasmaClient)
+from brain_plasma.mock import MockPlasmaClient, SimulatedPlasmaClient
 
 
 def test_init_defaults(brain):
@@ -121,6 +117,22 @@ def test_set_namespace_bad(brain):
     with pytest.raises(exceptions.BrainNamespaceNameError):
         brain.set_namespace("some way too long namespace")
 
+    # RESERVED FOR BRAIN'S OWN OBJECTS, WHICH collect NEVER MARKS
+    with pytest.raises(exceptions.BrainNamespaceNameError):
+        brain.set_namespace("brain_data")
+    with pytest.raises(exceptions.BrainNamespaceNameError):
+        Brain(namespace="brain_data", ClientClass=MockPlasmaClient)
+    with pytest.raises(exceptions.BrainNamespaceNameError):
+        brain.set_namespace("brain")
+
+    # LISTINGS SKIP BRAIN'S OWN OBJECTS EVEN FOR A NAMESPACE THAT LOOKS LIKE THEM
+    brain["this"] = 1
+    brain.usage()
+    brain.namespace = "brain"
+    assert brain.names() == [] and len(brain) == 0
+    assert list(brain.iter_names()) == []
+    assert brain.metadata() == {}
+
 
 def test_remove_namespace(brain):
     brain.set_namespace("somespace")
@@ -130,6 +142,71 @@ def test_remove_namespace(brain):
     assert not "that" in brain
 
 
+def test_remove_other_namespace(brain):
+    brain.set_namespace("somespace")
+    brain["that"] = "this"
+    brain.set_namespace("otherspace")
+    brain.remove_namespace("somespace")
+    assert brain.namespace == "otherspace"
+    assert "somespace" not in brain.namespaces()
+    assert brain.names("somespace") == []
+
+
+def test_ns(brain):
+    tenant = brain.ns("tenant42")
+    tenant["this"] = 1
+    brain["this"] = 2
+    assert tenant["this"] == 1
+    assert brain["this"] == 2
+    assert tenant.client is brain.client
+    assert brain.namespace == "default"
+    assert "tenant42" in brain.namespaces()
+    assert tenant.names() == ["this"]
+    assert brain.names("tenant42") == ["this"]
+
+    with pytest.raises(exceptions.BrainNamespaceViewError):
+        tenant.set_namespace("default")
+    with pytest.raises(exceptions.BrainNamespaceNameError):
+        brain.ns("1")
+
+    tenant.remove_namespace()
+    assert tenant.namespace == "tenant42"
+    assert "tenant42" not in brain.namespaces()
+    assert brain["this"] == 2
+
+
+def test_ns_threads(brain):
+    def work(i):
+        view = brain.ns(f"space{i}")
+        for j in range(50):
+            view[f"x{j}"] = i
+            assert view[f"x{j}"] == i
+        return sorted(view.names())
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(work, range(4)))
+    assert all(x == sorted(f"x{j}" for j in range(50)) for x in results)
+    assert brain.namespace == "default"
+
+
+def test_names_all(brain):
+    brain["a"] = 1
+    # A NAMESPACE THAT IS A PREFIX OF ANOTHER KEEPS ITS OWN NAMES
+    brain.ns("space")["b"] = 2
+    brain.ns("spaces")["c"] = 3
+    assert sorted(brain.names("all")) == ["a", "b", "c"]
+    grouped = brain.names_by_namespace()
+    assert grouped == {"default": ["a"], "space": ["b"], "spaces": ["c"]}
+    assert brain.names("space") == ["b"]
+    assert brain.ns("space").metadata(output="list")[0]["name"] == "b"
+    assert brain.names_by_namespace(["spaces"]) == {"spaces": ["c"]}
+    for namespace, names in brain.names_by_namespace().items():
+        assert sorted(names) == sorted(brain.names(namespace))
+    # ITS RECORDS WOULD BE SKIPPED AS BRAIN'S OWN OBJECTS
+    with pytest.raises(exceptions.BrainNamespaceNameError):
+        brain.ns("brain_data")
+
+
 def test_hash(brain):
     assert (
         brain._hash("this", 20)
@@ -156,3 +233,140 @@ def test_name_to_namespace_hash(brain):
         brain._name_to_namespace_hash("this").binary()
         == b"default\xee\xd2\xee\x1a\x9do\x15ue.Y\xe1\xd1"
     )
+
+
+def test_pin(brain):
+    brain["this"] = "that"
+    with brain.pin("this") as value:
+        assert value == "that"
+
+    pinned = brain.pin("this")
+    assert not pinned.released
+    pinned.release()
+    assert pinned.released
+    with pytest.raises(exceptions.BrainValueReleasedError):
+        pinned.value
+
+
+def test_pin_not_exist(brain):
+    with pytest.raises(KeyError):
+        brain.pin("this")
+
+
+def test_reclaim_deferred(brain, monkeypatch):
+    brain["this"] = "that"
+    old_value_id = brain.object_id("this")
+
+    delete = brain.client.delete
+
+    def fail(object_ids):
+        if old_value_id in object_ids:
+            raise OSError("object in use")
+        return delete(object_ids)
+
+    # A FAILED DELETE OF THE OLD VALUE DOESN'T FAIL THE WRITE
+    monkeypatch.setattr(brain.client, "delete", fail)
+    brain["this"] = "other"
+    assert brain["this"] == "other"
+    assert brain.reclaim() == 1
+
+    monkeypatch.undo()
+    assert brain.reclaim() == 0
+    assert not brain.client.contains(old_value_id)
+
+
+def test_forget_delete_fails(brain, monkeypatch):
+    brain["this"] = "that"
+    brain["other"] = "thing"
+    usage = brain.usage()
+    metadata_id = brain._name_to_namespace_hash("this")
+    delete = brain.client.delete
+
+    def fail(object_ids):
+        if metadata_id in object_ids:
+            raise OSError("store unavailable")
+        return delete(object_ids)
+
+    # THE NAME STILL EXISTS, AND IS STILL COUNTED
+    monkeypatch.setattr(brain.client, "delete", fail)
+    with pytest.raises(OSError):
+        brain.forget("this")
+    assert brain["this"] == "that"
+    assert brain.usage() == usage
+
+    # ITS RECORD ISN'T DELETED LATER, ONCE IT'S LEARNED AGAIN
+    monkeypatch.undo()
+    brain["this"] = "again"
+    brain["another"] = "one"
+    assert brain.reclaim() == 0
+    assert sorted(brain.names()) == ["another", "other", "this"]
+    assert brain["this"] == "again"
+
+
+def test_prefetch(brain):
+    brain["this"] = ["that"]
+    brain["other"] = ["thing"]
+    handle = brain.prefetch(["this", "other", "missing"]).wait()
+    assert handle.done()
+    assert sorted(handle.loaded) == ["other", "this"]
+    assert handle.skipped == ["missing"]
+    assert handle.bytes > 0
+
+    # HELD VALUES ARE SERVED WITHOUT DESERIALIZING AGAIN
+    assert brain["this"] is brain["this"]
+
+    # A NEW VALUE REPLACES THE HELD ONE
+    brain["this"] = ["new"]
+    assert brain["this"] == ["new"]
+    assert sorted(brain._prefetched) == [
+        brain._name_to_namespace_hash("other").binary()
+    ]
+
+
+def test_prefetch_replaced_elsewhere(simulated):
+    brain, other = simulated(), simulated()
+    brain["this"] = ["that"]
+    brain["other"] = ["thing"]
+    brain.prefetch().wait()
+
+    # ANOTHER PROCESS REPLACES THE VALUES; THE HELD ONES ARE DROPPED ONCE SEEN TO BE STALE
+    other["this"] = ["new"]
+    other["other"] = ["new thing"]
+    assert brain["this"] == ["new"]
+    assert dict(brain.iter_items())["other"] == ["new thing"]
+    assert brain._prefetched == {}
+
+
+def test_prefetch_namespace_max_bytes(brain):
+    brain["this"] = "that"
+    brain["other"] = "thing"
+    handle = brain.prefetch(max_bytes=1).wait()
+    assert handle.loaded == []
+    assert sorted(handle.skipped) == ["other", "this"]
+
+    handle = brain.prefetch(namespace="default").wait()
+    assert sorted(handle.loaded) == ["other", "this"]
+    brain.clear_prefetched()
+    assert brain._prefetched == {}
+
+    # ONLY THE CURRENT NAMESPACE, NOT ONE IT'S A PREFIX OF
+    brain.set_namespace("space")
+    brain["mine"] = 1
+    brain.set_namespace("spaces")
+    brain["other"] = 2
+    brain.set_namespace("space")
+    assert brain.prefetch().wait().loaded == ["mine"]
+
+
+def test_sleep_wake_up(simulated):
+    brain = simulated(slab_threshold=1024)
+    brain["this"] = "that"
+    brain.usage()
+    old = brain.client
+    brain.sleep()
+    brain.wake_up()
+    assert isinstance(brain.client, SimulatedPlasmaClient) and brain.client is not old
+    assert brain._usages == {} and brain._slab_directories == {}
+    assert brain["this"] == "that"
+    brain["other"] = "thing"
+    assert brain._slab_directories["default"].client is brain.client
@@ -0,0 +1,109 @@
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from brain_plasma import chunks
+from brain_plasma import exceptions
+
+
+def batch(start, n=3):
+    return pa.RecordBatch.from_arrays(
+        [pa.array(range(start, start + n)), pa.array([str(x) for x in range(n)])],
+        names=["i", "s"],
+    )
+
+
+def test_append(brain):
+    brain.append("table", batch(0))
+    brain.append("table", batch(3))
+    brain.append("table", pa.Table.from_batches([batch(6)]))
+    table = brain["table"]
+    assert isinstance(table, pa.Table)
+    assert table.column("i").to_pylist() == list(range(9))
+    assert table.column("i").num_chunks == 3
+    assert brain.usage()["names"] == 1
+    assert brain.usage()["bytes"] == brain.metadata("table")["size"]
+
+    # DATAFRAMES ARE APPENDED WITHOUT THEIR INDEX
+    brain.append("frame", pd.DataFrame({"a": [1, 2]}, index=[5, 6]))
+    assert brain["frame"].column_names == ["a"]
+
+
+def test_append_errors(brain):
+    brain["this"] = 1
+    with pytest.raises(exceptions.BrainAppendError):
+        brain.append("this", batch(0))
+    brain.append("table", batch(0))
+    with pytest.raises(exceptions.BrainAppendError):
+        brain.append("table", pa.record_batch([pa.array([1.5])], names=["x"]))
+    with pytest.raises(TypeError):
+        brain.append("table", [1, 2])
+
+
+def test_append_quota(simulated):
+    brain = simulated()
+    brain.set_quota(max_bytes=5000)
+    brain.append("table", batch(0))
+    before = brain.client.calls["create"]
+    # A CHUNK OVER QUOTA IS REJECTED BEFORE IT TAKES ANY SPACE IN THE STORE
+    with pytest.raises(exceptions.BrainQuotaExceededError):
+        brain.append("table", batch(0, 1000))
+    assert brain.client.calls["create"] == before
+    assert brain["table"].num_rows == 3
+    assert brain.usage()["bytes"] == brain.metadata("table")["size"]
+
+
+def test_compact(brain):
+    for i in range(4):
+        brain.append("table", batch(3 * i))
+    before = brain["table"]
+    assert brain.compact("table") == 4
+    after = brain["table"]
+    assert after.equals(before)
+    assert after.column("i").num_chunks == 1
+    assert brain.usage()["bytes"] == brain.metadata("table")["size"]
+
+    # APPENDS AFTER COMPACTION FOLLOW THE MERGED CHUNK
+    brain.append("table", batch(12))
+    assert brain["table"].column("i").to_pylist() == list(range(15))
+    assert brain.compact("table") == 2
+
+    # FORGETTING DELETES EVERY CHUNK
+    brain.forget("table")
+    assert len(brain.client.data) == len(
+        [x for x in brain.client.data if x.binary().startswith(b"brain_")]
+    )
+
+
+def test_compact_while_reading(brain):
+    for i in range(3):
+        brain.append("table", batch(3 * i))
+    chunk_ids = chunks.unpack_ids(brain.metadata("table")["extra"])
+    get_buffers = brain.client.get_buffers
+
+    def compact_first(object_ids, *args, **kwargs):
+        # A COMPACTION LANDS AFTER THE RECORD WAS READ, BEFORE ITS CHUNKS ARE
+        if object_ids == chunk_ids:
+            brain.client.get_buffers = get_buffers
+            assert brain.compact("table") == 3
+        return get_buffers(object_ids, *args, **kwargs)
+
+    brain.client.get_buffers = compact_first
+    assert brain["table"].column("i").to_pylist() == list(range(9))
+
+    for i in range(3, 5):
+        brain.append("table", batch(3 * i))
+    chunk_ids = chunks.unpack_ids(brain.metadata("table")["extra"])
+    brain.client.get_buffers = compact_first
+    items = dict(brain.iter_items())
+    assert items["table"].column("i").to_pylist() == list(range(15))
+    assert brain["table"].column("i").num_chunks == 1
+
+
+def test_compact_in_background(brain):
+    for i in range(3):
+        brain.append("table", batch(3 * i), compact_at=3)
+    brain._compactor.shutdown(wait=True)
+    table = brain["table"]
+    assert table.column("i").num_chunks == 1
+    assert table.column("i").to_pylist() == list(range(9))
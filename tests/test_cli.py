@@ -0,0 +1,109 @@
+import io
+
+import numpy as np
+import pytest
+
+from brain_plasma import Brain
+from brain_plasma.cli import Top, main, top
+from brain_plasma.mock import MockPlasmaClient, SimulatedPlasmaClient
+
+
+@pytest.fixture(scope="function")
+def brain():
+    """instrumented Brain with mocked plasma_store client"""
+    return Brain(ClientClass=MockPlasmaClient, instrument=True)
+
+
+def test_stats(brain):
+    brain["this"] = 1
+    brain["this"]
+    brain["this"]
+    del brain["this"]
+    stats = brain.stats()
+    assert stats["learn"]["calls"] == 1
+    assert stats["recall"]["calls"] == 2
+    assert stats["forget"]["calls"] == 1
+    assert stats["pin"]["calls"] == 0
+    assert stats["recall"]["nanoseconds"] > 0
+
+    # UNINSTRUMENTED BRAINS DON'T COUNT
+    other = Brain(ClientClass=MockPlasmaClient)
+    other["that"] = 1
+    assert other.stats()["learn"]["calls"] == 0
+
+
+def test_top_tick(brain):
+    brain["small"] = 1
+    brain["big"] = np.zeros(1000)
+    view = Top(brain.client, brain.path, largest=1, scan_interval=0)
+    snapshot = view.tick()
+    assert snapshot["namespaces"]["default"]["names"] == 2
+    assert [x[2] for x in snapshot["largest"]] == ["big"]
+    assert snapshot["operations"]["learn"]["calls"] == 2
+    assert snapshot["operations"]["learn"]["rate"] is None
+
+    # NOTHING CHANGED, SO THE RECORDS AREN'T SCANNED AGAIN
+    scans = []
+    view._scan = scans.append
+    brain["big"]
+    snapshot = view.tick()
+    assert scans == []
+    assert snapshot["operations"]["recall"]["rate"] > 0
+
+    brain["bigger"] = np.zeros(2000)
+    view.tick()
+    assert scans == [["default"]]
+
+    text = view.render(snapshot)
+    assert "default" in text
+    assert "recall" in text
+
+
+def test_top_scan_interval(brain):
+    brain["this"] = np.zeros(1000)
+    view = Top(brain.client, brain.path, scan_interval=60)
+    assert [x[2] for x in view.tick()["largest"]] == ["this"]
+
+    # THE COUNTERS ARE CURRENT, THE LARGEST NAMES WAIT FOR THE NEXT SCAN
+    scans = []
+    view._scan = scans.append
+    brain["that"] = np.zeros(2000)
+    assert view.tick()["namespaces"]["default"]["names"] == 2
+    assert scans == []
+    view._last_scan -= 60
+    view.tick()
+    assert scans == [["default"]]
+
+
+def test_top_read_only(simulated):
+    brain = simulated()
+    brain["this"] = 1
+    brain.ns("empty")
+    client = SimulatedPlasmaClient(brain.path)
+    before = brain.client.list()
+    view = Top(client, brain.path)
+    snapshot = view.tick()
+    view.tick()
+    # NAMESPACES WITHOUT COUNTERS ARE SKIPPED RATHER THAN GIVEN NEW ONES
+    assert list(snapshot["namespaces"]) == ["default"]
+    assert brain.client.list() == before
+    assert not {"put", "put_raw_buffer", "create", "delete"} & set(client.calls)
+
+
+def test_top_once():
+    class Args:
+        path = "/tmp/plasma"
+        largest = 10
+        once = True
+        interval = 0
+        scan_interval = 30
+
+    out = io.StringIO()
+    top(Args, ClientClass=MockPlasmaClient, out=out)
+    assert "NAMESPACE" in out.getvalue()
+    assert "OPERATION" not in out.getvalue()
+
+
+def test_main_requires_command():
+    with pytest.raises(SystemExit):
+        main([])
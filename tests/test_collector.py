@@ -0,0 +1,108 @@
+import threading
+import time
+
+import numpy as np
+import pyarrow as pa
+import pytest
+
+
+@pytest.fixture(scope="function")
+def brain(simulated):
+    """Brain with a simulated plasma_store, which reports object creation times"""
+    return simulated()
+
+
+def test_collect_orphans(brain):
+    brain["this"] = np.arange(100)
+    brain["that"] = 1
+    orphan = brain.client.put(np.arange(1000))
+    size = brain.client.list()[orphan]["data_size"]
+
+    # TOO YOUNG: IT COULD BELONG TO A LEARN IN PROGRESS
+    assert brain.collect(grace=60)["orphaned_objects"] == 0
+
+    report = brain.collect(grace=0, dry_run=True)
+    assert report == {
+        "orphaned_objects": 1,
+        "dangling_names": [],
+        "orphaned_files": 0,
+        "bytes": size,
+    }
+    assert brain.client.contains(orphan)
+
+    assert brain.collect(grace=0)["orphaned_objects"] == 1
+    assert not brain.client.contains(orphan)
+    assert (brain["this"] == np.arange(100)).all()
+    assert brain["that"] == 1
+    assert brain.collect(grace=0)["orphaned_objects"] == 0
+
+
+def test_collect_dangling(brain):
+    brain["this"] = 1
+    brain.set_namespace("another")
+    brain["that"] = 2
+    brain.client.delete([brain.object_id("that")])
+    brain.set_namespace("default")
+
+    report = brain.collect(grace=0)
+    assert report["dangling_names"] == [("another", "that")]
+    assert report["orphaned_objects"] == 0
+    assert report["bytes"] > 0
+    brain.set_namespace("another")
+    assert "that" not in brain
+    assert brain.usage()["names"] == 0
+    brain.set_namespace("default")
+    assert brain["this"] == 1
+
+
+def test_collect_during_append(brain):
+    brain.append("tab", pa.table({"a": [1, 2]}))
+    list_ = brain.client.list
+    appender = threading.Thread(
+        target=brain.append, args=("tab", pa.table({"a": [3]}))
+    )
+
+    def list_then_append():
+        listing = list_()
+        # ANOTHER THREAD REPLACES THE RECORD RIGHT AFTER THE LISTING, IF IT CAN
+        if not appender.is_alive() and appender.ident is None:
+            appender.start()
+            appender.join(0.2)
+        return listing
+
+    brain.client.list = list_then_append
+    report = brain.collect(grace=0)
+    appender.join()
+    brain.client.list = list_
+    assert report["orphaned_objects"] == 0
+    assert report["dangling_names"] == []
+    assert brain["tab"].column("a").to_pylist() == [1, 2, 3]
+
+
+def test_collect_keeps_brain_objects(brain):
+    brain.counter("hits").incr()
+    brain.append("table", pa.record_batch([[1, 2]], names=["a"]))
+    brain.append("table", pa.record_batch([[3]], names=["a"]))
+    brain.learn_view("view", "table", rows=slice(0, 1))
+    objects = len(brain.client.list())
+    assert brain.collect(grace=0) == {
+        "orphaned_objects": 0,
+        "dangling_names": [],
+        "orphaned_files": 0,
+        "bytes": 0,
+    }
+    assert len(brain.client.list()) == objects
+    assert brain["hits"] == 1
+
+
+def test_collector_thread(brain):
+    orphan = brain.client.put(1)
+    collector = brain.start_collector(interval=0.01, grace=0)
+    deadline = time.time() + 5
+    while brain.client.contains(orphan) and time.time() < deadline:
+        time.sleep(0.01)
+    brain.stop_collector()
+    assert not collector.running
+    assert not brain.client.contains(orphan)
+    assert collector.objects >= 1
+    assert collector.runs >= 1
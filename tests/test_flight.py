@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from brain_plasma import exceptions
+
+flight = pytest.importorskip("pyarrow.flight")
+
+from brain_plasma.flight import BrainFlightServer, RemoteBrain
+
+
+@pytest.fixture(scope="function")
+def remote(brain):
+    """RemoteBrain talking to a Flight server for brain on localhost"""
+    server = BrainFlightServer(brain, "grpc://127.0.0.1:0")
+    remote = RemoteBrain(f"grpc://127.0.0.1:{server.port}")
+    yield remote
+    remote.close()
+    server.shutdown()
+
+
+def test_recall_table(brain, remote):
+    table = pa.table({"a": np.arange(1000), "b": np.arange(1000) * 0.5})
+    brain["table"] = table
+    assert brain.metadata("table")["codec"] == 8
+    got = remote["table"]
+    assert isinstance(got, pa.Table)
+    assert got.equals(table)
+    assert remote.schema("table") == table.schema
+
+
+def test_recall_dataframe(brain, remote):
+    df = pd.DataFrame(
+        {"x": ["a", "b", "c"], "y": pd.Categorical(["u", "v", "u"])}, index=[10, 20, 30]
+    )
+    brain["strings"] = df
+    numeric = pd.DataFrame({"x": np.arange(5)})
+    brain["numeric"] = numeric
+    pd.testing.assert_frame_equal(remote["strings"], df)
+    pd.testing.assert_frame_equal(remote["numeric"], numeric)
+
+
+def test_recall_appended(brain, remote):
+    brain.append("log", pa.table({"a": [1, 2]}))
+    brain.append("log", pa.table({"a": [3]}))
+    assert remote["log"].column("a").to_pylist() == [1, 2, 3]
+    assert remote.schema("log").names == ["a"]
+
+
+def test_learn(brain, remote):
+    table = pa.table({"a": [1, 2, 3]})
+    remote.learn("table", table, description="three rows")
+    assert brain["table"].equals(table)
+    assert brain.metadata("table")["description"] == "three rows"
+
+    df = pd.DataFrame({"x": [1.0, 2.0]}, index=["a", "b"])
+    remote["df"] = df
+    pd.testing.assert_frame_equal(brain["df"], df)
+    pd.testing.assert_frame_equal(remote["df"], df)
+
+    remote["batch"] = pa.record_batch([pa.array([1])], names=["a"])
+    assert brain["batch"].column("a").to_pylist() == [1]
+
+    with pytest.raises(TypeError):
+        remote["array"] = np.arange(3)
+    with pytest.raises(exceptions.BrainNameTypeError):
+        remote.learn(1, table)
+
+
+def test_names_exists_forget(brain, remote):
+    brain["a"] = pa.table({"a": [1]})
+    brain["b"] = 5
+    assert sorted(remote.names()) == ["a", "b"]
+    assert len(remote) == 2
+    assert "a" in remote
+    assert "c" not in remote
+    # VALUES THAT AREN'T STORED AS ARROW ARE LISTED WITHOUT A SCHEMA
+    assert remote.schema("b") == pa.schema([])
+
+    del remote["a"]
+    assert brain.names() == ["b"]
+    remote.forget("a")
+
+
+def test_missing_and_unsupported(brain, remote):
+    with pytest.raises(KeyError):
+        remote["nope"]
+    with pytest.raises(KeyError):
+        remote.schema("nope")
+    brain["number"] = 5
+    with pytest.raises(flight.FlightError):
+        remote["number"]
@@ -0,0 +1,69 @@
+import pytest
+
+from brain_plasma import Brain
+from brain_plasma.index import NameIndex
+from brain_plasma.mock import MockPlasmaClient
+
+
+@pytest.fixture(scope="function")
+def index():
+    index = NameIndex()
+    index.add("user_123_a", "daily report")
+    index.add("user_123_b", "weekly reports tag:finance")
+    index.add("user_124_a", "tag:finance")
+    index.add("other", "")
+    return index
+
+
+def test_prefix(index):
+    assert index.find(prefix="user_123_") == ["user_123_a", "user_123_b"]
+    assert index.find(prefix="nothing") == []
+    assert index.find() == ["other", "user_123_a", "user_123_b", "user_124_a"]
+
+
+def test_pattern(index):
+    assert index.find(pattern="user_*_a") == ["user_123_a", "user_124_a"]
+    assert index.find(pattern="user_12?_b") == ["user_123_b"]
+    assert index.find(prefix="user_124", pattern="user_123*") == []
+    assert index.find(prefix="user_", pattern="*a") == ["user_123_a", "user_124_a"]
+
+
+def test_description(index):
+    assert index.find(description_contains="tag:finance") == [
+        "user_123_b",
+        "user_124_a",
+    ]
+    assert index.find(description_contains="report") == ["user_123_a", "user_123_b"]
+    assert index.find(description_contains="ly rep") == ["user_123_a", "user_123_b"]
+    assert index.find(prefix="user_124", description_contains="finance") == [
+        "user_124_a"
+    ]
+
+
+def test_add_remove(index):
+    index.add("user_123_a", "tag:finance")
+    assert index.find(description_contains="daily") == []
+    assert "user_123_a" in index.find(description_contains="finance")
+
+    index.remove("user_123_a")
+    index.remove("missing")
+    assert "user_123_a" not in index
+    assert index.find(prefix="user_123") == ["user_123_b"]
+
+
+def test_brain_find():
+    brain = Brain(ClientClass=MockPlasmaClient)
+    brain.learn("user_123_a", 1, description="tag:finance")
+    brain.learn("user_124_a", 2)
+    assert brain.find(prefix="user_123") == ["user_123_a"]
+
+    # THE INDEX IS KEPT CURRENT BY LEARN AND FORGET
+    brain.learn("user_123_b", 3)
+    brain.forget("user_123_a")
+    assert brain.find(prefix="user_123") == ["user_123_b"]
+    assert brain.find(description_contains="finance") == []
+
+    brain.set_namespace("newspace")
+    brain.learn("user_123_c", 4)
+    assert brain.find(prefix="user_123") == ["user_123_c"]
+    assert brain.find(prefix="user_123", namespace="default") == ["user_123_b"]
@@ -0,0 +1,68 @@
+import numpy as np
+
+from brain_plasma import Brain
+from brain_plasma.mock import MockPlasmaClient
+
+
+def test_iter_names(brain):
+    for i in range(25):
+        brain[f"x{i}"] = i
+    assert sorted(brain.iter_names(batch_size=10)) == sorted(brain.names())
+    assert sorted(brain) == sorted(brain.names())
+
+    brain.set_namespace("newspace")
+    brain["other"] = 1
+    assert list(brain.iter_names()) == ["other"]
+    assert len(list(brain.iter_names(namespace="default"))) == 25
+
+
+def test_iter_names_batches(simulated):
+    brain = simulated()
+    for i in range(25):
+        brain[f"x{i}"] = i
+    brain.client.calls.clear()
+
+    names = brain.iter_names(batch_size=10)
+    next(names)
+    # THE FIRST NAME NEEDS ONE BATCH OF RECORDS
+    assert brain.client.calls["get_buffers"] == 1
+    assert len(list(names)) == 24
+    # THREE BATCHES OF RECORDS AND A LOOK FOR THE SLAB DIRECTORY
+    assert brain.client.calls["get_buffers"] == 4
+    assert brain.client.calls["list"] == 1
+
+
+def test_iter_items(brain):
+    for i in range(25):
+        brain[f"x{i}"] = np.full(10, i)
+    brain.learn_view("view", "x3", rows=slice(0, 2))
+    items = dict(brain.iter_items(batch_size=7))
+    assert len(items) == 26
+    for i in range(25):
+        assert (items[f"x{i}"] == np.full(10, i)).all()
+    assert (items["view"] == np.full(2, 3)).all()
+
+
+def test_iter_items_changes(brain):
+    for i in range(5):
+        brain[f"x{i}"] = i
+    items = brain.iter_items(batch_size=10)
+    first = next(items)
+    # THE REST OF THE BATCH WAS READ ALREADY; ITS NAMES CHANGE UNDER THE SCAN
+    rest = sorted(f"x{i}" for i in range(5) if f"x{i}" != first[0])
+    del brain[rest[0]]
+    brain[rest[1]] = 100
+    got = dict(items)
+    assert rest[0] not in got
+    assert got[rest[1]] == 100
+    assert len(got) == 3
+
+
+def test_iter_items_slabs():
+    brain = Brain(ClientClass=MockPlasmaClient, slab_threshold=1024)
+    brain["small"] = 1
+    brain["large"] = np.arange(1000)
+    items = dict(brain.iter_items())
+    assert items["small"] == 1
+    assert (items["large"] == np.arange(1000)).all()
+    assert sorted(brain.iter_names()) == ["large", "small"]
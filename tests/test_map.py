@@ -0,0 +1,80 @@
+import multiprocessing
+import shutil
+
+import numpy as np
+import pytest
+from pyarrow import plasma
+
+from brain_plasma import Brain
+
+
+# fn MUST BE PICKLABLE TO GO TO THE WORKERS
+def total(x):
+    return int(x.sum())
+
+
+def double(x):
+    return x * 2
+
+
+def zero_copy(x):
+    return not x.flags.owndata and not x.flags.writeable
+
+
+def test_map_in_process(brain):
+    for i in range(5):
+        brain[f"x{i}"] = np.full(10, i)
+    names = [f"x{i}" for i in range(5)]
+    assert brain.map(total, names, processes=0) == [10 * i for i in range(5)]
+    assert sorted(brain.map(total, processes=0)) == [10 * i for i in range(5)]
+
+    assert brain.map(double, names, processes=0, out_namespace="doubled") is None
+    assert "doubled" in brain.namespaces()
+    assert brain.namespace == "default"
+    assert sorted(brain.names("doubled")) == sorted(names)
+    brain.set_namespace("doubled")
+    assert (brain["x3"] == np.full(10, 6)).all()
+
+    with pytest.raises(KeyError):
+        brain.map(total, ["nope"], processes=0)
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="needs fork"
+)
+def test_map_processes(simulated):
+    # THE SIMULATED STORE LIVES IN THIS PROCESS; FORKED WORKERS SEE A COPY OF IT
+    fork = multiprocessing.get_context("fork")
+    brain = simulated()
+    names = [f"x{i}" for i in range(20)]
+    for i, name in enumerate(names):
+        brain[name] = np.full(10, i)
+    assert brain.map(total, names, processes=2, mp_context=fork) == [
+        10 * i for i in range(20)
+    ]
+    assert brain.map(total, [], processes=2, mp_context=fork) == []
+    with pytest.raises(KeyError):
+        brain.map(total, ["x1", "nope"], processes=2, mp_context=fork)
+
+
+@pytest.mark.skipif(shutil.which("plasma_store") is None, reason="needs plasma_store")
+def test_map_store():
+    with plasma.start_plasma_store(50_000_000) as (path, _):
+        brain = Brain(path=path)
+        names = [f"x{i}" for i in range(20)]
+        for i, name in enumerate(names):
+            brain[name] = np.full(1000, i)
+        # WORKERS GET VIEWS OF SHARED MEMORY; SPAWNED ONES INHERIT NOTHING FROM THIS PROCESS
+        spawn = multiprocessing.get_context("spawn")
+        assert all(brain.map(zero_copy, names, processes=2, mp_context=spawn))
+        assert brain.map(total, names, processes=2, mp_context=spawn) == [
+            1000 * i for i in range(20)
+        ]
+        assert all(brain.map(zero_copy, names, processes=2))
+
+        brain.map(double, names, processes=2, out_namespace="doubled")
+        assert sorted(brain.names("doubled")) == sorted(names)
+        brain.set_namespace("doubled")
+        for i, name in enumerate(names):
+            assert (brain[name] == np.full(1000, 2 * i)).all()
+        assert brain.usage()["names"] == 20
@@ -0,0 +1,106 @@
+import threading
+
+import pytest
+
+from brain_plasma import exceptions
+
+
+def test_counter(brain):
+    counter = brain.counter("hits", initial=5)
+    assert counter.incr() == 6
+    assert counter.incr(10) == 16
+    assert counter.decr() == 15
+    assert brain["hits"] == 15
+
+    # A SECOND HANDLE SHARES THE SAME MEMORY AND KEEPS THE VALUE
+    other = brain.counter("hits", initial=0)
+    other.incr()
+    assert counter.value == 16
+    counter.set(0)
+    assert brain["hits"] == 0
+    assert "hits" in brain.names()
+    assert brain.usage()["names"] == 1
+
+
+def test_counter_threads(brain):
+    counter = brain.counter("hits")
+
+    def work():
+        for _ in range(1000):
+            counter.incr()
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert counter.value == 4000
+
+
+def test_log(brain):
+    log = brain.log("events", dtype=[("t", "f8"), ("code", "i4")], capacity=4)
+    assert log.append((1.5, 7)) == 0
+    assert log.extend([(2.5, 8), (3.5, 9)]) == 1
+    assert len(log) == 3
+    assert list(log.records()["code"]) == [7, 8, 9]
+
+    recalled = brain["events"]
+    assert recalled.dtype.names == ("t", "code")
+    assert list(recalled["t"]) == [1.5, 2.5, 3.5]
+    assert not recalled.flags.writeable
+
+    # AN EXISTING LOG KEEPS ITS LAYOUT
+    other = brain.log("events")
+    assert other.dtype == log.dtype
+    other.append((4.5, 10))
+    with pytest.raises(exceptions.BrainLogFullError):
+        log.append((5.5, 11))
+    with pytest.raises(exceptions.BrainLogFullError):
+        brain.log("more", capacity=1).extend([1.0, 2.0])
+
+
+def test_log_nested_dtype(brain):
+    dtype = [("t", "f8"), ("pos", [("x", "f4"), ("y", "f4")]), ("hist", "i2", (3,))]
+    log = brain.log("tracks", dtype=dtype, capacity=2)
+    log.append((1.5, (2.0, 3.0), (1, 2, 3)))
+    assert brain.log("tracks").dtype == log.dtype
+    recalled = brain["tracks"]
+    assert recalled.dtype == log.dtype
+    assert float(recalled["pos"]["y"][0]) == 3.0
+    assert list(recalled["hist"][0]) == [1, 2, 3]
+
+    # A LAYOUT THAT CAN'T BE SHARED IS REJECTED BEFORE THE LOG IS CREATED
+    with pytest.raises(exceptions.BrainSharedObjectError):
+        brain.log("objects", dtype=[("o", "O")])
+    assert "objects" not in brain
+
+
+def test_shared_object_errors(brain):
+    brain["this"] = 1
+    brain.counter("hits")
+    with pytest.raises(exceptions.BrainSharedObjectError):
+        brain.counter("this")
+    with pytest.raises(exceptions.BrainSharedObjectError):
+        brain.log("hits")
+    with pytest.raises(exceptions.BrainNameTypeError):
+        brain.counter(5)
+
+
+def test_log_quota(simulated):
+    brain = simulated()
+    brain.set_quota(max_bytes=100_000)
+    # AN 8 MB LOG OVER QUOTA IS NEVER CREATED
+    with pytest.raises(exceptions.BrainQuotaExceededError):
+        brain.log("events")
+    assert brain.client.calls["create"] == 0
+    assert brain.usage()["bytes"] == 0
+    assert brain.log("events", capacity=100).capacity == 100
+
+
+def test_forget_and_relearn(brain):
+    brain.log("events", capacity=10).append(1.0)
+    brain["events"] = "plain value"
+    assert brain["events"] == "plain value"
+    brain.counter("hits").incr()
+    del brain["hits"]
+    assert brain.counter("hits").value == 0
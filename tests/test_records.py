@@ -0,0 +1,163 @@
+import threading
+
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from brain_plasma import exceptions
+from brain_plasma import records
+
+
+@pytest.fixture(scope="function")
+def metadata():
+    return {
+        "name": "this",
+        "value_id": b"v" * 20,
+        "description": "a description",
+        "metadata_id": b"m" * 20,
+        "namespace": "default",
+        "codec": 0,
+        "size": 1234,
+        "learned_at": 1600000000.5,
+        "extra": b"\x00extra",
+        "tier": 0,
+    }
+
+
+def test_pack_unpack(metadata):
+    record = records.pack(metadata)
+    assert len(record) == records.HEADER.size + len("thisdefaulta description\x00extra")
+    assert len(record) == records.packed_size(metadata)
+    assert records.unpack(record) == metadata
+
+
+def test_unpack_names(metadata):
+    other = dict(metadata, name="that", namespace="newspace")
+    buffers = [records.pack(metadata), records.pack(other), None]
+    assert records.unpack_names(buffers) == ["this", "that"]
+    assert records.unpack_names(buffers, "newspace") == ["that"]
+    assert records.unpack_name(records.pack(metadata), "newspace") is None
+
+
+def test_forgotten_record(metadata):
+    other = dict(metadata, name="that")
+    buffer = pa.py_buffer(bytearray(records.pack(metadata)))
+    records.mark_forgotten(buffer)
+    assert records.forgotten(buffer)
+    assert records.unpack(buffer) is None
+    assert records.unpack_name(buffer) is None
+    assert records.unpack_many([buffer, records.pack(other)]) == [other]
+    assert records.group_names([buffer, records.pack(other)]) == {"default": ["that"]}
+
+
+def test_unpack_bad_record():
+    with pytest.raises(exceptions.BrainMetadataRecordError):
+        records.unpack(b"not a record")
+
+    with pytest.raises(exceptions.BrainMetadataRecordError):
+        records.unpack(b"x" * records.HEADER.size)
+
+
+def test_brain_stores_records(brain):
+    brain.learn("this", "that", description="something")
+    metadata_id = brain._name_to_namespace_hash("this")
+    stored = brain.client.data[metadata_id]
+    assert stored.startswith(records.RECORD_MAGIC)
+    assert records.unpack(stored)["description"] == "something"
+    assert brain.metadata("this")["metadata_id"] == metadata_id.binary()
+
+
+def test_update_keeps_description(brain):
+    brain.learn("this", "that", description="something")
+    brain.learn("this", "other")
+    assert brain["this"] == "other"
+    assert brain.metadata("this")["description"] == "something"
+
+
+def test_update_record_unpackable(brain, monkeypatch):
+    brain["this"] = "that"
+    usage = brain.usage()
+
+    def fail(metadata):
+        raise exceptions.BrainMetadataRecordError("bad record")
+
+    # THE NEW RECORD IS PACKED BEFORE THE OLD ONE IS DELETED, SO NOTHING CHANGES
+    monkeypatch.setattr(records, "pack", fail)
+    with pytest.raises(exceptions.BrainUpdateNameError, match="Rolled back"):
+        brain["this"] = "other"
+    monkeypatch.undo()
+    assert brain["this"] == "that"
+    assert brain.usage() == usage
+
+
+def test_update_record_put_fails(simulated, monkeypatch):
+    brain = simulated()
+    brain["this"] = np.arange(10)
+    brain["other"] = 1
+    usage = brain.usage()
+    metadata_id = brain._name_to_namespace_hash("this")
+    put_raw_buffer = brain.client.put_raw_buffer
+
+    def fail(value, object_id=None, *args, **kwargs):
+        if object_id == metadata_id:
+            raise OSError("store unavailable")
+        return put_raw_buffer(value, object_id, *args, **kwargs)
+
+    # THE OLD RECORD IS ALREADY GONE, SO THE NAME IS TOO, AND ITS USAGE WITH IT
+    monkeypatch.setattr(brain.client, "put_raw_buffer", fail)
+    with pytest.raises(exceptions.BrainUpdateNameError, match="removed"):
+        brain["this"] = np.arange(20)
+    monkeypatch.undo()
+    assert not brain.exists("this")
+    assert brain.usage()["names"] == usage["names"] - 1
+    assert brain.usage()["bytes"] == brain.metadata("other")["size"]
+    assert brain.collect(grace=0, dry_run=True)["orphaned_objects"] == 0
+
+
+def test_concurrent_learns_of_one_name(simulated):
+    brain = simulated()
+
+    def learn(i):
+        for j in range(50):
+            brain["this"] = np.full(10 + j, i)
+
+    threads = [threading.Thread(target=learn, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # EACH LEARN REPLACED AND ACCOUNTED FOR THE VALUE THE PREVIOUS ONE STORED
+    assert brain.usage() == dict(
+        brain.usage(), names=1, bytes=brain.metadata("this")["size"]
+    )
+    assert brain.collect(grace=0, dry_run=True)["orphaned_objects"] == 0
+
+
+def test_recall_while_replaced(simulated):
+    brain = simulated()
+    brain["this"] = np.arange(10)
+    done = threading.Event()
+
+    def learn():
+        while not done.is_set():
+            brain["this"] = np.arange(10)
+
+    thread = threading.Thread(target=learn)
+    thread.start()
+    try:
+        # NEVER MISSING, THOUGH ITS RECORD AND VALUE ARE REPLACED ALL ALONG
+        for _ in range(200):
+            assert brain.exists("this")
+            assert len(brain["this"]) == 10
+    finally:
+        done.set()
+        thread.join()
+
+
+def test_set_namespace_without_listing(simulated):
+    brain = simulated()
+    brain.client.calls.clear()
+    brain.set_namespace("other")
+    brain.set_namespace("default")
+    assert brain.client.calls["list"] == 0
+    assert brain.namespaces() == {"default", "other"}
@@ -0,0 +1,198 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from brain_plasma import Brain
+from brain_plasma import exceptions
+from brain_plasma import serializers
+from brain_plasma.mock import MockPlasmaClient
+
+
+def test_for_object():
+    assert serializers.for_object(pd.DataFrame({"a": ["b"]})) is serializers.PANDAS
+    assert serializers.for_object(pd.DataFrame({"a": [1]})) is serializers.PLASMA
+    assert serializers.for_object({"a": 1}) is serializers.PLASMA
+    assert serializers.for_object(pa.table({"a": [1]})) is serializers.ARROW
+
+
+def test_by_code():
+    assert serializers.by_code(serializers.PANDAS.code) is serializers.PANDAS
+    with pytest.raises(exceptions.BrainSerializerError):
+        serializers.by_code(255)
+
+
+def test_pandas_roundtrip(brain):
+    df = pd.DataFrame(
+        {
+            "ints": np.arange(5),
+            "floats": np.linspace(0, 1, 5),
+            "strings": list("abcde"),
+            "category": pd.Categorical(list("xyxyx")),
+        },
+        index=pd.Index(list("vwxyz"), name="key"),
+    )
+    brain["df"] = df
+    assert brain.metadata("df")["codec"] == serializers.PANDAS.code
+
+    out = brain["df"]
+    pd.testing.assert_frame_equal(out, df)
+    assert out["category"].dtype == "category"
+    assert out.index.name == "key"
+
+
+def test_pandas_zero_copy(brain):
+    brain["df"] = pd.DataFrame({"a": np.arange(100), "b": ["b"] * 100})
+    assert brain.metadata("df")["codec"] == serializers.PANDAS.code
+    out = brain["df"]
+    # NUMERIC COLUMNS ARE READ-ONLY VIEWS ON THE STORED BUFFER
+    assert not out["a"].to_numpy().flags.writeable
+
+
+def test_pandas_fallback(brain):
+    # MIXED-TYPE OBJECT COLUMNS CAN'T BE CONVERTED TO ARROW
+    df = pd.DataFrame({"mixed": [1, "a", 2.0]})
+    brain["df"] = df
+    assert brain.metadata("df")["codec"] == serializers.PLASMA.code
+    pd.testing.assert_frame_equal(brain["df"], df)
+
+
+def test_arrow_roundtrip(brain):
+    table = pa.table({"a": np.arange(100), "b": ["x"] * 100})
+    brain["table"] = table
+    assert brain.metadata("table")["codec"] == serializers.ARROW.code
+    out = brain["table"]
+    assert out.equals(table)
+    # THE COLUMNS ARE VIEWS ON THE STORED BUFFER
+    stored = brain.client.get_buffers([brain.object_id("table")])[0]
+    address = out.column("a").chunk(0).buffers()[1].address
+    assert stored.address <= address < stored.address + stored.size
+    assert brain.recall_table("table").equals(table)
+
+
+def test_pickle5_roundtrip(brain):
+    array = np.arange(1000, dtype=np.float64)
+    thing = {"array": array, "nested": [1, "two", {"three": 3.0}]}
+    brain.learn("this", thing, serializer="pickle5")
+    assert brain.metadata("this")["codec"] == serializers.PICKLE5.code
+    value = brain["this"]
+    assert (value["array"] == array).all()
+    assert value["nested"] == thing["nested"]
+
+    # THE ARRAY IS A READ-ONLY VIEW OF THE STORED OBJECT
+    assert not value["array"].flags.owndata
+    assert not value["array"].flags.writeable
+    stored = brain.client.get_buffers([brain.object_id("this")])[0]
+    assert (value["array"].ctypes.data - stored.address) % 64 == 0
+
+    df = pd.DataFrame({"a": np.arange(10), "b": list("abcdefghij")})
+    brain.learn("df", df, serializer=serializers.PICKLE5)
+    pd.testing.assert_frame_equal(brain["df"], df)
+
+
+@pytest.mark.parametrize("format", ["csr", "csc", "coo"])
+def test_sparse_roundtrip(brain, format):
+    sparse = pytest.importorskip("scipy.sparse")
+    matrix = sparse.random(50, 40, density=0.1, format=format, random_state=0)
+    # INT64 INDICES WOULD BE CHECKED AND COPIED DOWN TO INT32 BY THE CONSTRUCTORS
+    if format != "coo":
+        matrix.indices = matrix.indices.astype(np.int64)
+    brain["matrix"] = matrix
+    assert brain.metadata("matrix")["codec"] == serializers.SPARSE.code
+
+    out = brain["matrix"]
+    assert type(out) is type(matrix)
+    assert out.shape == matrix.shape
+    assert (out != matrix).nnz == 0
+    assert (out @ np.ones(40) == matrix @ np.ones(40)).all()
+    # THE COMPONENTS ARE READ-ONLY VIEWS OF THE STORED OBJECT
+    stored = brain.client.get_buffers([brain.object_id("matrix")])[0]
+    for component in [out.data, out.col if format == "coo" else out.indices]:
+        assert not component.flags.writeable
+        assert stored.address <= component.ctypes.data < stored.address + stored.size
+    if format != "coo":
+        assert out.indices.dtype == np.int64
+
+    brain["array"] = sparse.csr_array(matrix)
+    assert isinstance(brain["array"], sparse.csr_array)
+
+
+def test_structured_roundtrip(brain):
+    dtype = np.dtype(
+        [("id", "<i8"), ("score", "<f4", (2,)), ("label", "U5"), ("point", [("x", "f8"), ("y", "f8")])]
+    )
+    array = np.zeros(10, dtype=dtype)
+    array["id"] = np.arange(10)
+    array["label"] = "abc"
+    array["point"]["y"] = 1.5
+    brain["array"] = array
+    assert brain.metadata("array")["codec"] == serializers.NDARRAY.code
+
+    out = brain["array"]
+    assert out.dtype == dtype
+    assert (out == array).all()
+    assert not out.flags.owndata and not out.flags.writeable
+
+    records = np.rec.fromarrays([np.arange(3), np.ones(3)], names="a,b")
+    brain["records"] = records
+    out = brain["records"]
+    assert isinstance(out, np.recarray)
+    assert (out.b == 1).all()
+
+    # PADDED, NON-CONTIGUOUS AND MULTI-DIMENSIONAL ARRAYS TOO
+    padded = np.zeros((4, 3), dtype=np.dtype({"names": ["a"], "formats": ["i4"], "itemsize": 8}))
+    padded["a"] = np.arange(12).reshape(4, 3)
+    brain["padded"] = padded[:, ::2]
+    assert (brain["padded"] == padded[:, ::2]).all()
+
+    # PLAIN ARRAYS STAY WITH THE PLASMA SERIALIZER UNLESS ASKED FOR
+    assert serializers.for_object(np.arange(3)) is serializers.PLASMA
+    brain.learn("plain", np.arange(3), serializer="ndarray")
+    assert (brain["plain"] == np.arange(3)).all()
+    with pytest.raises(exceptions.BrainLearnNameError):
+        brain.learn("objects", np.array([{}, 1], dtype=object), serializer="ndarray")
+
+
+def test_brain_serializer():
+    brain = Brain(ClientClass=MockPlasmaClient, serializer="pickle5")
+    brain["this"] = [1, 2, 3]
+    assert brain.metadata("this")["codec"] == serializers.PICKLE5.code
+    brain.learn("that", [1, 2, 3], serializer="plasma")
+    assert brain.metadata("that")["codec"] == serializers.PLASMA.code
+    with pytest.raises(exceptions.BrainSerializerError):
+        Brain(ClientClass=MockPlasmaClient, serializer="unknown")
+
+
+def test_register():
+    class Reversed:
+        code = 200
+        name = "reversed"
+
+        def accepts(self, thing):
+            return isinstance(thing, str)
+
+        def put(self, client, thing, object_id):
+            client.put(thing[::-1], object_id)
+            return self.code
+
+        def get(self, client, object_id, timeout_ms=100):
+            return client.get(object_id)[::-1]
+
+    with pytest.raises(exceptions.BrainSerializerError):
+        serializers.by_name(Reversed())
+    reversed_ = Reversed()
+    serializers.register(reversed_)
+    try:
+        brain = Brain(ClientClass=MockPlasmaClient)
+        brain.learn("this", "abc", serializer="reversed")
+        assert brain.client.data[brain.object_id("this")] == "cba"
+        assert brain["this"] == "abc"
+
+        clash = Reversed()
+        with pytest.raises(exceptions.BrainSerializerError):
+            serializers.register(clash)
+        clash.code = 5
+        with pytest.raises(exceptions.BrainSerializerError):
+            serializers.register(clash)
+    finally:
+        serializers.SERIALIZERS.pop(reversed_.code)
@@ -0,0 +1,76 @@
+import pytest
+
+from brain_plasma import ShardedBrain
+from brain_plasma.mock import MockPlasmaClient
+
+
+@pytest.fixture(scope="function")
+def brain():
+    """ShardedBrain over three mocked plasma_store clients"""
+    return ShardedBrain(
+        ["/tmp/plasma0", "/tmp/plasma1", "/tmp/plasma2"], ClientClass=MockPlasmaClient
+    )
+
+
+def test_routing(brain):
+    names = [f"name{i}" for i in range(300)]
+    shards = {brain._shard_index(name) for name in names}
+    assert shards == {0, 1, 2}
+    assert all(brain.shard(name) is brain.shard(name) for name in names)
+
+
+def test_routing_consistent():
+    two = ShardedBrain(["/tmp/plasma0", "/tmp/plasma1"], ClientClass=MockPlasmaClient)
+    three = ShardedBrain(
+        ["/tmp/plasma0", "/tmp/plasma1", "/tmp/plasma2"], ClientClass=MockPlasmaClient
+    )
+    # ADDING A SHARD ONLY MOVES NAMES ONTO THE NEW SHARD
+    for i in range(300):
+        name = f"name{i}"
+        moved = two._shard_index(name) != three._shard_index(name)
+        assert not moved or three._shard_index(name) == 2
+
+
+def test_learn_recall(brain):
+    brain["this"] = "that"
+    assert brain["this"] == "that"
+    assert "this" in brain
+    assert brain.shard("this").exists("this")
+    del brain["this"]
+    assert "this" not in brain
+
+
+def test_many(brain):
+    things = {f"name{i}": i for i in range(30)}
+    brain.learn_many(things)
+    assert sorted(brain.names()) == sorted(things)
+    assert brain.recall_many(things) == things
+    assert len(brain.metadata()) == 30
+    assert brain.usage()["names"] == 30
+    assert brain.find(prefix="name1") == sorted(x for x in things if x.startswith("name1"))
+    brain.forget_many(things)
+    assert brain.names() == []
+
+
+def test_namespaces(brain):
+    brain["this"] = "default"
+    brain.set_namespace("newspace")
+    brain["this"] = "newspace"
+    assert brain["this"] == "newspace"
+    assert brain.namespaces() == {"default", "newspace"}
+    assert sorted(brain.names(namespace="all")) == ["this", "this"]
+
+    brain.remove_namespace("newspace")
+    assert brain.namespace == "default"
+    assert brain["this"] == "default"
+
+
+def test_ns(brain):
+    brain["this"] = "default"
+    tenant = brain.ns("tenant42")
+    tenant["this"] = "tenant"
+    assert tenant["this"] == "tenant"
+    assert brain["this"] == "default"
+    assert brain.namespace == "default"
+    assert all(x.client is y.client for x, y in zip(tenant.shards, brain.shards))
+    assert sorted(brain.names(namespace="all")) == ["this", "this"]
@@ -0,0 +1,104 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+from pyarrow import plasma
+
+from brain_plasma.mock import SimulatedPlasmaClient
+
+
+@pytest.fixture(scope="function")
+def client(simulated_store):
+    """simulated plasma_store client with a small store"""
+    return SimulatedPlasmaClient(simulated_store, capacity=10_000)
+
+
+def test_capacity(client):
+    a, b, c = (plasma.ObjectID.from_random() for _ in range(3))
+    client.put_raw_buffer(bytes(6000), object_id=a)
+    assert client.store.used == 6000
+
+    # HOLDING A BUFFER PINS THE OBJECT, SO IT CAN'T BE EVICTED
+    held = client.get_buffers([a])[0]
+    with pytest.raises(plasma.PlasmaStoreFull):
+        client.put_raw_buffer(bytes(6000), object_id=b)
+    del held
+
+    # ONCE RELEASED IT'S THE LEAST RECENTLY USED OBJECT AND MAKES ROOM
+    client.put_raw_buffer(bytes(6000), object_id=b)
+    assert not client.contains(a)
+    assert client.store.evicted == 1
+
+    with pytest.raises(plasma.PlasmaObjectExists):
+        client.put_raw_buffer(bytes(1), object_id=b)
+    assert client.get(c, timeout_ms=0) is plasma.ObjectNotAvailable
+
+
+def test_delete(client):
+    ids = [plasma.ObjectID.from_random() for _ in range(3)]
+    for x in ids:
+        client.put(1, x)
+
+    # EVERY ID IS DELETED; MISSING IDS ARE IGNORED
+    client.delete(ids[:2] + [plasma.ObjectID.from_random()])
+    assert [client.contains(x) for x in ids] == [False, False, True]
+
+    # DELETING AN OBJECT IN USE WAITS FOR ITS LAST BUFFER
+    held = client.get_buffers([ids[2]])[0]
+    client.delete([ids[2]])
+    assert client.contains(ids[2])
+    assert client.list()[ids[2]]["ref_count"] == 1
+    del held
+    assert not client.contains(ids[2])
+    assert client.store.used == 0
+
+
+def test_shared_store(client):
+    other = SimulatedPlasmaClient(client.path)
+    object_id = client.put("x")
+    assert other.get(object_id) == "x"
+    assert other.calls == {"get": 1}
+
+
+def test_brain_round_trips(simulated):
+    brain = simulated()
+    brain["this"] = np.arange(10)
+    brain.client.calls.clear()
+
+    brain["this"]
+    assert brain.client.calls == {"get_buffers": 1, "get": 1}
+    brain.client.calls.clear()
+
+    brain["this"] = np.arange(20)
+    assert (brain["this"] == np.arange(20)).all()
+    del brain["this"]
+    assert brain.names() == []
+    assert brain.usage()["names"] == 0
+
+
+def test_latency(simulated_store):
+    client = SimulatedPlasmaClient(simulated_store, latency=0.01, jitter=0.01)
+    start = time.perf_counter()
+    client.contains(plasma.ObjectID.from_random())
+    assert 0.01 <= time.perf_counter() - start < 0.5
+
+
+def test_update_while_record_is_read(simulated):
+    # ANOTHER READER HOLDS THE RECORD, SO ITS DELETE IS DEFERRED UNTIL IT LETS GO
+    brain = simulated()
+    brain["this"] = np.arange(10)
+    metadata_id = brain._name_to_namespace_hash("this")
+    held = brain.client.get_buffers([metadata_id])
+
+    def release():
+        time.sleep(0.05)
+        held.clear()
+
+    thread = threading.Thread(target=release)
+    thread.start()
+    brain["this"] = np.arange(20)
+    thread.join()
+    assert (brain["this"] == np.arange(20)).all()
+    assert brain.usage()["names"] == 1
+    assert brain.collect(grace=0, dry_run=True)["orphaned_objects"] == 0
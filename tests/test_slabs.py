@@ -0,0 +1,213 @@
+import pickle
+
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from brain_plasma import Brain
+from brain_plasma import exceptions
+from brain_plasma import slabs
+from brain_plasma.mock import MockPlasmaClient
+
+
+@pytest.fixture(scope="function")
+def brain():
+    """Brain with mocked plasma_store client that packs small values into slabs"""
+    return Brain(ClientClass=MockPlasmaClient, slab_threshold=256)
+
+
+def objects(brain):
+    return len(brain.client.data)
+
+
+def test_small_values(brain):
+    brain["s"] = "hello"
+    before = objects(brain)
+    for i in range(100):
+        brain[f"n{i}"] = i
+    # ALL IN THE ONE SLAB, NOT 200 MORE OBJECTS
+    assert objects(brain) == before
+
+    assert brain["n42"] == 42
+    assert brain["s"] == "hello"
+    assert "n42" in brain
+    assert sorted(brain.names()) == sorted([f"n{i}" for i in range(100)] + ["s"])
+    assert brain.metadata("s")["codec"] == 6
+    assert len(brain.metadata()) == 101
+    usage = brain.usage()
+    assert usage["names"] == 101
+    assert usage["bytes"] == sum(x["size"] for x in brain.metadata().values())
+    assert brain.recount_usage() == usage
+
+    with brain.pin("s") as value:
+        assert value == "hello"
+
+
+def test_update_forget(brain):
+    brain["this"] = 1
+    brain.learn("this", 2, description="two")
+    assert brain["this"] == 2
+    assert brain.metadata("this")["description"] == "two"
+    assert brain.usage()["names"] == 1
+
+    brain.forget("this")
+    assert "this" not in brain
+    assert brain.usage() ["names"] == 0
+    assert brain.usage()["bytes"] == 0
+    with pytest.raises(KeyError):
+        brain["this"]
+
+
+def test_grow_and_shrink(brain):
+    # A VALUE THAT OUTGROWS THE THRESHOLD MOVES TO ITS OWN OBJECT AND BACK
+    brain["this"] = 1
+    brain["this"] = np.arange(1000)
+    assert (brain["this"] == np.arange(1000)).all()
+    assert brain.metadata("this")["codec"] != 6
+    assert brain.names() == ["this"]
+    brain["this"] = "small again"
+    assert brain["this"] == "small again"
+    assert brain.metadata("this")["codec"] == 6
+    assert brain.names() == ["this"]
+    assert brain.usage()["names"] == 1
+    assert brain.usage()["bytes"] == brain.metadata("this")["size"]
+
+    # BRAINS WITHOUT SLABS SEE AND REPLACE SLAB VALUES
+    other = Brain(ClientClass=MockPlasmaClient)
+    other.client = brain.client
+    assert other["this"] == "small again"
+    other["this"] = np.arange(10)
+    assert brain.names() == ["this"]
+    assert (brain["this"] == np.arange(10)).all()
+
+
+def test_small_container_of_large_value(brain):
+    # getsizeof OF THE LIST IS SMALL, WHAT IT HOLDS ISN'T
+    brain["this"] = [np.arange(100_000)]
+    assert brain.metadata("this")["codec"] != 6
+    assert (brain["this"][0] == np.arange(100_000)).all()
+
+    assert slabs.pickle_small([np.arange(100_000)], 256) is None
+    assert slabs.pickle_small(lambda: 1, 256) is None
+    assert pickle.loads(slabs.pickle_small({"a": [1, 2]}, 256)) == {"a": [1, 2]}
+
+
+def test_compact(brain):
+    brain._slab_directory("default", create=True).slab_size = 4096
+    for i in range(200):
+        brain[f"n{i}"] = "x" * 50
+    slabs = objects(brain)
+    for i in range(150):
+        del brain[f"n{i}"]
+    assert brain.compact_slabs() > 0
+    assert objects(brain) < slabs
+    assert sorted(brain.names()) == sorted(f"n{i}" for i in range(150, 200))
+    assert all(brain[f"n{i}"] == "x" * 50 for i in range(150, 200))
+    brain["n0"] = 0
+    assert brain["n0"] == 0
+
+
+def test_directory_grows(monkeypatch):
+    directory_size, init_directory = slabs.directory_size, slabs.init_directory
+    monkeypatch.setattr(slabs, "directory_size", lambda slots=16: directory_size(slots))
+    monkeypatch.setattr(slabs, "init_directory", lambda buffer, slots=16: init_directory(buffer, slots))
+    brain = Brain(ClientClass=MockPlasmaClient, slab_threshold=256)
+    other = Brain(ClientClass=MockPlasmaClient, slab_threshold=256)
+    other.client = brain.client
+    other["first"] = 0
+    assert other._slab_directory("default")._version == 0
+
+    # FAR MORE NAMES THAN THE FIRST DIRECTORY HAS SLOTS STAY IN SLABS
+    for i in range(100):
+        brain[f"n{i}"] = i
+    assert all(brain.metadata(f"n{i}")["codec"] == 6 for i in range(100))
+    assert len(brain._slab_directory("default")) == 101
+    assert brain._slab_directory("default")._version == 4
+
+    # A BRAIN THAT MAPPED AN OLDER DIRECTORY FOLLOWS TO THE CURRENT ONE
+    assert other["n99"] == 99
+    other["n100"] = 100
+    assert brain["n100"] == 100
+    assert len(brain.names()) == 102
+
+    # ONLY THE FIRST AND THE CURRENT DIRECTORY ARE KEPT
+    directories = [x for x in brain.client.data if x.binary().startswith(b"brain_slabs_")]
+    assert len(directories) == 2
+    brain._slab_directory("default").drop()
+    assert not [x for x in brain.client.data if x.binary().startswith(b"brain_slab")]
+
+
+def test_quota(brain):
+    brain.set_quota(max_names=1)
+    brain["this"] = 1
+    with pytest.raises(exceptions.BrainQuotaExceededError):
+        brain["that"] = 2
+    assert "that" not in brain
+
+
+def test_quota_evict(brain):
+    brain.set_quota(max_names=20, policy="evict")
+    for i in range(20):
+        brain[f"n{i}"] = i
+    brain["big"] = np.arange(1000)
+    brain["n20"] = 20
+    assert len(brain.names()) == 20
+    assert "big" in brain and "n20" in brain
+    assert brain.usage()["names"] == 20
+
+
+def test_view_of_slab_value(brain):
+    brain["small"] = np.arange(10)
+    assert brain.metadata("small")["codec"] == 6
+    brain.learn_view("head", "small", rows=slice(0, 3))
+    assert (brain["head"] == np.arange(3)).all()
+    with brain.pin("head") as value:
+        assert (value == np.arange(3)).all()
+
+
+def test_find_slab_names(brain):
+    brain["user_1"] = 1
+    brain["user_2"] = np.arange(1000)
+    brain["other"] = 3
+    assert brain.find(prefix="user_", refresh=True) == ["user_1", "user_2"]
+    assert brain.find(pattern="*r*") == ["other", "user_1", "user_2"]
+
+
+def test_replace_slab_value(brain):
+    brain["x"] = 1
+    with pytest.raises(exceptions.BrainSharedObjectError):
+        brain.counter("x")
+    with pytest.raises(exceptions.BrainSharedObjectError):
+        brain.log("x")
+    with pytest.raises(exceptions.BrainAppendError):
+        brain.append("x", pa.table({"a": [1]}))
+    assert brain.names() == ["x"]
+    assert brain["x"] == 1
+
+    brain["parent"] = np.arange(1000)
+    brain.learn_view("x", "parent", rows=slice(0, 2))
+    assert sorted(brain.names()) == ["parent", "x"]
+    assert brain.usage()["names"] == 2
+    assert (brain["x"] == np.arange(2)).all()
+
+
+def test_replace_large_value_delete_fails(brain, monkeypatch):
+    brain["this"] = np.arange(1000)
+    usage = brain.usage()
+    metadata_id = brain._name_to_namespace_hash("this")
+    delete = brain.client.delete
+
+    def fail(object_ids):
+        if metadata_id in object_ids:
+            raise OSError("store unavailable")
+        return delete(object_ids)
+
+    # THE LARGE VALUE STAYS THE NAME'S VALUE AND NOTHING IS LEFT IN THE SLAB
+    monkeypatch.setattr(brain.client, "delete", fail)
+    with pytest.raises(OSError):
+        brain["this"] = 1
+    assert (brain["this"] == np.arange(1000)).all()
+    assert brain.usage() == usage
+    assert brain._slab_metadata("this", "default") is None
+    monkeypatch.undo()
+    assert brain.reclaim() == 0
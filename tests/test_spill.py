@@ -0,0 +1,166 @@
+import functools
+import os
+
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from brain_plasma import Brain
+from brain_plasma import exceptions
+from brain_plasma import spill
+from brain_plasma.mock import MockPlasmaClient, SimulatedPlasmaClient
+
+
+@pytest.fixture(scope="function")
+def brain(tmp_path):
+    """Brain with mocked plasma_store client that spills to a temporary directory"""
+    return Brain(ClientClass=MockPlasmaClient, spill_dir=str(tmp_path))
+
+
+@pytest.fixture(scope="function")
+def small(simulated):
+    """factory of Brains on a small simulated plasma_store that doesn't evict"""
+    return functools.partial(simulated, capacity=100_000, evict=False)
+
+
+def test_spill_and_recall(brain):
+    # SMALL ENOUGH THAT THE MOCKED STORE'S CAPACITY DOESN'T MAKE BRAIN SPILL ON ITS OWN
+    array = np.arange(300)
+    brain.learn("plain", array)
+    brain.learn("pickled", array, serializer="pickle5")
+    brain["table"] = pa.table({"a": array})
+    before = brain.usage()["bytes"]
+    value_ids = [brain.object_id(x) for x in ["plain", "pickled", "table"]]
+
+    freed = brain.spill("plain", "pickled", "table")
+    assert freed > 3 * array.nbytes
+    assert brain.usage()["bytes"] == before - freed
+    assert brain.usage()["names"] == 3
+    for name, value_id in zip(["plain", "pickled", "table"], value_ids):
+        metadata = brain.metadata(name)
+        assert metadata["tier"] == spill.DISK
+        assert os.path.exists(spill.location(metadata))
+        assert not brain.client.contains(value_id)
+
+    assert (brain["plain"] == array).all()
+    assert brain["table"].equals(pa.table({"a": array}))
+    # PICKLE5 AND ARROW VALUES ARE VIEWS OF THE MAPPED FILE
+    pickled = brain["pickled"]
+    assert (pickled == array).all()
+    assert not pickled.flags.owndata and not pickled.flags.writeable
+
+    # SPILLING A SPILLED NAME DOES NOTHING
+    assert brain.spill("plain") == 0
+
+
+def test_spill_race(brain, monkeypatch, tmp_path):
+    brain["this"] = np.arange(300)
+    metadata = brain._lookup("this", "default")
+    write = spill.write
+
+    def other_spills_first(buffer, path):
+        # ANOTHER WRITER SPILLS THE SAME VALUE WHILE THIS ONE WRITES ITS FILE
+        monkeypatch.setattr(spill, "write", write)
+        assert brain.spill("this") > 0
+        write(buffer, path)
+
+    monkeypatch.setattr(spill, "write", other_spills_first)
+    assert brain._spill(metadata) == 0
+    assert (brain["this"] == np.arange(300)).all()
+    assert spill.files(str(tmp_path)) == [spill.location(brain.metadata("this"))]
+
+
+def test_spill_errors(brain):
+    brain["counter"] = 1
+    brain.counter("hits")
+    with pytest.raises(exceptions.BrainSpillError):
+        brain.spill("hits")
+    with pytest.raises(KeyError):
+        brain.spill("nope")
+    with pytest.raises(exceptions.BrainSpillError):
+        Brain(ClientClass=MockPlasmaClient).spill("counter")
+
+
+def test_promote(tmp_path):
+    brain = Brain(ClientClass=MockPlasmaClient, spill_dir=str(tmp_path), promote_after=2)
+    brain["this"] = np.arange(100)
+    before = brain.usage()["bytes"]
+    brain.spill("this")
+    path = spill.location(brain.metadata("this"))
+
+    assert (brain["this"] == np.arange(100)).all()
+    assert brain.metadata("this")["tier"] == spill.DISK
+    assert (brain["this"] == np.arange(100)).all()
+    metadata = brain.metadata("this")
+    assert metadata["tier"] == spill.STORE
+    assert metadata["extra"] == b""
+    assert not os.path.exists(path)
+    assert brain.usage()["bytes"] == before
+    assert (brain["this"] == np.arange(100)).all()
+
+
+def test_learn_and_forget_remove_files(brain):
+    brain["this"] = np.arange(10)
+    brain.spill("this")
+    path = spill.location(brain.metadata("this"))
+    brain["this"] = np.arange(20)
+    assert not os.path.exists(path)
+    assert brain.metadata("this")["tier"] == spill.STORE
+
+    brain.spill("this")
+    path = spill.location(brain.metadata("this"))
+    pinned = brain.pin("this")
+    del brain["this"]
+    assert not os.path.exists(path)
+    assert brain.usage()["names"] == 0
+    # THE MAPPING OUTLIVES THE FILE
+    assert (pinned.value == np.arange(20)).all()
+
+
+def test_spill_cold(small, tmp_path):
+    brain = small(spill_dir=str(tmp_path), spill_at=0.5)
+    for i in range(10):
+        brain[f"x{i}"] = np.full(1000, i)
+    assert brain.usage()["bytes"] <= 50_000
+    tiers = [brain.metadata(f"x{i}")["tier"] for i in range(10)]
+    # THE VALUES LEARNED FIRST ARE SPILLED FIRST
+    assert tiers == sorted(tiers, reverse=True)
+    assert tiers[0] == spill.DISK and tiers[-1] == spill.STORE
+    for i in range(10):
+        assert (brain[f"x{i}"] == np.full(1000, i)).all()
+
+
+def test_spill_when_full(small, tmp_path):
+    with pytest.raises(exceptions.BrainLearnNameError):
+        no_spill = small()
+        for i in range(20):
+            no_spill[f"x{i}"] = np.full(1000, i)
+    SimulatedPlasmaClient.reset()
+
+    brain = small(spill_dir=str(tmp_path), spill_at=1.0)
+    for i in range(20):
+        brain[f"x{i}"] = np.full(1000, i)
+    assert brain.metadata("x0")["tier"] == spill.DISK
+    assert brain.client.store.used <= 100_000
+    for i in range(20):
+        assert (brain[f"x{i}"] == np.full(1000, i)).all()
+
+
+def test_collect_files(small, tmp_path):
+    brain = small(spill_dir=str(tmp_path))
+    brain["this"] = np.arange(10)
+    brain["that"] = np.arange(10)
+    brain.spill("this", "that")
+    orphan = tmp_path / "orphan.brain"
+    orphan.write_bytes(b"12345")
+    os.remove(spill.location(brain.metadata("that")))
+
+    report = brain.collect(grace=0, dry_run=True)
+    assert report["orphaned_files"] == 1
+    assert report["dangling_names"] == [("default", "that")]
+    assert orphan.exists()
+
+    brain.collect(grace=0)
+    assert not orphan.exists()
+    assert brain.names() == ["this"]
+    assert (brain["this"] == np.arange(10)).all()
@@ -0,0 +1,158 @@
+import threading
+
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from brain_plasma import Brain
+from brain_plasma import exceptions
+from brain_plasma.mock import MockPlasmaClient
+
+
+def test_usage_counts(brain):
+    assert brain.usage() == {
+        "bytes": 0,
+        "names": 0,
+        "max_bytes": None,
+        "max_names": None,
+        "policy": "reject",
+    }
+    brain["this"] = "x" * 1000
+    brain["that"] = "y"
+    usage = brain.usage()
+    assert usage["names"] == 2
+    assert usage["bytes"] == sum(x["size"] for x in brain.metadata().values())
+
+    # UPDATES CHANGE THE BYTES BUT NOT THE NAMES
+    brain["this"] = "x"
+    assert brain.usage()["names"] == 2
+    assert brain.usage()["bytes"] < usage["bytes"]
+
+    del brain["this"]
+    del brain["that"]
+    assert brain.usage()["bytes"] == 0
+    assert brain.usage()["names"] == 0
+
+
+def test_usage_shared(brain):
+    other = Brain(ClientClass=MockPlasmaClient)
+    other.client = brain.client
+    brain["this"] = "that"
+    # ANOTHER BRAIN ON THE SAME STORE SEES THE SAME COUNTERS
+    assert other.usage() == brain.usage()
+    other["other"] = "thing"
+    assert brain.usage()["names"] == 2
+
+
+def test_usage_namespaces(brain):
+    brain["this"] = "that"
+    brain.set_namespace("newspace")
+    assert brain.usage()["names"] == 0
+    brain["this"] = "that"
+    brain["other"] = "that"
+    assert brain.usage("newspace")["names"] == 2
+    assert brain.usage("default")["names"] == 1
+
+    brain.remove_namespace("newspace")
+    assert brain.usage("newspace")["names"] == 0
+
+
+def test_quota_reject(brain):
+    brain.set_quota(max_names=1)
+    brain["this"] = "that"
+    with pytest.raises(exceptions.BrainQuotaExceededError):
+        brain["other"] = "thing"
+    assert not brain.exists("other")
+    assert brain.usage()["names"] == 1
+
+    # UPDATING AN EXISTING NAME DOESN'T ADD A NAME
+    brain["this"] = "other"
+
+    with pytest.raises(ValueError):
+        brain.set_quota(max_names=1, policy="ignore")
+
+
+def test_quota_evict(brain):
+    brain.set_quota(max_names=2, policy="evict")
+    brain["first"] = 1
+    brain["second"] = 2
+    brain["third"] = 3
+    assert sorted(brain.names()) == ["second", "third"]
+    assert brain.usage()["names"] == 2
+
+
+def test_quota_before_store(simulated):
+    # A SMALL STORE THAT EVICTS, LIKE plasma_store
+    brain = simulated(capacity=200_000)
+    brain["keep"] = np.arange(10_000)
+    tenant = brain.ns("tenant")
+    tenant.set_quota(max_bytes=50_000)
+    objects = len(brain.client.list())
+
+    for serializer in [None, "pickle5", "arrow"]:
+        thing = pa.table({"a": np.arange(150_000)}) if serializer == "arrow" else np.arange(20_000)
+        with pytest.raises(exceptions.BrainQuotaExceededError):
+            tenant.learn("big", thing, serializer=serializer)
+    # NOTHING WAS STORED, SO NOTHING WAS EVICTED
+    assert len(brain.client.list()) == objects
+    assert (brain["keep"] == np.arange(10_000)).all()
+    assert tenant.usage()["bytes"] == 0
+
+    tenant["small"] = np.arange(100)
+    usage = tenant.usage()
+    assert usage["names"] == 1
+    assert usage["bytes"] == tenant.metadata("small")["size"]
+
+
+def test_concurrent_forgets(simulated):
+    brains = [simulated(), simulated()]
+    for brain in brains:
+        # SLOW CALLS, SO THE TWO FORGETS INTERLEAVE
+        brain.client.latency = 0.0005
+    errors = []
+
+    def forget(brain, barrier):
+        barrier.wait()
+        try:
+            brain.forget("this")
+        except Exception as e:
+            errors.append(e)
+
+    for _ in range(20):
+        brains[0]["this"] = np.arange(100)
+        barrier = threading.Barrier(2)
+        threads = [threading.Thread(target=forget, args=(x, barrier)) for x in brains]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    # ONLY ONE FORGET OF EACH LEARN FOUND THE NAME AND COUNTED IT OFF
+    assert errors == []
+    assert brains[0].usage()["names"] == 0
+    assert brains[0].usage()["bytes"] == 0
+
+
+def test_forget_while_record_held(simulated):
+    brain, other = simulated(), simulated()
+    brain["this"] = np.arange(100)
+    metadata_id = brain._name_to_namespace_hash("this", "default")
+    # A READER HOLDS THE RECORD, SO PLASMA DEFERS DELETING IT
+    held = other.client.get_buffers([metadata_id])
+    brain.forget("this")
+    assert not other.exists("this")
+    assert "this" not in other.names()
+    other.forget("this")
+    assert brain.usage()["names"] == 0
+    # LEARNING IT AGAIN WAITS FOR THE READER TO LET GO, THEN ADDS A NAME, NOT A REPLACEMENT
+    threading.Timer(0.05, held.clear).start()
+    other["this"] = np.arange(10)
+    assert brain.usage()["names"] == 1
+    assert (brain["this"] == np.arange(10)).all()
+    assert brain.recount_usage() == brain.usage()
+
+
+def test_recount_usage(brain):
+    brain["this"] = "that"
+    expected = brain.usage()
+    brain._usage("default").set(0, 0)
+    assert brain.recount_usage() == expected
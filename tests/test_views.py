@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from brain_plasma import exceptions
+
+
+def test_view_rows(brain):
+    brain["this"] = np.arange(100)
+    brain.learn_view("that", "this", rows=slice(10, 20))
+    assert (brain["that"] == np.arange(10, 20)).all()
+    assert "that" in brain.names()
+
+    # THE VIEW FOLLOWS ITS PARENT
+    brain["this"] = np.arange(100) * 2
+    assert (brain["that"] == np.arange(20, 40, 2)).all()
+
+
+def test_view_parent_replaced(simulated):
+    brain = simulated()
+    brain["this"] = np.arange(100)
+    brain.learn_view("that", "this", rows=slice(10, 20))
+    lookup = brain._lookup
+
+    def replace_parent(name, namespace):
+        metadata = lookup(name, namespace)
+        if name == "this":
+            # THE PARENT IS RE-LEARNED AFTER ITS RECORD WAS READ, BEFORE ITS VALUE IS
+            brain._lookup = lookup
+            brain["this"] = np.arange(100) * 2
+        return metadata
+
+    brain._lookup = replace_parent
+    assert (brain["that"] == np.arange(20, 40, 2)).all()
+
+
+def test_view_structured_columns(brain):
+    brain["this"] = np.zeros(10, dtype=[("a", "i8"), ("b", "f8"), ("c", "i4")])
+    brain.learn_view("that", "this", rows=slice(2, 5), columns=["a", "c"])
+    value = brain["that"]
+    assert value.dtype.names == ("a", "c")
+    assert len(value) == 3
+
+
+def test_view_dataframe(brain):
+    df = pd.DataFrame({"a": range(10), "b": [str(x) for x in range(10)], "c": 1.5})
+    brain["this"] = df
+    brain.learn_view("that", "this", rows=slice(5, None), columns=["b", "a"])
+    pd.testing.assert_frame_equal(brain["that"], df[["b", "a"]].iloc[5:])
+
+
+def test_view_errors(brain):
+    brain["this"] = np.arange(10)
+    with pytest.raises(KeyError):
+        brain.learn_view("that", "other")
+    with pytest.raises(exceptions.BrainViewError):
+        brain.learn_view("that", "this", rows=slice(0, 10, 2))
+    with pytest.raises(exceptions.BrainViewError):
+        brain.learn_view("this", "this")
+    brain.learn_view("that", "this", columns=["a"])
+    with pytest.raises(exceptions.BrainViewError):
+        brain["that"]
+
+
+def test_view_forget(brain):
+    brain["this"] = np.arange(10)
+    brain.learn_view("that", "this", rows=slice(0, 5))
+    names = brain.usage()["names"]
+
+    # FORGETTING THE VIEW LEAVES THE PARENT ALONE
+    brain.forget("that")
+    assert (brain["this"] == np.arange(10)).all()
+    assert brain.usage()["names"] == names - 1
+
+    brain.learn_view("that", "this", rows=slice(0, 5))
+    brain.forget("this")
+    with pytest.raises(KeyError):
+        brain["that"]
+
+
+def test_view_pin(brain):
+    brain["this"] = np.arange(10)
+    brain.learn_view("that", "this", rows=slice(0, 5))
+    with brain.pin("that") as value:
+        assert (value == np.arange(5)).all()
+
+
+def test_view_cycle(brain):
+    brain["p"] = np.arange(10)
+    brain.learn_view("a", "p", rows=slice(0, 5))
+    brain.learn_view("b", "a", rows=slice(0, 3))
+    with pytest.raises(exceptions.BrainViewError):
+        brain.learn_view("a", "b")
+    assert (brain["a"] == np.arange(5)).all()
+    assert (brain["b"] == np.arange(3)).all()
+    # A VIEW CAN MOVE TO ANOTHER PARENT THAT ISN'T BELOW IT
+    brain.learn_view("b", "p", rows=slice(5, 7))
+    assert (brain["b"] == np.arange(5, 7)).all()
@@ -0,0 +1,178 @@
+import shutil
+import subprocess
+import sys
+import threading
+
+import numpy as np
+import pytest
+from pyarrow import plasma
+
+from brain_plasma import Brain
+from brain_plasma import exceptions
+from brain_plasma.mock import MockPlasmaClient
+from brain_plasma.write_behind import WriteBehindQueue
+
+
+@pytest.fixture(scope="function")
+def brain():
+    """write-behind Brain with mocked plasma_store client"""
+    return Brain(ClientClass=MockPlasmaClient, write_behind=True)
+
+
+class BlockedPublisher:
+    """records published writes; blocks until released"""
+
+    def __init__(self):
+        self.published = []
+        self.release = threading.Event()
+
+    def __call__(self, key, thing, *options):
+        self.release.wait()
+        self.published.append((key, thing))
+
+
+def test_queue_coalesces():
+    publisher = BlockedPublisher()
+    queue = WriteBehindQueue(publisher)
+    queue.put("a", 1)
+    queue.put("b", 1)
+    queue.put("b", 2)
+    queue.put("b", 3)
+    assert queue.get("b") == (True, 3)
+
+    publisher.release.set()
+    queue.flush(timeout=5)
+    assert queue.get("b") == (False, None)
+    assert sorted(publisher.published) == [("a", 1), ("b", 3)]
+
+
+def test_queue_backpressure():
+    publisher = BlockedPublisher()
+    queue = WriteBehindQueue(publisher, max_pending=1)
+    queue.put("a", 1)
+    queue.put("b", 1)
+
+    # THE QUEUE IS FULL; PUT BLOCKS UNTIL THE PUBLISHER CATCHES UP
+    blocked = threading.Thread(target=queue.put, args=("c", 1))
+    blocked.start()
+    blocked.join(0.1)
+    assert blocked.is_alive()
+    with pytest.raises(TimeoutError):
+        queue.flush(timeout=0.1)
+
+    publisher.release.set()
+    blocked.join(5)
+    queue.flush(timeout=5)
+    assert len(publisher.published) == 3
+
+
+def test_queue_errors():
+    def fail(key, thing, description):
+        raise OSError("store is full")
+
+    queue = WriteBehindQueue(fail)
+    queue.put("a", 1)
+    with pytest.raises(exceptions.BrainWriteBehindError):
+        queue.flush(timeout=5)
+    # ERRORS ARE ONLY RAISED ONCE
+    queue.flush(timeout=5)
+
+
+def test_brain_write_behind(brain):
+    brain["this"] = "that"
+    # QUEUED VALUES ARE VISIBLE TO THIS BRAIN RIGHT AWAY
+    assert brain["this"] == "that"
+    assert brain.exists("this")
+
+    brain.flush(timeout=5)
+    assert brain.names() == ["this"]
+    assert brain["this"] == "that"
+
+    del brain["this"]
+    brain.flush(timeout=5)
+    assert not brain.exists("this")
+
+
+def test_brain_write_behind_namespace(brain):
+    brain["this"] = "default"
+    brain.set_namespace("newspace")
+    brain["this"] = "newspace"
+    brain.flush(timeout=5)
+    assert brain["this"] == "newspace"
+    assert brain.names(namespace="default") == ["this"]
+
+
+def test_brain_write_behind_listing(monkeypatch):
+    release = threading.Event()
+    publish = Brain._publish
+
+    def blocked(self, *args):
+        release.wait()
+        publish(self, *args)
+
+    monkeypatch.setattr(Brain, "_publish", blocked)
+    brain = Brain(ClientClass=MockPlasmaClient, write_behind=True)
+    brain["this"] = "that"
+    brain["other"] = "thing"
+    # PENDING WRITES ARE LISTED BEFORE THEY'RE PUBLISHED, AND ONLY ONCE
+    assert sorted(brain.names()) == ["other", "this"]
+    assert "other" in brain and len(brain) == 2
+    assert sorted(brain.names(namespace="all")) == ["other", "this"]
+    assert brain.names(namespace="newspace") == []
+
+    release.set()
+    brain.flush(timeout=5)
+    assert sorted(brain.names()) == ["other", "this"]
+    assert len(brain) == 2
+
+
+def test_brain_write_behind_iter(monkeypatch):
+    release = threading.Event()
+    publish = Brain._publish
+
+    def blocked(self, *args):
+        release.wait()
+        publish(self, *args)
+
+    brain = Brain(ClientClass=MockPlasmaClient, write_behind=True)
+    brain["this"] = "old"
+    brain.flush(timeout=5)
+    monkeypatch.setattr(brain._write_behind, "_publish", blocked.__get__(brain))
+    brain["this"] = "new"
+    brain["other"] = "thing"
+    # A PENDING WRITE IS ITERATED ONCE, WITH ITS QUEUED VALUE
+    assert sorted(brain) == ["other", "this"]
+    assert dict(brain.iter_items()) == {"this": "new", "other": "thing"}
+
+    release.set()
+    brain.flush(timeout=5)
+    assert sorted(brain) == ["other", "this"]
+    assert dict(brain.iter_items()) == {"this": "new", "other": "thing"}
+
+
+# A PROCESS THAT EXITS RIGHT AFTER QUEUEING WRITES THAT TAKE A WHILE TO PUBLISH
+EXITING_WRITER = """
+import sys, time
+import numpy as np
+from brain_plasma import Brain
+
+brain = Brain(path=sys.argv[1], write_behind=True)
+publish = brain._write_behind._publish
+
+def slow(*args):
+    time.sleep(0.01)
+    publish(*args)
+
+brain._write_behind._publish = slow
+for i in range(20):
+    brain[f"x{i}"] = np.full(10, i)
+"""
+
+
+@pytest.mark.skipif(shutil.which("plasma_store") is None, reason="needs plasma_store")
+def test_brain_write_behind_flushes_at_exit():
+    with plasma.start_plasma_store(50_000_000) as (path, _):
+        subprocess.run([sys.executable, "-c", EXITING_WRITER, path], check=True)
+        brain = Brain(path=path)
+        assert len(brain.names()) == 20
+        assert (brain["x19"] == np.full(10, 19)).all()